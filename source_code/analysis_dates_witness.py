@@ -1,28 +1,27 @@
 import pandas as pd
 import os
-from transformers import pipeline
+import argparse
+import json
+import re
+import time
+import datetime
+from llm_cache import open_cache, cache_key, lookup, store
+from feature_cache import fingerprint
+from checkpoint_journal import load_journal, start_journal, append_journal
+from date_extractor import ERA_PATTERN
+from witness_extractor import NUMBER_PATTERN
+from prefix_cache import PrefixCachedPipe, DEFAULT_MAX_NEW_TOKENS
+from model_backends import BACKENDS, load_pipeline
+from inference_service import InferenceClient, ServicePipe
+from process_haunted_data import assign_row_ids
+from table_io import write_table
 
-# Define paths dynamically
-data_dir = os.path.join("..", "data")
-raw_dir = os.path.join(data_dir, "raw")
-processed_dir = os.path.join(data_dir, "processed")
+model_id = "Qwen/Qwen2.5-1.5B-Instruct"
 
-# Ensure the processed directory exists
-os.makedirs(processed_dir, exist_ok=True)
+# Bump whenever the prompts or generation settings change so cached responses are regenerated
+prompt_version = "1"
 
-# Define file paths
-input_file = os.path.join(raw_dir, "haunted_places.csv")
-output_file = os.path.join(processed_dir, "hp_with_date_and_witness_count.csv")
-
-# Load CSV
-hp_df = pd.read_csv(input_file)
-
-# Initialize AI model
-pipe = pipeline("text-generation", model="Qwen/Qwen2.5-1.5B-Instruct", device_map="auto")
-
-
-def date_extraction(description):
-    prompt = """
+date_prompt = """
         The text below is a description of a haunted location.\n
         Please extract out the date that the haunted location is dated to with the format: Month-Day-Year\n
         If no date is mentioned, then put 'N/A' as your output.\n
@@ -36,20 +35,8 @@ def date_extraction(description):
         \n\n
         Description:\n
     """
-    messages = [{"role": "user", "content": prompt + description}]
-
-    try:
-        llama_output = pipe(messages)[0]['generated_text'][1]['content']
-        final_date = llama_output.split("####")[-1].strip()
-    except Exception as e:
-        print(f"Error extracting date: {e}")
-        final_date = "N/A"
 
-    return final_date
-
-
-def witness_count_extraction(description):
-    prompt = """
+witness_prompt = """
         The text below is a description of a haunted location.\n
         Please extract out the witness count from the haunted location.\n
         If no witness count is mentioned, then put 'N/A' as your output.\n
@@ -61,11 +48,194 @@ def witness_count_extraction(description):
         \n\n
         Description:\n
     """
-    messages = [{"role": "user", "content": prompt + description}]
+
+combined_prompt = """
+        The text below is a description of a haunted location.\n
+        Please extract out the date that the haunted location is dated to with the format: Month-Day-Year\n
+        If part of the date is mentioned, put the dates available with 00 as filler for the other values.\n
+        Please also extract out the witness count from the haunted location.\n
+        If a value is not mentioned, then put "N/A" for that value.\n
+        Please output your final result after #### as a JSON object with the keys "date" and "witness_count".
+
+        For example:\n
+        Description: "The house dated back to the 20th century", output: #### {"date": "01-01-1900", "witness_count": "N/A"}\n
+        Description: "The location was discovered in May of 1854 by 3 eye witnesses", output: #### {"date": "05-01-1854", "witness_count": "3"}\n
+        Description: "People said they heard voices", output: #### {"date": "N/A", "witness_count": "N/A"}\n
+        \n\n
+        Description:\n
+    """
+
+
+# Whole-word date evidence, wide enough that the model never misses a row it would date: month and
+# weekday names, any two- to four-digit number ("1492", "the 50s", "'50s"), numeric dates, spelled-out
+# years ("nineteen fifty"), century or decade phrases, and named eras and holidays. "May" counts
+# capitalized, or lower-case next to a number or after "in", "last", "early", "late" or "of".
+date_pattern = re.compile(
+    r"\b(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|june?|july?|aug(?:ust)?|sept?(?:ember)?"
+    r"|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?|(?:mon|tues|wednes|thurs|fri|satur|sun)days?)\b|\b(?-i:May)\b"
+    r"|\b(?:in|last|early|late|of|\d{1,4}(?:st|nd|rd|th)?)\s+may\b|\bmay\s+\d"
+    r"|\b\d{2,4}s?\b|'\d0s\b|\b\d{1,2}[/.-]\d{1,2}[/.-]\d{2,4}\b"
+    r"|\b(?:sixteen|seventeen|eighteen|nineteen)\b"
+    r"|\b(?:civil|revolutionary|world|great|korean|vietnam|spanish[- ]american|mexican[- ]american)\s+war\b"
+    r"|\b(?:prohibition|great\s+depression|gold\s+rush|colonial|victorian|antebellum|reconstruction)\b"
+    r"|\b(?:christmas|halloween|thanksgiving|easter|new\s+year'?s?|independence\s+day|fourth\s+of\s+july)\b"
+    rf"|{ERA_PATTERN}",
+    re.IGNORECASE,
+)
+
+# Words that count people without a number ("a couple of hikers", "a pair of kids")
+group_pattern = re.compile(r"\b(?:couple|pair|trio|twins)\b", re.IGNORECASE)
+
+
+# Step 1: Define Paths
+def define_paths():
+    """
+    Defines the relative paths for input and output files.
+
+    Returns:
+        dict: A dictionary containing paths for the input TSV file and the output table.
+    """
+    data_dir = os.path.join("..", "data")
+    raw_dir = os.path.join(data_dir, "raw")
+    processed_dir = os.path.join(data_dir, "processed")
+
+    # Ensure the processed directory exists
+    os.makedirs(processed_dir, exist_ok=True)
+
+    paths = {
+        # The TSV written by process_haunted_data.py carries the row_id assigned at ingest
+        "input_file": os.path.join(raw_dir, "haunted_places.tsv"),
+        # Stored as .parquet (or .tsv without pyarrow), where analysis_v2 reads it
+        "output_file": os.path.join(processed_dir, "hp_with_date_and_witness_count.tsv"),
+        "cache_file": os.path.join(processed_dir, "llm_cache.sqlite"),
+        "journal_file": os.path.join(processed_dir, "hp_with_date_and_witness_count.journal.jsonl"),
+    }
+    return paths
+
+
+# Step 2: Initialize AI Model
+def load_model(backend="auto", prefix_cache=False, max_new_tokens=DEFAULT_MAX_NEW_TOKENS, stop_after_answer=False):
+    """
+    Loads the Qwen text-generation pipeline.
+
+    Args:
+        backend (str): "auto" for full precision, "cpu-fp32" or "cpu-int8" (see model_backends).
+        prefix_cache (bool): Encode the few-shot prompt prefixes once and reuse their key/value cache.
+        max_new_tokens (int): Cap on generated tokens (prefix-cache path only; the pipeline caps at 256 itself).
+        stop_after_answer (bool): Stop once the answer after '####' is complete (prefix-cache path only).
+
+    Returns:
+        transformers.Pipeline: The text-generation pipeline, or a PrefixCachedPipe wrapping it.
+    """
+    pipe = load_pipeline(model_id, backend)
+
+    # Decoder-only models must be padded on the left when prompts are generated in batches
+    pipe.tokenizer.padding_side = "left"
+    if pipe.tokenizer.pad_token is None:
+        pipe.tokenizer.pad_token = pipe.tokenizer.eos_token
+
+    if prefix_cache:
+        pipe = PrefixCachedPipe(pipe, [date_prompt, witness_prompt, combined_prompt],
+                                max_new_tokens, stop_after_answer)
+
+    return pipe
+
+
+def response_model(pipe):
+    """
+    Names the model together with any generation settings that change its output.
+
+    Used in cache keys and journal fingerprints, so responses from a quantized backend, with a
+    token cap or with an early stop are never mixed with full-precision, full-length responses.
+    """
+    if isinstance(pipe, ServicePipe):
+        return pipe.model_name
+    if isinstance(pipe, PrefixCachedPipe):
+        settings = pipe.generation_settings()
+    else:
+        settings = {"backend": getattr(pipe, "backend", "auto")}
+    changed = {name: value for name, value in settings.items() if value not in (None, False, "auto")}
+    return f"{model_id} {json.dumps(changed, sort_keys=True)}" if changed else model_id
+
+
+# Step 3: Row-by-Row Extraction
+def format_progress(done, total, started_at):
+    """
+    Formats a progress line with throughput and estimated time remaining.
+
+    Args:
+        done (int): Rows finished so far.
+        total (int): Rows to process in total.
+        started_at (float): time.time() when processing started.
+
+    Returns:
+        str: For example "120/10922 rows | 1.85 rows/s | ETA 1:37:18".
+    """
+    elapsed = time.time() - started_at
+    rate = done / elapsed if elapsed > 0 else 0.0
+    eta = str(datetime.timedelta(seconds=int((total - done) / rate))) if rate > 0 else "unknown"
+    return f"{done}/{total} rows | {rate:.2f} rows/s | ETA {eta}"
+
+
+def parse_answer(output):
+    """Returns the final answer the model wrote after '####'."""
+    return output.split("####")[-1].strip()
+
+
+def parse_combined_answer(output):
+    """
+    Parses the JSON object the model wrote after '####' in combined mode.
+
+    Falls back to picking the "date" and "witness_count" fields out with a regex when the
+    object is not valid JSON (single quotes, unquoted keys, no closing brace), and to 'N/A'
+    for any field that cannot be found.
+
+    Args:
+        output (str): The model output.
+
+    Returns:
+        tuple: (date, witness count) as strings.
+    """
+    answer = parse_answer(output)
+    fields = {}
+
+    match = re.search(r"\{.*?\}", answer, re.DOTALL)
+    if match:
+        try:
+            fields = json.loads(match.group(0))
+        except ValueError:
+            fields = {}
+    if not isinstance(fields, dict) or not fields:
+        fields = dict(re.findall(r'["\']?(date|witness_count)["\']?\s*:\s*["\']?([^"\',}\n]*)', answer))
+
+    def field(name):
+        value = fields.get(name)
+        if value is None or str(value).strip() in ("", "null", "None"):
+            return "N/A"
+        return str(value).strip()
+
+    return field("date"), field("witness_count")
+
+
+def date_extraction(pipe, description):
+    messages = [{"role": "user", "content": date_prompt + description}]
+
+    try:
+        llama_output = pipe(messages)[0]['generated_text'][1]['content']
+        final_date = parse_answer(llama_output)
+    except Exception as e:
+        print(f"Error extracting date: {e}")
+        final_date = "N/A"
+
+    return final_date
+
+
+def witness_count_extraction(pipe, description):
+    messages = [{"role": "user", "content": witness_prompt + description}]
 
     try:
         llama_output = pipe(messages)[0]['generated_text'][1]['content']
-        final_witness_count = llama_output.split("####")[-1].strip()
+        final_witness_count = parse_answer(llama_output)
     except Exception as e:
         print(f"Error extracting witness count: {e}")
         final_witness_count = "N/A"
@@ -73,24 +243,359 @@ def witness_count_extraction(description):
     return final_witness_count
 
 
-# Processing each row and adding extracted values
-haunted_place_date_list = []
-witness_count_list = []
+def combined_extraction(pipe, description):
+    """Extracts the date and the witness count with a single generation."""
+    messages = [{"role": "user", "content": combined_prompt + description}]
+
+    try:
+        llama_output = pipe(messages)[0]['generated_text'][1]['content']
+        return parse_combined_answer(llama_output)
+    except Exception as e:
+        print(f"Error extracting date and witness count: {e}")
+        return "N/A", "N/A"
+
+
+def triage_rows(hp_df):
+    """
+    Decides with cheap vectorized detectors which rows can hold a date or a witness count.
+
+    Date candidates match date_pattern, which also flags bare two- to four-digit numbers, eras and
+    holidays so that no row the model would date is skipped; witness candidates contain a digit, a
+    number word or a group word. All detectors match whole words, so "woman" or "demon" is not read
+    as a month or weekday. Other rows are answered 'N/A' without running the model.
+
+    Args:
+        hp_df (pd.DataFrame): The haunted places DataFrame.
+
+    Returns:
+        tuple: (date candidates, witness candidates) as lists of booleans aligned with hp_df.
+    """
+    texts = hp_df['description'].astype("string")
+
+    def contains(pattern):
+        return texts.str.contains(pattern).fillna(False).astype(bool)
+
+    date_candidates = contains(date_pattern)
+    witness_candidates = contains(NUMBER_PATTERN) | contains(group_pattern)
+
+    total = max(len(hp_df), 1)
+    skipped = int((~(date_candidates | witness_candidates)).sum())
+    print(f"Triage: {int(date_candidates.sum())}/{len(hp_df)} rows ({date_candidates.sum() / total:.1%}) "
+          f"routed to date extraction, {int(witness_candidates.sum())}/{len(hp_df)} "
+          f"({witness_candidates.sum() / total:.1%}) to witness extraction, "
+          f"{skipped} ({skipped / total:.1%}) answered N/A without inference")
+
+    return date_candidates.tolist(), witness_candidates.tolist()
+
+
+def extract_sequential(pipe, hp_df, combined=False, triage=False):
+    """
+    Runs both extractions one row at a time.
+
+    Args:
+        pipe (transformers.Pipeline): The text-generation pipeline.
+        hp_df (pd.DataFrame): The haunted places DataFrame.
+        combined (bool): Ask for both fields in one generation instead of two.
+        triage (bool): Only send rows flagged by triage_rows to the model.
+
+    Returns:
+        tuple: (dates, witness counts) as lists aligned with hp_df.
+    """
+    haunted_place_date_list = []
+    witness_count_list = []
+    started_at = time.time()
+
+    if triage:
+        date_candidates, witness_candidates = triage_rows(hp_df)
+    else:
+        date_candidates = witness_candidates = [True] * len(hp_df)
+
+    for position, (_, row) in enumerate(hp_df.iterrows()):
+        if position % 10 == 0 and position > 0:  # Print progress every 10 rows
+            print(format_progress(position, len(hp_df), started_at))
+
+        date = witness_count = "N/A"
+        if combined:
+            if date_candidates[position] or witness_candidates[position]:
+                date, witness_count = combined_extraction(pipe, row['description'])
+        else:
+            if date_candidates[position]:
+                date = date_extraction(pipe, row['description'])
+            if witness_candidates[position]:
+                witness_count = witness_count_extraction(pipe, row['description'])
+
+        haunted_place_date_list.append(date)
+        witness_count_list.append(witness_count)
+
+    return haunted_place_date_list, witness_count_list
+
+
+# Step 4: Batched Extraction
+def generate_batched(pipe, prompt, descriptions, batch_size, parse=parse_answer, failed="N/A", cache=None,
+                     selected=None):
+    """
+    Runs one prompt over many descriptions in batches and returns the answers in the original order.
+
+    Descriptions are sorted by length before batching so each batch pads to a similar length.
+    With a cache, descriptions answered in an earlier run skip inference, identical descriptions
+    are generated once, and every finished batch is stored right away.
+
+    Args:
+        pipe (transformers.Pipeline): The text-generation pipeline.
+        prompt (str): The few-shot prompt placed before each description.
+        descriptions (list): The descriptions to process.
+        batch_size (int): Number of prompts generated together.
+        parse (callable): Turns the model output into the answer.
+        failed: The answer used for rows that are not selected or whose batch failed.
+        cache (sqlite3.Connection): Optional response cache from llm_cache.open_cache.
+        selected (list): Optional booleans; only selected rows are sent to the model.
+
+    Returns:
+        list: The parsed answer for every description.
+    """
+    answers = [failed] * len(descriptions)
+    model_name = response_model(pipe)
+    keys = [cache_key(model_name, prompt_version, prompt, description) for description in descriptions]
+    rows_by_key = {}
+    for i, key in enumerate(keys):
+        if selected is None or selected[i]:
+            rows_by_key.setdefault(key, []).append(i)
+
+    cached = lookup(cache, list(rows_by_key)) if cache is not None else {}
+    for key, output in cached.items():
+        for i in rows_by_key[key]:
+            answers[i] = parse(output)
+
+    pending = [rows[0] for key, rows in rows_by_key.items() if key not in cached]
+    if cache is not None:
+        requested = sum(len(rows) for rows in rows_by_key.values())
+        hits = requested - sum(len(rows_by_key[keys[i]]) for i in pending)
+        print(f"LLM cache: {hits} hits, {requested - hits} misses, {len(pending)} to generate")
+
+    order = sorted(pending, key=lambda i: len(descriptions[i]))
+    started_at = time.time()
+
+    for start in range(0, len(order), batch_size):
+        batch = order[start:start + batch_size]
+        messages = [[{"role": "user", "content": prompt + descriptions[i]}] for i in batch]
+
+        try:
+            outputs = pipe(messages, batch_size=len(batch))
+            generated = {keys[i]: output[0]['generated_text'][-1]['content'] for i, output in zip(batch, outputs)}
+        except Exception as e:
+            print(f"Error in batch starting at sorted row {start}: {e}")
+            generated = {}
+
+        for key, output in generated.items():
+            for i in rows_by_key[key]:
+                answers[i] = parse(output)
+        if cache is not None and generated:
+            store(cache, model_name, generated)
+
+        print(format_progress(min(start + batch_size, len(order)), len(order), started_at))
+
+    return answers
+
+
+def extract_batched(pipe, hp_df, batch_size, combined=False, cache=None, triage=False):
+    """
+    Runs both extractions over the whole dataset in length-sorted batches.
+
+    Args:
+        pipe (transformers.Pipeline): The text-generation pipeline.
+        hp_df (pd.DataFrame): The haunted places DataFrame.
+        batch_size (int): Number of prompts generated together.
+        combined (bool): Ask for both fields in one generation instead of two.
+        cache (sqlite3.Connection): Optional response cache.
+        triage (bool): Only send rows flagged by triage_rows to the model.
+
+    Returns:
+        tuple: (dates, witness counts) as lists aligned with hp_df.
+    """
+    descriptions = hp_df['description'].fillna("").astype(str).tolist()
+    date_candidates, witness_candidates = triage_rows(hp_df) if triage else (None, None)
+
+    if combined:
+        print("Extracting dates and witness counts")
+        either = None if not triage else [d or w for d, w in zip(date_candidates, witness_candidates)]
+        answers = generate_batched(pipe, combined_prompt, descriptions, batch_size, parse=parse_combined_answer,
+                                   failed=("N/A", "N/A"), cache=cache, selected=either)
+        return [date for date, _ in answers], [count for _, count in answers]
+
+    print("Extracting dates")
+    haunted_place_date_list = generate_batched(pipe, date_prompt, descriptions, batch_size, cache=cache,
+                                               selected=date_candidates)
+    print("Extracting witness counts")
+    witness_count_list = generate_batched(pipe, witness_prompt, descriptions, batch_size, cache=cache,
+                                          selected=witness_candidates)
+
+    return haunted_place_date_list, witness_count_list
+
+
+# Step 5: Checkpointed Extraction
+def extract_rows(pipe, hp_df, batch_size=1, combined=False, cache=None, triage=False):
+    """
+    Runs both extractions with the selected mode.
+
+    Args:
+        pipe (transformers.Pipeline): The text-generation pipeline.
+        hp_df (pd.DataFrame): The haunted places DataFrame.
+        batch_size (int): Number of prompts generated together.
+        combined (bool): Ask for both fields in one generation instead of two.
+        cache (sqlite3.Connection): Optional response cache.
+        triage (bool): Only send rows flagged by triage_rows to the model.
+
+    Returns:
+        tuple: (dates, witness counts) as lists aligned with hp_df.
+    """
+    if cache is not None or batch_size > 1:
+        return extract_batched(pipe, hp_df, batch_size, combined, cache, triage)
+    return extract_sequential(pipe, hp_df, combined, triage)
+
+
+def extract_checkpointed(pipe, hp_df, journal_file, checkpoint_every, batch_size=1, combined=False, cache=None,
+                         triage=False):
+    """
+    Runs the extraction in row order, committing every checkpoint_every rows to a journal.
+
+    Rerunning after a crash resumes after the last committed row and gives the same result as
+    an uninterrupted run. The journal is tied to the input, model and prompt settings.
+
+    Args:
+        pipe (transformers.Pipeline): The text-generation pipeline.
+        hp_df (pd.DataFrame): The haunted places DataFrame.
+        journal_file (str): Path to the JSON-lines journal.
+        checkpoint_every (int): Rows processed between two journal commits.
+        batch_size (int): Number of prompts generated together.
+        combined (bool): Ask for both fields in one generation instead of two.
+        cache (sqlite3.Connection): Optional response cache.
+        triage (bool): Only send rows flagged by triage_rows to the model.
+
+    Returns:
+        tuple: (dates, witness counts) as lists aligned with hp_df.
+    """
+    run_fingerprint = fingerprint(
+        response_model(pipe), prompt_version, combined, triage, hp_df['description'].fillna("").astype(str).tolist()
+    )
+    records = load_journal(journal_file, run_fingerprint)
+
+    # Rewrite the journal so a line cut off by a crash cannot merge with the next commit
+    start_journal(journal_file, run_fingerprint, [records[row] for row in sorted(records)])
+
+    remaining = [row for row in range(len(hp_df)) if row not in records]
+    if records:
+        print(f"Resuming from journal: {len(records)} rows already done, {len(remaining)} left")
+
+    started_at = time.time()
+    for start in range(0, len(remaining), checkpoint_every):
+        rows = remaining[start:start + checkpoint_every]
+        dates, counts = extract_rows(pipe, hp_df.iloc[rows], batch_size, combined, cache, triage)
+
+        committed = [
+            {"row": row, "HP_date": date, "Witness_count": count}
+            for row, date, count in zip(rows, dates, counts)
+        ]
+        append_journal(journal_file, committed)
+        records.update((record["row"], record) for record in committed)
+
+        print(f"Checkpoint: {format_progress(start + len(rows), len(remaining), started_at)}")
+
+    return (
+        [records[row]["HP_date"] for row in range(len(hp_df))],
+        [records[row]["Witness_count"] for row in range(len(hp_df))],
+    )
+
+
+# Command-Line Arguments
+def parse_args():
+    """
+    Parses the command-line options for the extraction run.
+
+    Returns:
+        argparse.Namespace: The parsed options.
+    """
+    parser = argparse.ArgumentParser(description="Extract dates and witness counts with the Qwen model.")
+    parser.add_argument("--batch-size", type=int, default=1,
+                        help="Descriptions generated together; 1 processes one row at a time.")
+    parser.add_argument("--combined", action="store_true",
+                        help="Extract the date and witness count with one generation per description.")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Regenerate every response instead of reusing the on-disk response cache.")
+    parser.add_argument("--checkpoint-every", type=int, default=0,
+                        help="Commit finished rows to a journal every N rows and resume from it after a crash.")
+    parser.add_argument("--triage", action="store_true",
+                        help="Answer N/A without inference for rows with no date or number candidates.")
+    parser.add_argument("--backend", choices=BACKENDS, default="auto",
+                        help="Model backend: full precision ('auto', 'cpu-fp32') or int8 dynamic quantization on CPU.")
+    parser.add_argument("--service", default=None,
+                        help="host:port of a running inference_service.py to use instead of loading the model here.")
+    parser.add_argument("--prefix-cache", action="store_true",
+                        help="Encode the shared few-shot prompt prefix once and reuse its key/value cache per row.")
+    parser.add_argument("--max-new-tokens", type=int, default=DEFAULT_MAX_NEW_TOKENS,
+                        help="Cap the tokens generated per row (with --prefix-cache, default: %(default)s).")
+    parser.add_argument("--stop-after-answer", action="store_true",
+                        help="Stop generating once the answer after '####' is complete (with --prefix-cache).")
+    return parser.parse_args()
+
+
+# Main Function
+def main(batch_size=1, combined=False, use_cache=True, checkpoint_every=0, triage=False, prefix_cache=False,
+         max_new_tokens=DEFAULT_MAX_NEW_TOKENS, stop_after_answer=False, backend="auto", service=None):
+    """
+    Main function to execute the date and witness count extraction.
+
+    Args:
+        batch_size (int): Descriptions generated together; 1 keeps the row-by-row loop.
+        combined (bool): Extract both fields with one generation per description.
+        use_cache (bool): Reuse responses stored in the SQLite cache by earlier runs.
+        checkpoint_every (int): If above 0, journal finished rows every this many rows so a crashed run can resume.
+        triage (bool): Route only rows with date or number candidates to the model.
+        prefix_cache (bool): Reuse the key/value cache of the fixed prompt prefix for every row.
+        max_new_tokens (int): Cap on generated tokens per row (with prefix_cache).
+        stop_after_answer (bool): Stop generating once the answer is complete (with prefix_cache).
+        backend (str): Model backend, one of model_backends.BACKENDS.
+        service (str): host:port of a running inference service; its warm model replaces the local one
+            and its own backend and generation settings apply.
+    """
+    paths = define_paths()
+
+    # Load TSV
+    hp_df = assign_row_ids(pd.read_csv(paths["input_file"], sep="\t"))
+
+    if service:
+        pipe = ServicePipe(InferenceClient(service))
+    else:
+        pipe = load_model(backend, prefix_cache, max_new_tokens, stop_after_answer)
+
+    cache = open_cache(paths["cache_file"]) if use_cache else None
+
+    if checkpoint_every > 0:
+        haunted_place_date_list, witness_count_list = extract_checkpointed(
+            pipe, hp_df, paths["journal_file"], checkpoint_every, batch_size, combined, cache, triage
+        )
+    else:
+        haunted_place_date_list, witness_count_list = extract_rows(pipe, hp_df, batch_size, combined, cache, triage)
+
+    if cache is not None:
+        cache.close()
 
-for index, row in hp_df.iterrows():
-    if index % 10 == 0:  # Print progress every 10 rows
-        print(f"Processing row {index}/{len(hp_df)}")
+    # Add extracted data to DataFrame
+    hp_df['HP_date'] = haunted_place_date_list
+    hp_df['Witness_count'] = witness_count_list
 
-    date = date_extraction(row['description'])
-    witness_count = witness_count_extraction(row['description'])
+    # Save to processed directory
+    saved_path = write_table(hp_df, paths["output_file"])
+    print(f"File saved successfully: {saved_path}")
 
-    haunted_place_date_list.append(date)
-    witness_count_list.append(witness_count)
+    # The output is complete, so the journal is no longer needed
+    if checkpoint_every > 0 and os.path.exists(paths["journal_file"]):
+        os.remove(paths["journal_file"])
 
-# Add extracted data to DataFrame
-hp_df['HP_date'] = haunted_place_date_list
-hp_df['Witness_count'] = witness_count_list
 
-# Save to processed directory
-hp_df.to_csv(output_file, index=False)
-print(f"File saved successfully: {output_file}")
+# Execute Main Function
+if __name__ == "__main__":
+    args = parse_args()
+    main(batch_size=args.batch_size, combined=args.combined, use_cache=not args.no_cache,
+         checkpoint_every=args.checkpoint_every, triage=args.triage, prefix_cache=args.prefix_cache,
+         max_new_tokens=args.max_new_tokens, stop_after_answer=args.stop_after_answer, backend=args.backend,
+         service=args.service)
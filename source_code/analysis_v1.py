@@ -1,10 +1,15 @@
 import pandas as pd
 import os
-import re
-from number_parser import parse_number
-from datefinder import find_dates
-from dateutil import tz
-from nltk.stem import WordNetLemmatizer
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from keyword_matcher import build_keyword_index, match_keywords
+from date_extractor import extract_dates
+from witness_extractor import extract_witness_counts
+from lemma_index import update_lemma_table, lemma_subset
+from feature_cache import fingerprint, row_keys, load_cache, save_cache
+from process_haunted_data import assign_row_ids
+from table_io import write_table, remove_other_formats
+from schema import apply_schema
 
 
 # Step 1: Define Paths
@@ -24,6 +29,8 @@ def define_paths():
         "processed_dir": processed_dir,
         "input_file": os.path.join(data_dir, "haunted_places.tsv"),
         "output_file": os.path.join(processed_dir, "hp_analysis_v1.tsv"),
+        "cache_file": os.path.join(processed_dir, "hp_analysis_v1_cache.tsv"),
+        "lemma_file": os.path.join(processed_dir, "lemma_table.tsv"),
     }
     return paths
 
@@ -50,7 +57,34 @@ def load_data(file_path):
         print("Error: 'description' column missing in the dataset.")
         exit(1)
 
-    return df
+    # TSVs written before ingest assigned row ids get the same positional ids here
+    return apply_schema(assign_row_ids(df))
+
+
+# Step 2b: Load Data in Chunks
+def load_data_chunks(file_path, chunk_size):
+    """
+    Reads a TSV file as a stream of fixed-size DataFrame chunks.
+
+    Args:
+        file_path (str): The full path of the TSV file.
+        chunk_size (int): Number of rows per chunk.
+
+    Yields:
+        pd.DataFrame: The next chunk of rows.
+    """
+    if not os.path.exists(file_path):
+        print(f" Error: File not found at {os.path.abspath(file_path)}")
+        exit(1)
+
+    print(f" Streaming dataset: {file_path} ({chunk_size} rows per chunk)")
+    offset = 0
+    for chunk in pd.read_csv(file_path, sep="\t", chunksize=chunk_size):
+        if "description" not in chunk.columns:
+            print("Error: 'description' column missing in the dataset.")
+            exit(1)
+        yield apply_schema(assign_row_ids(chunk, start=offset))
+        offset += len(chunk)
 
 
 # Step 3: Define Keywords
@@ -84,6 +118,15 @@ witness_keywords = [
     "urban legend", "word of mouth", "locals whisper", "unverified reports", "rumors suggest"
 ]
 
+# Nouns a number must directly count to be read as a witness count ("three witnesses", "two young boys")
+witness_terms = [
+    "witness", "witnesses", "eyewitness", "eyewitnesses", "people", "persons", "individuals",
+    "men", "women", "boys", "girls", "children", "kids", "teens", "teenagers", "students",
+    "visitors", "guests", "tourists", "travelers", "workers", "employees", "staff", "residents",
+    "locals", "neighbors", "villagers", "townspeople", "friends", "campers", "hunters",
+    "officers", "guards", "investigators", "members", "patrons", "customers", "owners"
+]
+
 apparition_categories = {
     "Ghost": [
         "ghost", "apparition", "haunt", "presence", "disembodied", "phantom", "wraith",
@@ -303,131 +346,348 @@ time_keywords = {
 
 
 # Step 4: Feature Engineering Functions
-def contains_keywords(text, keywords):
-    """Returns True if any keyword appears in the text."""
-    if pd.isna(text):
-        return False
-    return any(re.search(rf"\b{keyword}\b", text, re.IGNORECASE) for keyword in keywords)
+# Compile every keyword table once into a single index so each description is scanned one time
+keyword_tables = {
+    "audio": audio_keywords,
+    "visual": visual_keywords,
+    "apparition": apparition_categories,
+    "event": event_keywords,
+    "time": time_keywords,
+}
+keyword_index = build_keyword_index(keyword_tables)
+all_keywords = [
+    keyword
+    for table in keyword_tables.values()
+    for keyword_list in (table.values() if isinstance(table, dict) else [table])
+    for keyword in keyword_list
+]
 
+keyword_feature_columns = ["Audio_Evidence", "Visual_Evidence", "Apparition_Type", "Event_Type", "Time_of_Day"]
 
-def extract_witness_count(text):
-    """Extracts witness count from text, detecting both digits and written numbers."""
-    if pd.isna(text) or text.strip() == "":
-        return 0
 
-    digit_numbers = [int(num) for num in re.findall(r'\b\d+\b', text)]
+def load_lemmas(texts, lemma_file, lemmas=None):
+    """
+    Returns the token -> lemma table covering the texts and every keyword, extending the file on disk if needed.
 
-    try:
-        word_number = parse_number(text)
-        if word_number is not None:
-            digit_numbers.append(int(word_number))
-    except:
-        pass
+    Args:
+        texts (iterable): Descriptions whose vocabulary must be covered.
+        lemma_file (str): Path to the lemma table TSV file.
+        lemmas (dict): An already loaded table to extend.
 
-    return max(digit_numbers) if digit_numbers else 0
+    Returns:
+        dict: token -> lemma.
+    """
+    return update_lemma_table(list(texts) + all_keywords, lemma_file, lemmas)
 
 
-def extract_apparition_type(text):
-    """Identifies apparition type from description using categorized keywords."""
+def extract_keyword_features(text, index=keyword_index, lemmas=None):
+    """
+    Computes every keyword-based feature from one scan of the text.
+
+    A category matches when any of its keywords occurs as re.search(rf"\b{keyword}\b", text.lower())
+    would find it. Categories are listed in definition order, and the first matching time period wins.
+
+    Args:
+        text (str): The description to analyze.
+        index (dict): The keyword index to match against.
+        lemmas (dict): The token -> lemma table the index was built with, for lemma matching.
+
+    Returns:
+        tuple: (Audio_Evidence, Visual_Evidence, Apparition_Type, Event_Type, Time_of_Day)
+    """
     if pd.isna(text):
-        return "Unknown"
+        return False, False, "Unknown", "Unknown", "Unknown"
 
-    text = text.lower()
-    matched_categories = set()
+    found = match_keywords(text, index, lemmas)
 
-    for category, keywords in apparition_categories.items():
-        if any(re.search(rf"\b{keyword}\b", text) for keyword in keywords):
-            matched_categories.add(category)
+    apparitions = [category for category in apparition_categories if ("apparition", category) in found]
+    events = [category for category in event_keywords if ("event", category) in found]
+    times = [time_period for time_period in time_keywords if ("time", time_period) in found]
 
-    return ", ".join(matched_categories) if matched_categories else "Unknown"
+    return (
+        ("audio", None) in found,
+        ("visual", None) in found,
+        ", ".join(apparitions) if apparitions else "Unknown",
+        ", ".join(events) if events else "Unknown",
+        times[0] if times else "Unknown",
+    )
 
 
-def extract_event_type(text):
-    """Extract event types from a given text by checking event keywords."""
-    if pd.isna(text):
-        return "Unknown"
+# Step 5: Apply Feature Engineering
+def apply_feature_engineering(df, lemmas=None, index=None):
+    """
+    Applies feature extraction on the dataset.
 
-    text = text.lower()
-    matched_categories = set()
+    Args:
+        df (pd.DataFrame): The DataFrame containing descriptions.
+        lemmas (dict): Optional token -> lemma table; when given, keywords are matched on lemmas,
+            so "screams" and "screamed" both match "scream".
+        index (dict): The keyword index built with lemmas; built here if None.
 
-    for category, keywords in event_keywords.items():
-        if any(re.search(rf"\b{keyword}\b", text) for keyword in keywords):
-            matched_categories.add(category)
+    Returns:
+        pd.DataFrame: The DataFrame enriched with new feature columns.
+    """
+    if index is None:
+        index = keyword_index if lemmas is None else build_keyword_index(keyword_tables, lemmas)
+    keyword_features = pd.DataFrame(
+        [extract_keyword_features(text, index, lemmas) for text in df["description"]],
+        index=df.index,
+        columns=keyword_feature_columns,
+    )
+
+    df["Audio_Evidence"] = keyword_features["Audio_Evidence"]
+    df["Visual_Evidence"] = keyword_features["Visual_Evidence"]
+    df["Witness_Count"] = extract_witness_counts(df["description"], witness_terms)
+    df["Apparition_Type"] = keyword_features["Apparition_Type"]
+    df["Event_Type"] = keyword_features["Event_Type"]
+    df["Time_of_Day"] = keyword_features["Time_of_Day"]
+    df["Haunted_Place_Date"] = extract_dates(df["description"])
 
-    return ", ".join(matched_categories) if matched_categories else "Unknown"
+    return df
 
 
-def extract_time_of_day(text):
-    """Identifies if the sighting happened in morning, afternoon, evening, or night."""
-    if pd.isna(text):
-        return "Unknown"
+# Step 5b: Apply Feature Engineering in Parallel
+# The keyword index of a worker process, set by init_worker
+worker_index = keyword_index
 
-    for time_period, keywords in time_keywords.items():
-        if any(re.search(rf"\b{keyword}\b", text, re.IGNORECASE) for keyword in keywords):
-            return time_period
-    return "Unknown"
 
+def init_worker(keyword_lemmas=None):
+    """
+    Builds the keyword index and warms up the parsers once per worker process so every shard reuses them.
 
-def extract_date(text):
-    """Extracts the latest date from text using datefinder, ensuring consistent timezone handling."""
-    if pd.isna(text):
-        return None
+    Args:
+        keyword_lemmas (dict): The lemmas of the keyword tokens for lemma matching, or None for exact matching.
+    """
+    global worker_index
+    if keyword_lemmas is not None:
+        worker_index = build_keyword_index(keyword_tables, keyword_lemmas)
 
-    matches = list(find_dates(text))
+    warm_up = pd.Series(["Three witnesses saw it on May 1, 1900."])
+    extract_witness_counts(warm_up, witness_terms)
+    extract_dates(warm_up)
 
-    processed_dates = []
-    for date in matches:
-        if date.tzinfo is not None:
-            date = date.astimezone(tz.UTC).replace(tzinfo=None)
-        processed_dates.append(date)
 
-    return max(processed_dates).strftime("%Y-%m-%d") if processed_dates else None
+def apply_feature_engineering_shard(df, lemmas=None):
+    """Runs apply_feature_engineering on one shard in a worker, with the index built by init_worker."""
+    return apply_feature_engineering(df, lemmas, worker_index)
 
 
-# Step 5: Apply Feature Engineering
-def apply_feature_engineering(df):
+def keyword_lemmas(lemmas):
+    """Returns the lemmas of the keyword tokens, all a keyword index needs, or None without lemmas."""
+    return None if lemmas is None else lemma_subset(lemmas, all_keywords)
+
+
+def apply_feature_engineering_parallel(df, workers, shards_per_worker=4, executor=None, lemmas=None):
     """
-    Applies feature extraction on the dataset.
+    Splits the dataset into row shards and runs apply_feature_engineering on them in a process pool.
 
     Args:
         df (pd.DataFrame): The DataFrame containing descriptions.
+        workers (int): Number of worker processes.
+        shards_per_worker (int): Shards handed to each worker, so slow shards balance out.
+        executor (ProcessPoolExecutor): An already running pool to reuse, started with
+            init_worker(keyword_lemmas(lemmas)); a new one is created if None.
+        lemmas (dict): Optional token -> lemma table for lemma matching. Each shard is sent only the
+            lemmas of its own descriptions.
 
     Returns:
-        pd.DataFrame: The DataFrame enriched with new feature columns.
+        pd.DataFrame: The DataFrame enriched with new feature columns, in the original row order.
     """
-    df["Audio_Evidence"] = df["description"].apply(lambda x: contains_keywords(x, audio_keywords))
-    df["Visual_Evidence"] = df["description"].apply(lambda x: contains_keywords(x, visual_keywords))
-    df["Witness_Count"] = df["description"].apply(extract_witness_count)
-    df["Apparition_Type"] = df["description"].apply(extract_apparition_type)
-    df["Event_Type"] = df["description"].apply(extract_event_type)
-    df["Time_of_Day"] = df["description"].apply(extract_time_of_day)
-    df["Haunted_Place_Date"] = df["description"].apply(extract_date)
+    if workers <= 1 or len(df) == 0:
+        return apply_feature_engineering(df, lemmas)
+
+    shard_count = min(len(df), workers * shards_per_worker)
+    shard_size = -(-len(df) // shard_count)
+    shards = [df.iloc[start:start + shard_size] for start in range(0, len(df), shard_size)]
+
+    shard_lemmas = [None if lemmas is None else lemma_subset(lemmas, shard["description"]) for shard in shards]
+    if executor is not None:
+        results = list(executor.map(apply_feature_engineering_shard, shards, shard_lemmas))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                 initargs=(keyword_lemmas(lemmas),)) as executor:
+            results = list(executor.map(apply_feature_engineering_shard, shards, shard_lemmas))
+
+    print(f" Processed {len(df)} rows in {len(shards)} shards on {workers} workers")
+    return pd.concat(results)
+
+
+# Step 5c: Apply Feature Engineering with a Persistent Cache
+# Bump whenever an extractor changes its output so cached rows are recomputed
+extractor_version = "5"
+
+feature_columns = [
+    "Audio_Evidence", "Visual_Evidence", "Witness_Count", "Apparition_Type",
+    "Event_Type", "Time_of_Day", "Haunted_Place_Date"
+]
+
+# Columns the extractors return as object with None for missing values (extract_dates), which the
+# cache would otherwise read back as strings with NaN
+object_feature_columns = ["Haunted_Place_Date"]
+
+feature_fingerprint = fingerprint(
+    extractor_version, audio_keywords, visual_keywords, witness_keywords, witness_terms,
+    apparition_categories, event_keywords, time_keywords
+)
 
+
+def apply_feature_engineering_cached(df, cache_file, workers=1, lemmas=None):
+    """
+    Applies feature extraction, reusing cached features for descriptions seen in earlier runs.
+
+    Rows are keyed on a hash of the description plus a fingerprint of the keyword tables and
+    extractor version, so editing a keyword list invalidates the cache automatically. Only new
+    or changed descriptions go through the extractors; the cache is then rewritten with the
+    entries of the current dataset.
+
+    Args:
+        df (pd.DataFrame): The DataFrame containing descriptions.
+        cache_file (str): Path to the cache TSV file.
+        workers (int): Number of worker processes used for uncached rows.
+        lemmas (dict): Optional token -> lemma table for lemma matching (cached separately).
+
+    Returns:
+        pd.DataFrame: The DataFrame enriched with new feature columns.
+    """
+    config_fingerprint = feature_fingerprint if lemmas is None else fingerprint(feature_fingerprint, "lemmas")
+    keys = row_keys(df["description"], config_fingerprint)
+    cache = load_cache(cache_file, feature_columns)
+    missing = ~keys.isin(cache.index)
+
+    if missing.any():
+        pending = df.loc[missing, ["description"]].assign(key=keys[missing]).drop_duplicates("key")
+        computed = apply_feature_engineering_parallel(pending[["description"]].copy(), workers, lemmas=lemmas)
+        computed.index = pd.Index(pending["key"].to_numpy(), name="key")
+        computed = computed[feature_columns]
+        cache = computed if cache.empty else pd.concat([cache, computed])
+
+    features = cache.reindex(keys).infer_objects()
+    for column in feature_columns:
+        values = features[column].to_numpy()
+        if column in object_feature_columns:
+            # Assigned as an object Series; a plain array would be inferred as strings again
+            values = pd.Series(values, index=df.index, dtype=object)
+            values = values.where(values.notna(), None)
+        df[column] = values
+
+    print(f" Feature cache: {int((~missing).sum())} hits, {int(missing.sum())} misses")
+    save_cache(cache.loc[keys.unique()], cache_file)
     return df
 
 
 # Step 6: Save Data
 def save_data(df, file_path):
     """
-    Saves the DataFrame as a TSV file.
+    Saves the DataFrame in the processed table format (Parquet, or TSV without pyarrow).
 
     Args:
         df (pd.DataFrame): The DataFrame to save.
-        file_path (str): The path where the TSV file should be saved.
+        file_path (str): The path where the table should be saved; the extension follows the format.
+    """
+    saved_path = write_table(df, file_path)
+    print(f" Feature engineering completed! Enriched dataset saved at: {saved_path}")
+
+
+# Step 6b: Stream Feature Engineering Chunk by Chunk
+def append_data(df, file_path, header):
+    """
+    Appends a chunk of rows to a TSV file so completed rows are visible immediately.
+
+    Args:
+        df (pd.DataFrame): The chunk to write.
+        file_path (str): The path of the TSV file.
+        header (bool): Write the header row (first chunk only); the file is truncated first and a
+            Parquet copy from an earlier run is deleted.
+    """
+    if header:
+        remove_other_formats(file_path, "tsv")
+    df.to_csv(file_path, sep="\t", index=False, mode="w" if header else "a", header=header)
+
+
+def stream_feature_engineering(input_file, output_file, chunk_size, workers=1, lemma_file=None):
     """
-    df.to_csv(file_path, sep="\t", index=False)
-    print(f" Feature engineering completed! Enriched dataset saved at: {file_path}")
+    Runs feature engineering chunk by chunk, appending each enriched chunk to the output TSV.
+
+    Memory stays bounded by the chunk size regardless of the input size.
+
+    Args:
+        input_file (str): Path of the input TSV file.
+        output_file (str): Path of the output TSV file.
+        chunk_size (int): Number of rows per chunk.
+        workers (int): Number of worker processes; one pool is reused for every chunk.
+        lemma_file (str): If set, match keywords on lemmas, extending this lemma table chunk by chunk.
+    """
+    # The keyword lemmas never change between chunks, so the workers build the lemma index once
+    lemmas = load_lemmas([], lemma_file) if lemma_file else None
+    executor = None
+    if workers > 1:
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                       initargs=(keyword_lemmas(lemmas),))
+    total_rows = 0
+
+    try:
+        for chunk_number, chunk in enumerate(load_data_chunks(input_file, chunk_size)):
+            if lemma_file:
+                lemmas = load_lemmas(chunk["description"], lemma_file, lemmas)
+            chunk = apply_feature_engineering_parallel(chunk, workers, executor=executor, lemmas=lemmas)
+            append_data(chunk, output_file, header=chunk_number == 0)
+            total_rows += len(chunk)
+            print(f" Chunk {chunk_number + 1}: {total_rows} rows written to {output_file}")
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    print(f" Feature engineering completed! Enriched dataset saved at: {output_file}")
+
+
+# Command-Line Arguments
+def parse_args():
+    """
+    Parses the command-line options for the feature engineering run.
+
+    Returns:
+        argparse.Namespace: The parsed options.
+    """
+    parser = argparse.ArgumentParser(description="Feature engineering for the haunted places dataset.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Number of worker processes; 1 runs everything in this process.")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Recompute every row instead of reusing the feature cache.")
+    parser.add_argument("--chunk-size", type=int, default=None,
+                        help="Stream the input in chunks of this many rows (the feature cache is not used).")
+    parser.add_argument("--lemmatize", action="store_true",
+                        help="Match keywords on lemmas using the token -> lemma table in data/processed.")
+    return parser.parse_args()
 
 
 # Main Function
-def main():
-    """Main function to execute the feature engineering process."""
+def main(workers=1, use_cache=True, chunk_size=None, lemmatize=False):
+    """
+    Main function to execute the feature engineering process.
+
+    Args:
+        workers (int): Number of worker processes used for feature extraction.
+        use_cache (bool): Reuse features cached by earlier runs for unchanged descriptions.
+        chunk_size (int): If set, stream the input in chunks of this many rows instead of loading it whole.
+        lemmatize (bool): Match keywords on lemmas instead of exact inflections.
+    """
     paths = define_paths()
+    lemma_file = paths["lemma_file"] if lemmatize else None
+    if chunk_size:
+        stream_feature_engineering(paths["input_file"], paths["output_file"], chunk_size, workers, lemma_file)
+        return
+
     df = load_data(paths["input_file"])
-    df = apply_feature_engineering(df)
+    lemmas = load_lemmas(df["description"], lemma_file) if lemmatize else None
+    if use_cache:
+        df = apply_feature_engineering_cached(df, paths["cache_file"], workers, lemmas)
+    else:
+        df = apply_feature_engineering_parallel(df, workers, lemmas=lemmas)
     save_data(df, paths["output_file"])
 
 
 # Execute Main Function
 if __name__ == "__main__":
-    main()
+    args = parse_args()
+    main(workers=args.workers, use_cache=not args.no_cache, chunk_size=args.chunk_size,
+         lemmatize=args.lemmatize)
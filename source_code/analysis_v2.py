@@ -1,5 +1,7 @@
 import os
+import numpy as np
 import pandas as pd
+from table_io import read_table, write_table, table_columns, table_exists
 
 # Step 1: Define Paths
 def define_paths():
@@ -20,7 +22,41 @@ def define_paths():
     return paths
 
 
-# Step 2: Merge, Format, and Clean Data
+# Step 2a: Attach the Extracted Fields to the Analysis Rows
+def attach_extracted_columns(analysis_df, extracted_df, columns):
+    """
+    Adds the extracted columns to the analysis rows, matched by the row_id assigned at ingest.
+
+    When both files hold the same row ids in the same order the columns are copied by position;
+    otherwise they are joined on the integer row_id. Files written before row ids existed fall back
+    to the description, keeping one extraction per description so rows are never duplicated.
+
+    Args:
+        analysis_df (pd.DataFrame): Rows of hp_analysis_v1.tsv.
+        extracted_df (pd.DataFrame): Rows of hp_with_date_and_witness_count.tsv.
+        columns (list): Columns of extracted_df to attach.
+
+    Returns:
+        pd.DataFrame: analysis_df with the extracted columns, one row per analysis row.
+    """
+    if "row_id" in analysis_df.columns and "row_id" in extracted_df.columns:
+        if len(analysis_df) == len(extracted_df) and np.array_equal(
+            analysis_df["row_id"].to_numpy(), extracted_df["row_id"].to_numpy()
+        ):
+            for column in columns:
+                analysis_df[column] = extracted_df[column].to_numpy()
+            return analysis_df
+
+        return pd.merge(analysis_df, extracted_df[["row_id"] + columns], on="row_id", how="left",
+                        validate="many_to_one")
+
+    print("Warning: 'row_id' missing, merging on 'description' instead.")
+    extracted_df = extracted_df.drop_duplicates("description")
+    return pd.merge(analysis_df, extracted_df[["description"] + columns], on="description", how="left",
+                    validate="many_to_one")
+
+
+# Step 2b: Merge, Format, and Clean Data
 def merge_and_clean_data(file1_path, file2_path, output_path):
     """
     Merges only the 'HP_date' and 'Witness_count' columns from hp_with_date_and_witness_count.tsv
@@ -32,12 +68,15 @@ def merge_and_clean_data(file1_path, file2_path, output_path):
         file2_path (str): Path to the second TSV file.
         output_path (str): Path to save the merged and cleaned TSV file.
     """
-    if not os.path.exists(file1_path) or not os.path.exists(file2_path):
+    if not table_exists(file1_path) or not table_exists(file2_path):
         print("Error: One or both input files are missing.")
         return
 
-    df1 = pd.read_csv(file1_path, sep="\t")
-    df2 = pd.read_csv(file2_path, sep="\t")
+    # Only the key and the two extracted columns are read from the extraction output
+    extracted_columns = [col for col in table_columns(file1_path)
+                         if col.strip() in ("row_id", "description", "HP_date", "Witness_count")]
+    df1 = read_table(file1_path, columns=extracted_columns)
+    df2 = read_table(file2_path)
 
     # Print column names for debugging
     print("Columns in hp_with_date_and_witness_count.tsv:", df1.columns.tolist())
@@ -48,18 +87,16 @@ def merge_and_clean_data(file1_path, file2_path, output_path):
     df2.columns = df2.columns.str.strip()
 
     # Ensure the required columns exist
-    required_columns = ["description", "HP_date", "Witness_count"]
+    key_column = "row_id" if "row_id" in df1.columns else "description"
+    required_columns = [key_column, "HP_date", "Witness_count"]
     missing_columns = [col for col in required_columns if col not in df1.columns]
 
     if missing_columns:
         print(f"Error: Missing columns in hp_with_date_and_witness_count.tsv -> {missing_columns}")
         return
 
-    # Keep only 'description', 'HP_date', and 'Witness_count'
-    df1_selected = df1[["description", "HP_date", "Witness_count"]]
-
-    # Merge only these columns into df2
-    merged_df = pd.merge(df2, df1_selected, on="description", how="left")
+    # Attach only 'HP_date' and 'Witness_count' to df2
+    merged_df = attach_extracted_columns(df2, df1, ["HP_date", "Witness_count"])
 
     # Step 3: Remove Unwanted Columns
     columns_to_remove = ["Haunted_Place_Date", "Witness_Count"]
@@ -78,9 +115,9 @@ def merge_and_clean_data(file1_path, file2_path, output_path):
     # Step 7: Rename 'HP_date' to 'Haunted_Place_Date' and 'Witness_count' to 'Witness_Count'
     merged_df = merged_df.rename(columns={"HP_date": "Haunted_Place_Date", "Witness_count": "Witness_Count"})
 
-    # Save to new TSV file
-    merged_df.to_csv(output_path, sep="\t", index=False)
-    print(f"Merged and cleaned TSV file saved at: {os.path.abspath(output_path)}")
+    # Save the merged table
+    saved_path = write_table(merged_df, output_path)
+    print(f"Merged and cleaned file saved at: {os.path.abspath(saved_path)}")
 
 
 # Main Function
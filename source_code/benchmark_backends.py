@@ -0,0 +1,187 @@
+import os
+import time
+import argparse
+import multiprocessing
+import pandas as pd
+from model_backends import BACKENDS, peak_rss_mb
+from table_io import read_table
+
+label_columns = ["HP_date", "Witness_count"]
+
+
+# Step 1: Define Paths
+def define_paths():
+    """
+    Defines the relative paths for the labeled sample and the benchmark report.
+
+    Returns:
+        dict: A dictionary containing paths for the labeled table and the report CSV file.
+    """
+    data_dir = os.path.join("..", "data")
+    processed_dir = os.path.join(data_dir, "processed")
+
+    # Ensure the processed directory exists
+    os.makedirs(processed_dir, exist_ok=True)
+
+    paths = {
+        # Stored as Parquet or TSV by analysis_dates_witness.py; read_table finds either
+        "labeled_file": os.path.join(processed_dir, "hp_with_date_and_witness_count"),
+        "report_file": os.path.join(processed_dir, "backend_benchmark.csv"),
+    }
+    return paths
+
+
+# Step 2: Load the Labeled Sample
+def load_sample(file_path, rows, seed):
+    """
+    Draws a reproducible sample of labeled descriptions.
+
+    Args:
+        file_path (str): Table (Parquet, TSV or CSV) with a description column and, optionally,
+            HP_date/Witness_count labels.
+        rows (int): Number of rows to sample.
+        seed (int): Random seed for the sample.
+
+    Returns:
+        pd.DataFrame: The sampled rows.
+    """
+    try:
+        # Read as strings so labels such as "N/A" or "3" compare exactly with model answers
+        df = read_table(file_path, as_text=True)
+    except FileNotFoundError:
+        print(f"Error: File not found - {file_path}")
+        exit(1)
+
+    return df.sample(n=min(rows, len(df)), random_state=seed).reset_index(drop=True)
+
+
+# Step 3: Run One Backend in Its Own Process
+def run_backend(backend, sample, batch_size, combined):
+    """
+    Loads the model on a backend and extracts both fields for every sampled row.
+
+    Runs in a fresh child process so the peak RSS belongs to this backend alone.
+
+    Args:
+        backend (str): One of model_backends.BACKENDS.
+        sample (pd.DataFrame): The sampled rows.
+        batch_size (int): Number of prompts generated together.
+        combined (bool): Extract both fields with one generation per description.
+
+    Returns:
+        dict: Predictions, load and extraction time, and peak RSS.
+    """
+    from analysis_dates_witness import load_model, extract_rows
+
+    started_at = time.time()
+    pipe = load_model(backend)
+    load_seconds = time.time() - started_at
+
+    started_at = time.time()
+    dates, counts = extract_rows(pipe, sample, batch_size, combined)
+    seconds = time.time() - started_at
+
+    return {
+        "HP_date": dates,
+        "Witness_count": counts,
+        "load_seconds": load_seconds,
+        "seconds": seconds,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+# Step 4: Compare the Backends
+def agreement(predicted, expected):
+    """Returns the share of rows whose answers match exactly."""
+    if not expected:
+        return float("nan")
+    return sum(str(p).strip() == str(e).strip() for p, e in zip(predicted, expected)) / len(expected)
+
+
+def build_report(sample, results, reference):
+    """
+    Summarizes speed, memory and exact-match agreement for every backend.
+
+    Args:
+        sample (pd.DataFrame): The sampled rows with their labels.
+        results (dict): backend -> result of run_backend.
+        reference (str): Backend the others are compared against.
+
+    Returns:
+        pd.DataFrame: One row per backend.
+    """
+    report = []
+    for backend, result in results.items():
+        row = {
+            "backend": backend,
+            "rows_per_sec": len(sample) / result["seconds"] if result["seconds"] else float("nan"),
+            "load_seconds": result["load_seconds"],
+            "peak_rss_mb": result["peak_rss_mb"],
+        }
+        for column in label_columns:
+            if column in sample.columns:
+                row[f"{column}_vs_labels"] = agreement(result[column], sample[column].tolist())
+            row[f"{column}_vs_{reference}"] = agreement(result[column], results[reference][column])
+        report.append(row)
+
+    return pd.DataFrame(report)
+
+
+# Command-Line Arguments
+def parse_args():
+    """
+    Parses the command-line options for the benchmark.
+
+    Returns:
+        argparse.Namespace: The parsed options.
+    """
+    parser = argparse.ArgumentParser(description="Compare model backends on a labeled sample.")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=["cpu-fp32", "cpu-int8"],
+                        help="Backends to benchmark; the first one is the reference for agreement.")
+    parser.add_argument("--rows", type=int, default=100, help="Number of labeled rows to sample.")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the sample.")
+    parser.add_argument("--batch-size", type=int, default=1, help="Descriptions generated together.")
+    parser.add_argument("--combined", action="store_true",
+                        help="Extract the date and witness count with one generation per description.")
+    parser.add_argument("--labeled-file", default=None,
+                        help="Table with descriptions and HP_date/Witness_count labels (defaults to the last full run).")
+    return parser.parse_args()
+
+
+# Main Function
+def main(backends=("cpu-fp32", "cpu-int8"), rows=100, seed=0, batch_size=1, combined=False, labeled_file=None):
+    """
+    Main function to benchmark the model backends.
+
+    Args:
+        backends (list): Backends to benchmark; the first one is the reference.
+        rows (int): Number of labeled rows to sample.
+        seed (int): Random seed for the sample.
+        batch_size (int): Descriptions generated together.
+        combined (bool): Extract both fields with one generation per description.
+        labeled_file (str): Optional labeled table; defaults to the output of analysis_dates_witness.py.
+    """
+    paths = define_paths()
+    sample = load_sample(labeled_file or paths["labeled_file"], rows, seed)
+    print(f"Benchmarking {', '.join(backends)} on {len(sample)} rows")
+
+    # A fresh process per backend keeps model memory and peak RSS from leaking between runs
+    context = multiprocessing.get_context("spawn")
+    results = {}
+    for backend in backends:
+        print(f"Running backend {backend}")
+        with context.Pool(1) as pool:
+            results[backend] = pool.apply(run_backend, (backend, sample, batch_size, combined))
+
+    report = build_report(sample, results, reference=backends[0])
+    print(report.to_string(index=False, float_format=lambda value: f"{value:.3f}"))
+
+    report.to_csv(paths["report_file"], index=False)
+    print(f"File saved successfully: {paths['report_file']}")
+
+
+# Execute Main Function
+if __name__ == "__main__":
+    args = parse_args()
+    main(backends=args.backends, rows=args.rows, seed=args.seed, batch_size=args.batch_size,
+         combined=args.combined, labeled_file=args.labeled_file)
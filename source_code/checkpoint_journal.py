@@ -0,0 +1,78 @@
+import os
+import json
+
+
+# Step 1: Start or Resume a Journal
+def load_journal(file_path, run_fingerprint):
+    """
+    Loads the rows committed to a journal by an earlier, interrupted run.
+
+    The first line of the journal records the fingerprint of the run that wrote it. A journal
+    written for different input or settings is ignored, and a line cut off by a crash is skipped.
+
+    Args:
+        file_path (str): Path to the JSON-lines journal.
+        run_fingerprint (str): Fingerprint of the current input and settings.
+
+    Returns:
+        dict: row position -> committed record (empty if there is nothing to resume).
+    """
+    if not os.path.exists(file_path):
+        return {}
+
+    records = {}
+    with open(file_path, encoding="utf-8") as f:
+        try:
+            header = json.loads(f.readline())
+        except ValueError:
+            return {}
+        if header.get("fingerprint") != run_fingerprint:
+            print(f"Journal {file_path} belongs to a different run, starting over")
+            return {}
+
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            records[record["row"]] = record
+
+    return records
+
+
+def start_journal(file_path, run_fingerprint, records=()):
+    """
+    Starts the journal of a run, keeping the rows already committed by an earlier run.
+
+    The new journal is written next to the old one and then replaces it, so a crash while
+    restarting leaves either the old or the new journal, never an emptied one.
+
+    Args:
+        file_path (str): Path to the JSON-lines journal.
+        run_fingerprint (str): Fingerprint of the current input and settings.
+        records (list): Rows from load_journal to carry over, in row order.
+    """
+    temp_path = file_path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        f.write(json.dumps({"fingerprint": run_fingerprint}) + "\n")
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, file_path)
+
+
+# Step 2: Commit Completed Rows
+def append_journal(file_path, records):
+    """
+    Appends completed rows to the journal and forces them to disk.
+
+    Args:
+        file_path (str): Path to the JSON-lines journal.
+        records (list): Dicts with a "row" key plus the extracted fields.
+    """
+    with open(file_path, "a", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
@@ -0,0 +1,120 @@
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+# Results of local nodes that finished before the pool started its workers. Forked workers
+# inherit this dict, so large inputs such as the fact table reach them without being pickled.
+inherited_results = {}
+
+
+# Step 1: Time a Node
+def timed_call(func, *args):
+    """
+    Calls func(*args) and measures its wall time.
+
+    Returns:
+        tuple: (result, seconds).
+    """
+    started_at = time.time()
+    result = func(*args)
+    return result, time.time() - started_at
+
+
+def call_node(func, args, inputs):
+    """
+    Runs a node in a pool worker, reading inherited inputs from inherited_results.
+
+    Args:
+        func (callable): The node function.
+        args (tuple): Leading positional arguments.
+        inputs (list): (node name, inherited, value) triples; inherited results are read from inherited_results.
+
+    Returns:
+        tuple: (result, seconds).
+    """
+    values = [inherited_results[name] if inherited else value for name, inherited, value in inputs]
+    return timed_call(func, *args, *values)
+
+
+# Step 2: Run the Graph
+def run_dag(nodes, workers=None):
+    """
+    Runs a graph of tasks, starting every node as soon as the nodes it depends on have finished.
+
+    Each node is a dict with:
+        "func": a picklable top-level function,
+        "args": leading positional arguments,
+        "deps": names of the nodes whose results are passed after args, in order,
+        "local": optional; run in this process instead of the pool (for cheap nodes or
+                 nodes whose inputs or result are too large to ship between processes).
+
+    With the fork start method, results of local nodes that finish before the first pool node is
+    submitted are inherited by the workers instead of being pickled to them.
+
+    Args:
+        nodes (dict): node name -> node spec.
+        workers (int): Size of the process pool; None uses one process per CPU.
+
+    Returns:
+        tuple: (results, timings) as dicts keyed by node name; timings hold wall seconds.
+    """
+    for name, node in nodes.items():
+        unknown = [dep for dep in node.get("deps", []) if dep not in nodes]
+        if unknown:
+            raise ValueError(f"Node '{name}' depends on unknown nodes {unknown}")
+
+    results, timings = {}, {}
+    pending = dict(nodes)
+    running = {}
+
+    # A fork-based pool starts its workers on the first submit, after the first local nodes ran
+    context = multiprocessing.get_context()
+    can_inherit = context.get_start_method() == "fork"
+    inherited_results.clear()
+    submitted = False
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+        while pending or running:
+            ready = [name for name, node in pending.items() if all(dep in results for dep in node.get("deps", []))]
+            for name in ready:
+                node = pending.pop(name)
+                if node.get("local"):
+                    inputs = [results[dep] for dep in node.get("deps", [])]
+                    results[name], timings[name] = timed_call(node["func"], *node.get("args", ()), *inputs)
+                    if can_inherit and not submitted:
+                        inherited_results[name] = results[name]
+                else:
+                    inputs = [
+                        (dep, True, None) if dep in inherited_results else (dep, False, results[dep])
+                        for dep in node.get("deps", [])
+                    ]
+                    future = executor.submit(call_node, node["func"], node.get("args", ()), inputs)
+                    running[future] = name
+                    submitted = True
+
+            if not running:
+                if pending and not ready:
+                    raise ValueError(f"Nodes {sorted(pending)} can never run: their dependencies form a cycle")
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                results[name], timings[name] = future.result()
+
+    return results, timings
+
+
+# Step 3: Report Node Timings
+def print_timings(timings, wall_seconds):
+    """
+    Prints the wall time of every node next to the end-to-end time.
+
+    Args:
+        timings (dict): node name -> seconds, as returned by run_dag.
+        wall_seconds (float): End-to-end wall time of the run.
+    """
+    width = max(len(name) for name in timings)
+    for name, seconds in sorted(timings.items(), key=lambda item: -item[1]):
+        print(f" {name:<{width}}  {seconds:7.2f}s")
+    print(f" {'total':<{width}}  {wall_seconds:7.2f}s wall, {sum(timings.values()):.2f}s summed over nodes")
@@ -0,0 +1,114 @@
+import re
+from functools import lru_cache
+import pandas as pd
+from datefinder import DateFinder
+from datefinder.constants import MONTHS_PATTERN, DAYS_PATTERN
+from dateutil import tz
+
+
+# Century and decade phrases ("the 19th century", "the nineteenth century", "the sixties")
+ERA_PATTERN = r"\bcentur(?:y|ies)\b|\b(?:twenties|thirties|forties|fifties|sixties|seventies|eighties|nineties)\b"
+
+# datefinder only yields a date from a span holding a digit, a month or a weekday token, and its
+# regex finds these names inside words too ("mansion, decent" is read as December). Matching them
+# as substrings the same way flags every text datefinder.find_dates can date, so skipping the rest
+# keeps Haunted_Place_Date identical.
+DATE_CANDIDATE_PATTERN = re.compile(rf"\d|{MONTHS_PATTERN}|{DAYS_PATTERN}", re.IGNORECASE)
+
+# Opt-in stricter mode: names only count as whole words, plus century and decade phrases. Far fewer
+# descriptions become candidates, but dates datefinder reads from inside words are dropped.
+WHOLE_WORD_CANDIDATE_PATTERN = re.compile(
+    rf"\d|\b(?:{MONTHS_PATTERN}|{DAYS_PATTERN})\b|{ERA_PATTERN}", re.IGNORECASE
+)
+
+date_finder = DateFinder()
+
+
+# Step 1: Vectorized Prefilter
+def candidate_pattern(whole_words):
+    """Returns the prefilter regex of the baseline or the whole-word mode."""
+    return WHOLE_WORD_CANDIDATE_PATTERN if whole_words else DATE_CANDIDATE_PATTERN
+
+
+def has_date_candidates(texts, whole_words=False):
+    """
+    Flags the texts that may contain a date, using one vectorized regex pass.
+
+    Args:
+        texts (pd.Series): The texts to check.
+        whole_words (bool): Only count month and weekday names that are whole words.
+
+    Returns:
+        pd.Series: Boolean mask, False for missing texts and texts datefinder cannot match.
+    """
+    pattern = candidate_pattern(whole_words)
+    return texts.astype("string").str.contains(pattern).fillna(False).astype(bool)
+
+
+# Step 2: Memoized Span Parsing
+@lru_cache(maxsize=65536)
+def parse_date_span(date_string, timezones):
+    """
+    Parses one candidate span with datefinder and normalizes it to naive UTC.
+
+    Args:
+        date_string (str): The span extracted by datefinder.
+        timezones (tuple): Timezone tokens captured in the span.
+
+    Returns:
+        datetime.datetime: The parsed date, or None if the span is not a date.
+    """
+    date = date_finder.parse_date_string(date_string, {"timezones": list(timezones)})
+    if date is not None and date.tzinfo is not None:
+        date = date.astimezone(tz.UTC).replace(tzinfo=None)
+    return date
+
+
+# Step 3: Staged Extraction
+def extract_date_fast(text, whole_words=False):
+    """
+    Extracts the latest date from text, parsing only the spans datefinder extracts.
+
+    Gives the same result as running datefinder.find_dates over the whole text; identical spans
+    across descriptions are parsed once. In whole-word mode a span only counts when it holds a digit
+    or a whole month or weekday name, so "mansion, decent" is not read as December.
+
+    Args:
+        text (str): The description to analyze.
+        whole_words (bool): Ignore dates datefinder reads from names inside words.
+
+    Returns:
+        str: The latest date as YYYY-MM-DD, or None if no date is found.
+    """
+    if pd.isna(text):
+        return None
+
+    tokens = [match.span() for match in WHOLE_WORD_CANDIDATE_PATTERN.finditer(text)] if whole_words else None
+
+    processed_dates = []
+    for date_string, (start, end), captures in date_finder.extract_date_strings(text):
+        if whole_words and not any(start <= token_start and token_end <= end for token_start, token_end in tokens):
+            continue
+        date = parse_date_span(date_string, tuple(captures.get("timezones", [])))
+        if date is not None:
+            processed_dates.append(date)
+
+    return max(processed_dates).strftime("%Y-%m-%d") if processed_dates else None
+
+
+def extract_dates(texts, whole_words=False):
+    """
+    Extracts the latest date for every text, running the parser only on prefiltered candidates.
+
+    Args:
+        texts (pd.Series): The descriptions to analyze.
+        whole_words (bool): Opt into the stricter whole-word mode of extract_date_fast.
+
+    Returns:
+        pd.Series: object dtype, YYYY-MM-DD strings and None where no date is found, aligned with texts.
+    """
+    dates = pd.Series([None] * len(texts), index=texts.index, dtype=object)
+    candidates = has_date_candidates(texts, whole_words).to_numpy()
+    # A list keeps None for dateless candidates; a mapped Series would turn them into NaN
+    dates[candidates] = [extract_date_fast(text, whole_words) for text in texts[candidates]]
+    return dates
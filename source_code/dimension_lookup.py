@@ -0,0 +1,269 @@
+import numpy as np
+import pandas as pd
+
+# What a join does when a key occurs in more than one dimension row matched by the fact table:
+# keep the first such row, let the fact rows multiply, or raise
+DUPLICATE_KEY_POLICIES = ("dedupe", "allow", "refuse")
+
+
+# Step 1: Index a Small Dimension Table by Its Keys
+def build_key_index(dim_df, keys):
+    """
+    Builds a hash index from the key values of a dimension table to its row positions.
+
+    Args:
+        dim_df (pd.DataFrame): The dimension table.
+        keys (list): Key column names.
+
+    Returns:
+        pd.Index: The key index, or None if a key value occurs more than once.
+    """
+    if len(keys) == 1:
+        key_index = pd.Index(dim_df[keys[0]])
+    else:
+        key_index = pd.MultiIndex.from_frame(dim_df[keys])
+
+    return key_index if key_index.is_unique else None
+
+
+# Step 2: Map Fact Keys to Dimension Row Positions
+def lookup_positions(key_index, fact_df, keys):
+    """
+    Finds the dimension row matching each fact row.
+
+    Args:
+        key_index (pd.Index): Index returned by build_key_index.
+        fact_df (pd.DataFrame): The fact table.
+        keys (list): Fact key column names, in the order of the index keys.
+
+    Returns:
+        np.ndarray: Dimension row position per fact row, -1 where nothing matches.
+    """
+    if len(keys) > 1:
+        return key_index.get_indexer(pd.MultiIndex.from_frame(fact_df[keys]))
+
+    column = fact_df[keys[0]]
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        # Look up each category once and broadcast through the codes; code -1 is a missing key
+        category_positions = np.append(
+            key_index.get_indexer(column.cat.categories), key_index.get_indexer([np.nan])
+        )
+        return category_positions[column.cat.codes.to_numpy()]
+    return key_index.get_indexer(column)
+
+
+# Step 3: Plan Joins on Duplicated Dimension Keys
+def plan_duplicate_keys(fact_df, dim_df, left_keys, right_keys, duplicate_keys="dedupe", name="join"):
+    """
+    Estimates how many rows a left join produces when dimension keys repeat, and applies the policy.
+
+    Every fact row matching a key that occurs k times in the dimension becomes k rows. The count is
+    exact and only needs the dimension's distinct keys and one lookup per fact row.
+
+    Args:
+        fact_df (pd.DataFrame): The large left table.
+        dim_df (pd.DataFrame): The small right table, with duplicated keys.
+        left_keys (list): Key columns of fact_df.
+        right_keys (list): Key columns of dim_df.
+        duplicate_keys (str): One of DUPLICATE_KEY_POLICIES.
+        name (str): Join name used in messages.
+
+    Returns:
+        pd.DataFrame: The dimension table to join, without duplicated keys unless they are allowed.
+
+    Raises:
+        ValueError: If duplicate_keys is "refuse" and the join would multiply fact rows.
+    """
+    if duplicate_keys not in DUPLICATE_KEY_POLICIES:
+        raise ValueError(f"duplicate_keys must be one of {DUPLICATE_KEY_POLICIES}, not {duplicate_keys!r}")
+
+    groups = dim_df.groupby(right_keys, dropna=False, sort=False, observed=True).ngroup().to_numpy()
+    first = ~dim_df.duplicated(subset=right_keys, keep="first").to_numpy()
+    unique_dim = dim_df[first]
+    key_counts = np.bincount(groups)[groups[first]]
+
+    positions = lookup_positions(build_key_index(unique_dim, right_keys), fact_df, left_keys)
+    matches = np.where(positions >= 0, key_counts[np.maximum(positions, 0)], 1)
+    rows_in, estimated_rows = len(fact_df), int(matches.sum())
+    if estimated_rows == rows_in:
+        # No fact row matches a repeated key, so keeping the first rows changes nothing
+        return unique_dim
+
+    repeated = int((key_counts > 1).sum())
+    if duplicate_keys == "refuse":
+        raise ValueError(f"{name}: {repeated} keys occur more than once in the dimension table, "
+                         f"the join would grow {rows_in} rows to {estimated_rows}")
+    if duplicate_keys == "allow":
+        print(f"Warning: {name}: {repeated} keys occur more than once, growing {rows_in} rows to {estimated_rows}.")
+        return dim_df
+    print(f"Warning: {name}: {repeated} keys occur more than once, keeping the first row of each "
+          f"instead of growing {rows_in} rows to {estimated_rows}.")
+    return unique_dim
+
+
+def log_rows(name, rows_in, rows_out):
+    """Prints the row counts of one join, so an unexpected fan-out shows up in the run log."""
+    if name is not None:
+        print(f" {name}: {rows_in} rows in, {rows_out} rows out")
+
+
+# Step 4: Attach the Dimension Columns
+def lookup_merge(fact_df, dim_df, on=None, left_on=None, right_on=None, suffixes=("_x", "_y"),
+                 duplicate_keys="dedupe", name=None):
+    """
+    Left-joins a small dimension table onto a large fact table by key lookup.
+
+    With unique dimension keys this gives the same result as pd.merge(fact_df, dim_df, how="left", ...):
+    the same rows in the same order, the same column names and suffixes, and the same dtypes, except
+    that a categorical key taken from the fact table stays categorical where pd.merge falls back to
+    strings for keys with different categories.
+
+    Instead of hashing and sorting the fact table, each fact key is looked up once in an index over
+    the dimension keys and the dimension columns are gathered with a vectorized take. Repeated
+    dimension keys are handled by plan_duplicate_keys; only an allowed fan-out goes through pd.merge.
+
+    Args:
+        fact_df (pd.DataFrame): The large left table.
+        dim_df (pd.DataFrame): The small right table.
+        on (str or list): Key columns present in both tables.
+        left_on (str or list): Key columns of fact_df, when the names differ.
+        right_on (str or list): Key columns of dim_df, when the names differ.
+        suffixes (tuple): Suffixes for overlapping non-key column names.
+        duplicate_keys (str): What to do with repeated dimension keys, one of DUPLICATE_KEY_POLICIES.
+        name (str): Join name; if given, the rows in and out are printed.
+
+    Returns:
+        pd.DataFrame: The merged table.
+    """
+    left_keys = [on] if isinstance(on, str) else on or ([left_on] if isinstance(left_on, str) else left_on)
+    right_keys = [on] if isinstance(on, str) else on or ([right_on] if isinstance(right_on, str) else right_on)
+
+    key_index = build_key_index(dim_df, right_keys)
+    if key_index is None:
+        dim_df = plan_duplicate_keys(fact_df, dim_df, left_keys, right_keys, duplicate_keys, name or "join")
+        key_index = build_key_index(dim_df, right_keys)
+
+    if key_index is None:
+        if on is not None:
+            merged_df = pd.merge(fact_df, dim_df, on=on, how="left", suffixes=suffixes)
+        else:
+            merged_df = pd.merge(fact_df, dim_df, left_on=left_on, right_on=right_on, how="left", suffixes=suffixes)
+    else:
+        positions = lookup_positions(key_index, fact_df, left_keys)
+
+        # Keys joined with on= appear once, taken from the fact table
+        shared_keys = set(left_keys) if on is not None else set()
+        merged_df = attach_at_positions(fact_df, dim_df, positions, shared_keys, suffixes)
+
+    log_rows(name, len(fact_df), len(merged_df))
+    return merged_df
+
+
+def attach_at_positions(fact_df, dim_df, positions, shared_keys, suffixes=("_x", "_y")):
+    """
+    Appends the dimension row at each position to the matching fact row.
+
+    Args:
+        fact_df (pd.DataFrame): The large left table.
+        dim_df (pd.DataFrame): The small right table.
+        positions (np.ndarray): Dimension row position per fact row, -1 where nothing matches.
+        shared_keys (set): Key columns kept only once, taken from the fact table.
+        suffixes (tuple): Suffixes for overlapping non-key column names.
+
+    Returns:
+        pd.DataFrame: The merged table.
+    """
+    dim_df = dim_df.reset_index(drop=True)
+    missing = positions < 0
+    if missing.any():
+        # Point unmatched rows at an appended all-NA row; reindexing upcasts dtypes the way merge does
+        positions = np.where(missing, len(dim_df), positions)
+        dim_df = dim_df.reindex(range(len(dim_df) + 1))
+
+    right_columns = [col for col in dim_df.columns if col not in shared_keys]
+    overlap = (set(fact_df.columns) & set(right_columns)) - shared_keys
+
+    left_part = fact_df.reset_index(drop=True)
+    left_part.columns = [f"{col}{suffixes[0]}" if col in overlap else col for col in fact_df.columns]
+
+    right_part = dim_df[right_columns].take(positions).set_axis(left_part.index)
+    right_part.columns = [f"{col}{suffixes[1]}" if col in overlap else col for col in right_columns]
+
+    return pd.concat([left_part, right_part], axis=1)
+
+
+# Step 5: As-Of Lookups on a Sorted Key
+def asof_positions(fact_df, dim_df, left_by, right_by, on):
+    """
+    Finds, for each fact row, the latest dimension row of the same group at or before its on value.
+
+    Both tables' group keys are encoded with one shared set of integer codes, the dimension rows
+    are sorted by (code, on) and every fact row is placed with a single vectorized binary search,
+    so the cost is O(n log m) and the dimension table is never expanded.
+
+    Args:
+        fact_df (pd.DataFrame): The fact table.
+        dim_df (pd.DataFrame): The dimension table.
+        left_by (str): Group column of fact_df.
+        right_by (str): Group column of dim_df.
+        on (str): Ordered column present in both tables, such as a year.
+
+    Returns:
+        np.ndarray: Dimension row position per fact row, -1 where nothing matches.
+    """
+    dim_values = pd.to_numeric(dim_df[on], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+    fact_values = pd.to_numeric(fact_df[on], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+
+    codes, _ = pd.factorize(pd.concat([dim_df[right_by], fact_df[left_by]], ignore_index=True))
+    dim_codes, fact_codes = codes[:len(dim_df)], codes[len(dim_df):]
+
+    usable = (dim_codes >= 0) & ~np.isnan(dim_values)
+    positions = np.full(len(fact_df), -1, dtype=np.intp)
+    if not usable.any():
+        return positions
+
+    order = np.lexsort((dim_values, dim_codes))
+    order = order[usable[order]]
+    sorted_codes, sorted_values = dim_codes[order], dim_values[order]
+
+    # One sorted key: code * span + offset, where fact values before the first dimension value get
+    # offset 0 (never matched) and values past the last one are clipped onto it
+    low, high = sorted_values.min(), sorted_values.max()
+    span = high - low + 2
+    dim_keys = sorted_codes * span + (sorted_values - low + 1)
+
+    searchable = (fact_codes >= 0) & ~np.isnan(fact_values)
+    fact_keys = fact_codes[searchable] * span + (np.clip(fact_values[searchable], low - 1, high) - low + 1)
+    found = np.searchsorted(dim_keys, fact_keys, side="right") - 1
+
+    # A hit in the previous group means no dimension row at or before the fact value
+    matched = (found >= 0) & (sorted_codes[np.maximum(found, 0)] == fact_codes[searchable])
+    positions[np.flatnonzero(searchable)[matched]] = order[found[matched]]
+    return positions
+
+
+def asof_merge(fact_df, dim_df, left_by, right_by, on, suffixes=("_x", "_y"), name=None):
+    """
+    Left-joins each fact row to the latest dimension row of its group at or before its on value.
+
+    The columns come out as in pd.merge(fact_df, dim_df, left_on=[left_by, on],
+    right_on=[right_by, on], how="left"): on appears once, taken from the fact table, and the
+    fact rows keep their order. Each fact row matches at most one dimension row, so rows never multiply.
+
+    Args:
+        fact_df (pd.DataFrame): The large left table.
+        dim_df (pd.DataFrame): The small right table.
+        left_by (str): Group column of fact_df.
+        right_by (str): Group column of dim_df.
+        on (str): Ordered column present in both tables, such as a year.
+        suffixes (tuple): Suffixes for overlapping non-key column names.
+        name (str): Join name; if given, the rows in and out are printed.
+
+    Returns:
+        pd.DataFrame: The merged table.
+    """
+    positions = asof_positions(fact_df, dim_df, left_by, right_by, on)
+    shared_keys = {on, left_by} if left_by == right_by else {on}
+    merged_df = attach_at_positions(fact_df, dim_df, positions, shared_keys, suffixes)
+    log_rows(name, len(fact_df), len(merged_df))
+    return merged_df
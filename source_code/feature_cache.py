@@ -0,0 +1,74 @@
+import os
+import json
+import hashlib
+import pandas as pd
+
+
+# Step 1: Fingerprint the Extractor Configuration
+def fingerprint(*parts):
+    """
+    Hashes JSON-serializable configuration (keyword tables, version strings) into a short fingerprint.
+
+    Args:
+        *parts: Objects that determine the extractor output.
+
+    Returns:
+        str: A hex digest that changes whenever any of the parts change.
+    """
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+# Step 2: Derive a Content-Addressed Key per Row
+def row_keys(texts, config_fingerprint):
+    """
+    Computes a cache key for every text from its content and the extractor fingerprint.
+
+    Args:
+        texts (pd.Series): The texts the features are extracted from.
+        config_fingerprint (str): The fingerprint returned by fingerprint().
+
+    Returns:
+        pd.Series: One hex key per row, aligned with texts.
+    """
+    def key(text):
+        content = "\0missing" if pd.isna(text) else str(text)
+        return hashlib.sha256(f"{config_fingerprint}\0{content}".encode("utf-8")).hexdigest()
+
+    return texts.map(key)
+
+
+# Step 3: Load and Save the Cache
+def load_cache(file_path, columns):
+    """
+    Loads cached feature rows indexed by key.
+
+    Args:
+        file_path (str): Path to the cache TSV file.
+        columns (list): Feature columns expected in the cache.
+
+    Returns:
+        pd.DataFrame: Cached features indexed by key (empty if the file is missing or outdated).
+    """
+    empty = pd.DataFrame(columns=columns, index=pd.Index([], name="key"))
+    if not os.path.exists(file_path):
+        return empty
+
+    cache = pd.read_csv(file_path, sep="\t", index_col="key")
+    if list(cache.columns) != list(columns):
+        print(f" Cache columns changed, ignoring {file_path}")
+        return empty
+    return cache
+
+
+def save_cache(cache, file_path):
+    """
+    Writes the cache TSV atomically so an interrupted run never leaves a truncated cache.
+
+    Args:
+        cache (pd.DataFrame): Features indexed by key.
+        file_path (str): Path to the cache TSV file.
+    """
+    temp_path = file_path + ".tmp"
+    cache.to_csv(temp_path, sep="\t", index_label="key")
+    os.replace(temp_path, file_path)
@@ -0,0 +1,484 @@
+import os
+import time
+import atexit
+import queue
+import secrets
+import argparse
+import threading
+import multiprocessing
+from multiprocessing.connection import Listener, Client, wait
+
+default_address = ("localhost", 6000)
+
+# Each service run generates a random key and stores it where only its owner can read it;
+# INFERENCE_SERVICE_KEY sets a fixed key for both sides instead
+default_key_file = os.environ.get(
+    "INFERENCE_SERVICE_KEY_FILE", os.path.join(os.path.expanduser("~"), ".inference_service.key")
+)
+
+# Seconds a client waits for the reply to one request
+default_timeout = 600.0
+
+# Seconds between checks that every worker process is still alive
+worker_check_interval = 1.0
+
+
+# Step 1: Model Handlers
+def load_qwen(**options):
+    """Loads the Qwen pipeline with load_model's options and names it the way analysis_dates_witness keys its caches."""
+    from analysis_dates_witness import load_model, response_model
+
+    pipe = load_model(**options)
+    return pipe, {"model_name": response_model(pipe)}
+
+
+def run_qwen(pipe, conversations):
+    """Generates one reply per chat conversation."""
+    outputs = pipe(conversations, batch_size=len(conversations))
+    return [output[0]['generated_text'][-1]['content'] for output in outputs]
+
+
+def load_spacy():
+    """Loads the small English spaCy model."""
+    import en_core_web_sm
+
+    nlp = en_core_web_sm.load()
+    return nlp, {"model_name": nlp.meta["name"]}
+
+
+def run_spacy(nlp, texts):
+    """Returns the (text, label) named entities of every text."""
+    return [[(ent.text, ent.label_) for ent in doc.ents] for doc in nlp.pipe(texts, batch_size=256)]
+
+
+# model name -> (loader, runner); loaders return the model and a dict of facts reported to clients
+handlers = {
+    "qwen": (load_qwen, run_qwen),
+    "spacy": (load_spacy, run_spacy),
+}
+
+
+# Step 2: Share the Connection Key
+def create_authkey(key_file=default_key_file):
+    """
+    Generates the random key of a service run and writes it to a file only its owner can read.
+
+    multiprocessing.connection unpickles what clients send, so the key must not be guessable.
+
+    Args:
+        key_file (str): Path of the key file.
+
+    Returns:
+        bytes: The key.
+    """
+    authkey = secrets.token_bytes(32)
+    temp_path = key_file + ".tmp"
+    fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(authkey)
+    # O_CREAT only sets the mode of a new file, so tighten a leftover one too
+    os.chmod(temp_path, 0o600)
+    os.replace(temp_path, key_file)
+    return authkey
+
+
+def read_authkey(key_file=default_key_file):
+    """
+    Returns the key clients present: INFERENCE_SERVICE_KEY if set, otherwise the key of the running service.
+
+    Raises:
+        FileNotFoundError: If no service has written its key file.
+    """
+    if os.environ.get("INFERENCE_SERVICE_KEY"):
+        return os.environ["INFERENCE_SERVICE_KEY"].encode("utf-8")
+    with open(key_file, "rb") as f:
+        return f.read()
+
+
+# Step 3: Worker Processes Hold the Models Loaded
+def worker_loop(model_name, options, conn):
+    """
+    Loads one model and runs the batches sent to it until it receives None.
+
+    Args:
+        model_name (str): Key of handlers.
+        options (dict): Keyword arguments for the model loader.
+        conn (multiprocessing.connection.Connection): Pipe to the pool; receives (batch id, payloads)
+            tuples, sends ("ready", info) once the model is loaded and ("done", (batch id, outputs, error))
+            for every batch.
+    """
+    loader, runner = handlers[model_name]
+    model, info = loader(**options)
+    conn.send(("ready", info))
+
+    while True:
+        task = conn.recv()
+        if task is None:
+            break
+        batch_id, payloads = task
+        try:
+            conn.send(("done", (batch_id, runner(model, payloads), None)))
+        except Exception as e:
+            conn.send(("done", (batch_id, None, f"{type(e).__name__}: {e}")))
+
+
+# Step 4: Group Queued Items into Dynamic Batches
+def collect_batch(items, max_batch_size, max_wait):
+    """
+    Takes up to max_batch_size items from the queue, waiting at most max_wait seconds after the first.
+
+    Args:
+        items (queue.Queue): Pending items.
+        max_batch_size (int): Largest batch sent to a worker.
+        max_wait (float): Latency budget in seconds for filling a batch.
+
+    Returns:
+        list: The batch (at least one item).
+    """
+    batch = [items.get()]
+    deadline = time.monotonic() + max_wait
+    while len(batch) < max_batch_size:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            batch.append(items.get(timeout=remaining))
+        except queue.Empty:
+            break
+    return batch
+
+
+class ModelPool:
+    """
+    Worker processes for one model, fed by a dispatcher thread that forms dynamic batches.
+
+    A batch is only formed when a worker is idle, so while all workers are busy new items
+    accumulate and the next batch grows up to max_batch_size. Every worker has its own pipe, so the
+    pool knows which batch each one runs: a worker that dies fails that batch, so its clients get an
+    error instead of waiting, and is replaced.
+    """
+
+    def __init__(self, model_name, options, workers, max_batch_size, max_wait):
+        self.context = multiprocessing.get_context("spawn")
+        self.model_name = model_name
+        self.options = options
+        self.items = queue.Queue()
+        self.idle = queue.Queue()
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.lock = threading.Lock()
+        self.running = {}
+        self.next_batch_id = 0
+        self.closing = False
+        # Interpreter exit terminates the daemon workers; this runs first, so they are not replaced
+        atexit.register(self.stop_replacing)
+
+        # slot -> (process, connection)
+        self.workers = [self.start_worker() for _ in range(workers)]
+
+        # Block until every worker has its model loaded
+        self.info = {}
+        for slot, (process, conn) in enumerate(self.workers):
+            if conn not in wait([conn, process.sentinel]) or not conn.poll():
+                process.join()
+                self.close()
+                raise RuntimeError(f"{model_name} worker exited with code {process.exitcode} while loading")
+            _, self.info = conn.recv()
+            self.idle.put(slot)
+        print(f"{model_name}: {workers} worker(s) ready {self.info}")
+
+        threading.Thread(target=self.dispatch, daemon=True).start()
+        threading.Thread(target=self.collect, daemon=True).start()
+
+    def start_worker(self):
+        conn, worker_conn = self.context.Pipe()
+        process = self.context.Process(
+            target=worker_loop, args=(self.model_name, self.options, worker_conn), daemon=True
+        )
+        process.start()
+        worker_conn.close()
+        return process, conn
+
+    def submit(self, payload, done):
+        """Queues one item; done(output, error) is called when its batch finishes."""
+        self.items.put((payload, done))
+
+    def dispatch(self):
+        while True:
+            slot = self.idle.get()
+            batch = collect_batch(self.items, self.max_batch_size, self.max_wait)
+            with self.lock:
+                batch_id = self.next_batch_id
+                self.next_batch_id += 1
+                self.running[slot] = (batch_id, [done for _, done in batch])
+                _, conn = self.workers[slot]
+            try:
+                conn.send((batch_id, [payload for payload, _ in batch]))
+            except OSError:
+                # The worker died; collect fails the batch and replaces it
+                pass
+
+    def collect(self):
+        while not self.closing:
+            connections = {conn: slot for slot, (_, conn) in enumerate(self.workers)}
+            sentinels = {process.sentinel: slot for slot, (process, _) in enumerate(self.workers)}
+            ready = wait(list(connections) + list(sentinels), timeout=worker_check_interval)
+
+            # Read results before handling exits, so a worker's last result is never lost
+            for conn in ready:
+                if conn in connections:
+                    self.receive(connections[conn])
+            for sentinel in ready:
+                if sentinel in sentinels and not self.closing:
+                    self.replace_worker(sentinels[sentinel])
+
+    def receive(self, slot):
+        _, conn = self.workers[slot]
+        try:
+            kind, value = conn.recv()
+        except (EOFError, OSError):
+            return
+        if kind == "done":
+            batch_id, outputs, error = value
+            self.finish(slot, batch_id, outputs, error)
+
+    def finish(self, slot, batch_id, outputs, error):
+        with self.lock:
+            running = self.running.get(slot)
+            if running is None or running[0] != batch_id:
+                return
+            del self.running[slot]
+        self.idle.put(slot)
+        for i, done in enumerate(running[1]):
+            done(None if error else outputs[i], error)
+
+    def replace_worker(self, slot):
+        process, conn = self.workers[slot]
+        process.join()
+        error = f"{self.model_name} worker exited with code {process.exitcode}"
+        print(f"Warning: {error}, starting a new one")
+        with self.lock:
+            self.workers[slot] = self.start_worker()
+            running = self.running.get(slot)
+        conn.close()
+        # A batch sent to the new worker waits in its pipe until the model is loaded
+        if running is not None:
+            self.finish(slot, running[0], None, error)
+
+    def stop_replacing(self):
+        self.closing = True
+
+    def close(self):
+        self.stop_replacing()
+        for process, conn in self.workers:
+            try:
+                conn.send(None)
+            except OSError:
+                pass
+        for process, conn in self.workers:
+            process.join()
+            conn.close()
+
+
+# Step 5: Serve Client Connections
+def handle_request(pools, request):
+    """
+    Runs every item of a client request through its model pool and waits for all of them.
+
+    Args:
+        pools (dict): model name -> ModelPool.
+        request (dict): {"model": name, "items": [...]} or {"info": True}.
+
+    Returns:
+        dict: {"outputs": [...]}, {"info": {...}} or {"error": message}.
+    """
+    if request.get("info"):
+        return {"info": {name: pool.info for name, pool in pools.items()}}
+
+    pool = pools.get(request.get("model"))
+    if pool is None:
+        return {"error": f"Model {request.get('model')!r} is not served; available: {', '.join(pools)}"}
+
+    items = request["items"]
+    outputs = [None] * len(items)
+    errors = []
+    finished = threading.Semaphore(0)
+
+    for i, payload in enumerate(items):
+        def done(output, error, i=i):
+            outputs[i] = output
+            if error:
+                errors.append(error)
+            finished.release()
+        pool.submit(payload, done)
+
+    for _ in items:
+        finished.acquire()
+    return {"error": errors[0]} if errors else {"outputs": outputs}
+
+
+def serve_connection(pools, conn):
+    with conn:
+        while True:
+            try:
+                request = conn.recv()
+            except EOFError:
+                return
+            conn.send(handle_request(pools, request))
+
+
+def serve(model_options, address=default_address, authkey=None, workers=1, max_batch_size=16, max_wait_ms=50,
+          key_file=default_key_file):
+    """
+    Starts the model pools and serves clients until interrupted.
+
+    Args:
+        model_options (dict): model name -> keyword arguments for its loader.
+        address (tuple): (host, port) to listen on.
+        authkey (bytes): Shared secret clients must present; None uses INFERENCE_SERVICE_KEY or,
+            if that is unset, a random key written to key_file.
+        workers (int): Worker processes per model.
+        max_batch_size (int): Largest batch sent to a worker.
+        max_wait_ms (int): Latency budget in milliseconds for filling a batch.
+        key_file (str): Where a generated key is stored for clients; removed on shutdown.
+    """
+    pools = {
+        name: ModelPool(name, options, workers, max_batch_size, max_wait_ms / 1000)
+        for name, options in model_options.items()
+    }
+
+    generated_key = authkey is None and not os.environ.get("INFERENCE_SERVICE_KEY")
+    if authkey is None:
+        authkey = create_authkey(key_file) if generated_key else read_authkey(key_file)
+
+    # A deep backlog so several pipeline stages can connect at once
+    with Listener(address, backlog=64, authkey=authkey) as listener:
+        print(f"Inference service listening on {address[0]}:{address[1]}")
+        try:
+            while True:
+                try:
+                    conn = listener.accept()
+                except (multiprocessing.AuthenticationError, EOFError, ConnectionError) as e:
+                    # A client with a stale or wrong key must not stop the service
+                    print(f"Warning: rejected a client connection: {type(e).__name__}: {e}")
+                    continue
+                threading.Thread(target=serve_connection, args=(pools, conn), daemon=True).start()
+        except KeyboardInterrupt:
+            print("Shutting down")
+        finally:
+            for pool in pools.values():
+                pool.close()
+            if generated_key and os.path.exists(key_file):
+                os.remove(key_file)
+
+
+# Step 6: Client API
+def parse_address(address):
+    """Turns "host:port" into a (host, port) tuple."""
+    host, _, port = address.rpartition(":")
+    return host or default_address[0], int(port)
+
+
+class InferenceClient:
+    """
+    Connection to a running inference service; one request is in flight at a time.
+
+    Raises FileNotFoundError if no service has written its key, ConnectionRefusedError if none is
+    listening, TimeoutError if a reply takes longer than timeout seconds, EOFError or
+    ConnectionResetError if the service goes away, and RuntimeError if a model failed on the request.
+    """
+
+    def __init__(self, address=default_address, authkey=None, timeout=default_timeout, key_file=default_key_file):
+        if isinstance(address, str):
+            address = parse_address(address)
+        self.timeout = timeout
+        self.conn = Client(address, authkey=read_authkey(key_file) if authkey is None else authkey)
+
+    def request(self, message):
+        self.conn.send(message)
+        if self.timeout is not None and not self.conn.poll(self.timeout):
+            # A late reply would be read as the answer to the next request, so drop the connection
+            self.conn.close()
+            raise TimeoutError(f"No reply from the inference service within {self.timeout:g} s")
+        reply = self.conn.recv()
+        if "error" in reply:
+            raise RuntimeError(f"Inference service error: {reply['error']}")
+        return reply
+
+    def info(self):
+        """Returns the facts each served model reported when it was loaded."""
+        return self.request({"info": True})["info"]
+
+    def generate(self, conversations):
+        """Returns the Qwen reply to each chat conversation."""
+        return self.request({"model": "qwen", "items": conversations})["outputs"]
+
+    def entities(self, texts):
+        """Returns the (text, label) named entities of each text."""
+        return self.request({"model": "spacy", "items": list(texts)})["outputs"]
+
+    def close(self):
+        self.conn.close()
+
+
+class ServicePipe:
+    """
+    Calls the service's Qwen pool with the same interface and output as a text-generation pipeline,
+    so the extraction code runs unchanged against a warm shared model.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.model_name = client.info()["qwen"]["model_name"]
+
+    def __call__(self, messages, batch_size=None, **kwargs):
+        single = isinstance(messages[0], dict)
+        conversations = [messages] if single else messages
+
+        replies = self.client.generate(conversations)
+        outputs = [
+            [{"generated_text": conversation + [{"role": "assistant", "content": reply}]}]
+            for conversation, reply in zip(conversations, replies)
+        ]
+        return outputs[0] if single else outputs
+
+
+# Command-Line Arguments
+def parse_args():
+    """
+    Parses the command-line options for the service.
+
+    Returns:
+        argparse.Namespace: The parsed options.
+    """
+    from model_backends import BACKENDS
+    from prefix_cache import DEFAULT_MAX_NEW_TOKENS
+
+    parser = argparse.ArgumentParser(description="Serve the description NLP models from warm worker processes.")
+    parser.add_argument("--models", nargs="+", choices=sorted(handlers), default=sorted(handlers),
+                        help="Models to load and serve.")
+    parser.add_argument("--address", default=f"{default_address[0]}:{default_address[1]}",
+                        help="host:port to listen on.")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes per model.")
+    parser.add_argument("--max-batch-size", type=int, default=16, help="Largest batch sent to a worker.")
+    parser.add_argument("--max-wait-ms", type=int, default=50,
+                        help="How long a batch may wait for more items before it is sent.")
+    parser.add_argument("--backend", choices=BACKENDS, default="auto", help="Qwen model backend.")
+    parser.add_argument("--prefix-cache", action="store_true", help="Reuse the prompt prefix key/value cache.")
+    parser.add_argument("--max-new-tokens", type=int, default=DEFAULT_MAX_NEW_TOKENS,
+                        help="Cap the tokens Qwen generates per item (with --prefix-cache, default: %(default)s).")
+    parser.add_argument("--stop-after-answer", action="store_true",
+                        help="Stop Qwen once the answer after '####' is complete.")
+    return parser.parse_args()
+
+
+# Execute Main Function
+if __name__ == "__main__":
+    args = parse_args()
+    options = {
+        "qwen": {"backend": args.backend, "prefix_cache": args.prefix_cache,
+                 "max_new_tokens": args.max_new_tokens, "stop_after_answer": args.stop_after_answer},
+        "spacy": {},
+    }
+    serve({name: options[name] for name in args.models}, parse_address(args.address), workers=args.workers,
+          max_batch_size=args.max_batch_size, max_wait_ms=args.max_wait_ms)
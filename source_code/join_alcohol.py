@@ -1,5 +1,44 @@
 import os
 import pandas as pd
+from dimension_lookup import lookup_merge
+from table_io import read_table, write_table, table_exists
+from schema import apply_schema
+from location_keys import with_location_ids, keyed_dimension, drop_location_ids
+
+
+def load_alcohol(alcohol_file):
+    """
+    Loads the alcohol abuse dataset with standardized column names.
+
+    :param alcohol_file: Path to the alcohol abuse dataset file.
+    :return: The alcohol abuse DataFrame.
+    """
+    alcohol_df = pd.read_csv(alcohol_file, sep="\t")
+    alcohol_df.columns = alcohol_df.columns.str.strip().str.lower()
+    return apply_schema(alcohol_df)
+
+
+def alcohol_attach(hp_df, alcohol_df, common_column="state", locations=None, duplicate_keys="dedupe"):
+    """
+    Attaches the alcohol abuse columns to an HP analysis DataFrame with lower-case column names.
+
+    :param hp_df: The HP analysis DataFrame.
+    :param alcohol_df: The alcohol abuse DataFrame from load_alcohol.
+    :param common_column: Column name on which to merge the datasets (default: "state").
+    :param locations: The LocationIndex of hp_df; built from hp_df if not given.
+    :param duplicate_keys: What to do with repeated dimension keys (see dimension_lookup.DUPLICATE_KEY_POLICIES).
+    :return: The merged DataFrame with the integer location keys, or None if the common column is missing.
+    """
+    # Verify that the common column exists
+    if common_column not in hp_df.columns or common_column not in alcohol_df.columns:
+        print(f"Error: Column '{common_column}' not found in one of the files.")
+        return None
+
+    # Merge datasets on the integer state id
+    hp_df, locations = with_location_ids(hp_df, locations)
+    alcohol_df = keyed_dimension(alcohol_df, common_column, "state_id", locations.state_key, "the alcohol dataset")
+    return lookup_merge(hp_df, alcohol_df.drop(columns=common_column), on="state_id",
+                        duplicate_keys=duplicate_keys, name="alcohol")
 
 
 def alcohol_merge(hp_file, alcohol_file, output_file, common_column="state"):
@@ -12,38 +51,34 @@ def alcohol_merge(hp_file, alcohol_file, output_file, common_column="state"):
     :param common_column: Column name on which to merge the datasets (default: "state").
     """
     # Check if files exist
-    if not os.path.exists(hp_file) or not os.path.exists(alcohol_file):
+    if not table_exists(hp_file) or not os.path.exists(alcohol_file):
         print(f"Error: One or both input files are missing: {hp_file}, {alcohol_file}")
         return
 
-    # Load TSV files
-    hp_df = pd.read_csv(hp_file, sep="\t")
-    alcohol_df = pd.read_csv(alcohol_file, sep="\t")
+    # Load the datasets
+    hp_df = read_table(hp_file)
+    alcohol_df = load_alcohol(alcohol_file)
 
     # Standardize column names (trim spaces, lowercase)
     hp_df.columns = hp_df.columns.str.strip().str.lower()
-    alcohol_df.columns = alcohol_df.columns.str.strip().str.lower()
 
-    # Verify that the common column exists
-    if common_column not in hp_df.columns or common_column not in alcohol_df.columns:
-        print(f"Error: Column '{common_column}' not found in one of the files.")
+    merged_df = alcohol_attach(hp_df, alcohol_df, common_column)
+    if merged_df is None:
         return
 
-    # Merge datasets
-    merged_df = pd.merge(hp_df, alcohol_df, on=common_column, how="left")
+    # Save the merged dataset
+    saved_path = write_table(drop_location_ids(merged_df), output_file)
+    print(f"Merged file saved at: {os.path.abspath(saved_path)}")
 
-    # Save to new TSV file
-    merged_df.to_csv(output_file, sep="\t", index=False)
-    print(f"Merged TSV file saved at: {os.path.abspath(output_file)}")
 
+# Run the function
+if __name__ == "__main__":
+    # Define file paths
+    processed_dir = os.path.join("..", "data", "processed")
+    raw_dir = os.path.join("..", "data", "raw")
 
-# Define file paths
-processed_dir = os.path.join("..", "data", "processed")
-raw_dir = os.path.join("..", "data", "raw")
-
-hp_file = os.path.join(processed_dir, "hp_analysis_v2.tsv")
-alcohol_file = os.path.join(raw_dir, "state_alcohol_abuse.tsv")
-output_file = os.path.join(processed_dir, "hp_analysis_alcohol.tsv")
+    hp_file = os.path.join(processed_dir, "hp_analysis_v2.tsv")
+    alcohol_file = os.path.join(raw_dir, "state_alcohol_abuse.tsv")
+    output_file = os.path.join(processed_dir, "hp_analysis_alcohol.tsv")
 
-# Run the function
-alcohol_merge(hp_file, alcohol_file, output_file)
+    alcohol_merge(hp_file, alcohol_file, output_file)
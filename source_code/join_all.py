@@ -1,61 +1,256 @@
 import os
+import time
+import argparse
+import numpy as np
 import pandas as pd
-from join_alcohol import alcohol_merge
-from join_apportionment import apportionment_merge
-from join_crime import crime_merge
-from join_daytime import daytime_merge
-from join_tribes import tribes_merge
+from join_alcohol import load_alcohol, alcohol_attach
+from join_apportionment import load_apportionment, apportionment_attach
+from join_crime import load_crime, crime_attach
+from join_daytime import load_daytime, daytime_attach
+from join_tribes import load_tribes, tribes_attach
+from process_haunted_data import assign_row_ids
+from dag_executor import run_dag, print_timings
+from dimension_lookup import DUPLICATE_KEY_POLICIES, log_rows
+from schema import apply_schema
+from location_keys import LocationIndex, with_location_ids, drop_location_ids
+from table_io import FORMATS, default_format, read_table, write_table, table_exists
 
-def merge_all():
+
+def define_paths():
     """
-    Runs all merge functions and combines the datasets into a final merged file.
+    Defines the relative paths of the fact table, the dimension datasets and the outputs.
+    Processed tables are named by their .tsv path; table_io stores them as Parquet or TSV.
+
+    :return: A dictionary of file paths.
     """
-    # Define directories
     processed_dir = os.path.join("..", "data", "processed")
     raw_dir = os.path.join("..", "data", "raw")
 
-    # Define file paths
-    hp_file = os.path.join(processed_dir, "hp_analysis_v2.tsv")
-    final_output_file = os.path.join(processed_dir, "hp_analysis_hw2.tsv")
-
-    # Merge each dataset separately
-    alcohol_output = os.path.join(processed_dir, "hp_analysis_alcohol.tsv")
-    apportionment_output = os.path.join(processed_dir, "hp_analysis_apportionment.tsv")
-    crime_output = os.path.join(processed_dir, "hp_analysis_crime.tsv")
-    daytime_output = os.path.join(processed_dir, "hp_analysis_daytime.tsv")
-    tribes_output = os.path.join(processed_dir, "hp_analysis_tribes.tsv")
-
-    # Run individual merges
-    alcohol_merge(hp_file, os.path.join(raw_dir, "state_alcohol_abuse.tsv"), alcohol_output)
-    apportionment_merge(hp_file, os.path.join(raw_dir, "apportionment.tsv"), apportionment_output)
-    crime_merge(hp_file, os.path.join(processed_dir, "ncvs_personal_engineered.tsv"), crime_output)
-    daytime_merge(hp_file, os.path.join(raw_dir, "sunrise_sunset_data.tsv"), os.path.join(raw_dir, "sun_moon_data_combined.tsv"), daytime_output)
-    tribes_merge(hp_file, os.path.join(processed_dir, "tribes_per_state.tsv"), tribes_output)
-
-    # Load all merged datasets
-    merged_files = [alcohol_output, apportionment_output, crime_output, daytime_output, tribes_output]
-    final_df = None
-
-    for file in merged_files:
-        if os.path.exists(file):
-            df = pd.read_csv(file, sep="\t")
-            if final_df is None:
-                final_df = df
-            else:
-                common_columns = list(set(final_df.columns) & set(df.columns))
-                final_df = pd.merge(final_df, df, on=common_columns, how="outer")
+    return {
+        "hp_file": os.path.join(processed_dir, "hp_analysis_v2.tsv"),
+        "final_output_file": os.path.join(processed_dir, "hp_analysis_hw2.tsv"),
+        "alcohol_file": os.path.join(raw_dir, "state_alcohol_abuse.tsv"),
+        "apportionment_file": os.path.join(raw_dir, "apportionment.tsv"),
+        "crime_file": os.path.join(processed_dir, "ncvs_personal_engineered.tsv"),
+        "sunrise_sunset_file": os.path.join(raw_dir, "sunrise_sunset_data.tsv"),
+        "sun_moon_file": os.path.join(raw_dir, "sun_moon_data_combined.tsv"),
+        "tribes_file": os.path.join(processed_dir, "tribes_per_state.tsv"),
+        "alcohol_output": os.path.join(processed_dir, "hp_analysis_alcohol.tsv"),
+        "apportionment_output": os.path.join(processed_dir, "hp_analysis_apportionment.tsv"),
+        "crime_output": os.path.join(processed_dir, "hp_analysis_crime.tsv"),
+        "daytime_output": os.path.join(processed_dir, "hp_analysis_daytime.tsv"),
+        "tribes_output": os.path.join(processed_dir, "hp_analysis_tribes.tsv"),
+    }
+
+
+# dimension name -> (path keys of its input files, load function, attach function)
+dimension_sources = {
+    "alcohol": (["alcohol_file"], load_alcohol, alcohol_attach),
+    "apportionment": (["apportionment_file"], load_apportionment, apportionment_attach),
+    "crime": (["crime_file"], load_crime, crime_attach),
+    "daytime": (["sunrise_sunset_file", "sun_moon_file"], load_daytime, daytime_attach),
+    "tribes": (["tribes_file"], load_tribes, tribes_attach),
+}
+
+
+def load_fact_table(hp_file):
+    """
+    Loads the HP analysis fact table once with standardized column names and row ids.
+
+    :param hp_file: Path to the HP analysis file.
+    :return: The HP analysis DataFrame.
+    """
+    hp_df = read_table(hp_file)
+    hp_df.columns = hp_df.columns.str.strip().str.lower()
+    return assign_row_ids(hp_df)
+
+
+def key_fact_table(hp_df, locations):
+    """
+    Adds the integer state, state abbreviation and city ids every dimension merge joins on.
+
+    :param hp_df: The fact table from load_fact_table.
+    :param locations: The LocationIndex built from hp_df.
+    :return: The fact table with the location id columns.
+    """
+    return with_location_ids(hp_df, locations)[0]
+
+
+def attach_dimension(name, files, output_file, write_intermediates, output_format, duplicate_keys, hp_df,
+                     locations):
+    """
+    Loads one dimension dataset and merges it onto the fact table, exactly as its join module does.
+
+    :param name: Key of dimension_sources.
+    :param files: Paths of the dimension input files.
+    :param output_file: Path of the single-dimension merge, written if write_intermediates is set.
+    :param write_intermediates: Also save the single-dimension merge.
+    :param output_format: Storage format of the single-dimension merge (see table_io.FORMATS).
+    :param duplicate_keys: What to do with repeated dimension keys (see dimension_lookup.DUPLICATE_KEY_POLICIES).
+    :param hp_df: The fact table from key_fact_table.
+    :param locations: The LocationIndex of hp_df.
+    :return: row_id plus the columns the merge added, or None if the merge failed.
+    """
+    _, load, attach = dimension_sources[name]
+    loaded = load(*files)
+    loaded = loaded if isinstance(loaded, tuple) else (loaded,)
+
+    merged_df = attach(hp_df, *loaded, locations=locations, duplicate_keys=duplicate_keys)
+    if merged_df is None:
+        return None
+
+    if write_intermediates:
+        saved_path = write_table(drop_location_ids(merged_df), output_file, output_format)
+        print(f"Merged file saved at: {os.path.abspath(saved_path)}")
+
+    # Only the added columns go back to the combine step
+    return merged_df[["row_id"] + [col for col in merged_df.columns if col not in hp_df.columns]]
+
+
+def combine(names, hp_df, *added):
+    """
+    Attaches the columns every dimension added to the fact table.
+
+    Columns of a merge that kept one row per fact row are appended by position; a dimension
+    that matched some rows more than once is joined on row_id instead, so its extra rows are kept.
+
+    :param names: Dimension names, in the order of added.
+    :param hp_df: The fact table from key_fact_table.
+    :param added: The results of attach_dimension.
+    :return: The enriched DataFrame.
+    """
+    final_df = hp_df
+    blocks = []
+    expanded = False
+
+    for name, added_df in zip(names, added):
+        if added_df is None:
+            continue
+
+        taken = set(final_df.columns).union(*(block.columns for block in blocks))
+        duplicated = [col for col in added_df.columns if col in taken and col != "row_id"]
+        if duplicated:
+            print(f"Warning: {name} columns {duplicated} were already added by another dataset, keeping the first.")
+        new_columns = [col for col in added_df.columns if col not in taken]
+
+        aligned = len(added_df) == len(hp_df) and np.array_equal(
+            added_df["row_id"].to_numpy(), hp_df["row_id"].to_numpy()
+        )
+        if aligned and not expanded:
+            blocks.append(added_df[new_columns].set_axis(hp_df.index))
         else:
-            print(f"Warning: {file} not found, skipping merge.")
+            print(f"Warning: {name} matched some rows more than once, joining on row_id.")
+            final_df = pd.concat([final_df] + blocks, axis=1)
+            blocks = []
+            final_df = pd.merge(final_df, added_df[["row_id"] + new_columns], on="row_id", how="left")
+            expanded = True
+
+    final_df = pd.concat([final_df] + blocks, axis=1) if blocks else final_df
+    log_rows("combine", len(hp_df), len(final_df))
+
+    # Merges fall back to object columns where key categories differ, so restore the registered types
+    return apply_schema(final_df)
+
+
+def build_join_graph(paths, write_intermediates=False, output_format=None, duplicate_keys="dedupe"):
+    """
+    Declares the enrichment joins as a task graph: the fact table is loaded and keyed by integer
+    location ids once, every dimension merge depends only on the keyed fact table and the location
+    index, and the combine step depends on all of them.
+
+    :param paths: The dictionary returned by define_paths.
+    :param write_intermediates: Also save the single-dimension merges.
+    :param output_format: Storage format of the single-dimension merges.
+    :param duplicate_keys: What the merges do with repeated dimension keys.
+    :return: The graph for dag_executor.run_dag, or None if no dimension dataset exists.
+    """
+    graph = {
+        "raw_fact": {"func": load_fact_table, "args": (paths["hp_file"],), "local": True},
+        "locations": {"func": LocationIndex.from_fact, "deps": ["raw_fact"], "local": True},
+        "fact": {"func": key_fact_table, "deps": ["raw_fact", "locations"], "local": True},
+    }
+
+    names = []
+    for name, (path_keys, _, _) in dimension_sources.items():
+        files = [paths[key] for key in path_keys]
+        missing = [file for file in files if not os.path.exists(file)]
+        if missing:
+            print(f"Warning: {', '.join(missing)} not found, skipping {name} merge.")
+            continue
+
+        graph[name] = {
+            "func": attach_dimension,
+            "args": (name, files, paths[f"{name}_output"], write_intermediates, output_format, duplicate_keys),
+            "deps": ["fact", "locations"],
+        }
+        names.append(name)
+
+    if not names:
+        return None
+
+    graph["combine"] = {"func": combine, "args": (names,), "deps": ["fact"] + names, "local": True}
+    return graph
+
+
+def merge_all(write_intermediates=False, workers=None, output_format=None, duplicate_keys="dedupe"):
+    """
+    Loads the HP analysis dataset once, runs the independent dataset merges in parallel and
+    saves the final merged file.
+
+    :param write_intermediates: Also save the single-dataset merges (hp_analysis_alcohol.tsv, ...).
+    :param workers: Processes running merges at once; None uses one per CPU.
+    :param output_format: Storage format of the saved tables (see table_io.FORMATS); None uses the default.
+    :param duplicate_keys: What a merge does when a dimension key occurs more than once: "dedupe" keeps
+        the first row, "allow" lets the fact rows multiply and "refuse" stops the run.
+    """
+    paths = define_paths()
+
+    if not table_exists(paths["hp_file"]):
+        print(f"Error: Missing file {paths['hp_file']}")
+        return
+
+    graph = build_join_graph(paths, write_intermediates, output_format, duplicate_keys)
+    if graph is None:
+        print("Error: No datasets were successfully merged.")
+        return
+
+    started_at = time.time()
+    try:
+        results, timings = run_dag(graph, workers)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return
+    print_timings(timings, time.time() - started_at)
+    final_df = results["combine"]
 
     #rename column haunted_place_date to hp_date
     final_df.rename(columns = {'haunted_place_date':'hp_date'}, inplace = True)
     # Save the final merged dataset
-    if final_df is not None:
-        final_df.to_csv(final_output_file, sep="\t", index=False)
-        print(f"Final merged dataset saved at: {os.path.abspath(final_output_file)}")
-    else:
-        print("Error: No datasets were successfully merged.")
+    saved_path = write_table(drop_location_ids(final_df), paths["final_output_file"], output_format)
+    print(f"Final merged dataset saved at: {os.path.abspath(saved_path)}")
+
+
+def parse_args():
+    """
+    Parses the command-line options for the merge.
+
+    :return: The parsed options.
+    """
+    parser = argparse.ArgumentParser(description="Attach all datasets to the HP analysis dataset.")
+    parser.add_argument("--write-intermediates", action="store_true",
+                        help="Also save each single-dataset merge to its own TSV file.")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Processes running merges at once (default: one per CPU).")
+    parser.add_argument("--format", choices=FORMATS, default=default_format,
+                        help=f"Storage format of the merged files (default: {default_format}).")
+    parser.add_argument("--duplicate-keys", choices=DUPLICATE_KEY_POLICIES, default="dedupe",
+                        help="When a dataset repeats a join key: keep its first row (dedupe), let the haunted "
+                             "places multiply (allow), or stop (refuse).")
+    return parser.parse_args()
+
 
 # Run the function
 if __name__ == "__main__":
-    merge_all()
\ No newline at end of file
+    args = parse_args()
+    merge_all(write_intermediates=args.write_intermediates, workers=args.workers, output_format=args.format,
+              duplicate_keys=args.duplicate_keys)
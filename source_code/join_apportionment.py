@@ -1,72 +1,119 @@
 import os
 import pandas as pd
+from dimension_lookup import asof_merge
+from table_io import read_table, write_table, table_exists
+from schema import apply_schema
+from location_keys import with_location_ids, keyed_dimension, drop_location_ids
 
 
-def apportionment_merge(hp_analysis_file, apportionment_file, output_file_final):
+def load_apportionment(apportionment_file, apportionment_common_column="city", year_column="year"):
     """
-    Merges the HP analysis dataset with the apportionment dataset.
+    Loads the apportionment dataset with one row per state and census year, sorted by state and year.
+
+    Values missing from a census row are forward-filled from the state's earlier censuses; the
+    years between censuses are not expanded, apportionment_attach matches them as of the latest census.
 
-    :param hp_analysis_file: Path to the HP analysis file.
     :param apportionment_file: Path to the apportionment dataset file.
-    :param output_file_final: Path where the merged dataset will be saved.
+    :param apportionment_common_column: Column holding the state name (default: "city").
+    :param year_column: Column holding the year (default: "year").
+    :return: The apportionment DataFrame.
     """
-    # Check if files exist
-    if not os.path.exists(hp_analysis_file) or not os.path.exists(apportionment_file):
-        print(f"Error: One or both input files are missing: {hp_analysis_file}, {apportionment_file}")
-        return
-
-    # Load TSV files
-    hp_df = pd.read_csv(hp_analysis_file, sep="\t")
     apportionment_df = pd.read_csv(apportionment_file, sep="\t")
 
     # Standardize column names (lowercase, strip spaces)
-    hp_df.columns = hp_df.columns.str.strip().str.lower()
     apportionment_df.columns = apportionment_df.columns.str.strip().str.lower()
 
-    # Define the common columns for merging
-    hp_common_column = "state"  # HP dataset uses state
-    apportionment_common_column = "city"  # Apportionment dataset uses city
-    year_column = "year"  # Ensure year column exists in both
+    if year_column not in apportionment_df.columns or apportionment_common_column not in apportionment_df.columns:
+        return apportionment_df
 
     # Convert year to integer format
-    if year_column in hp_df.columns:
-        hp_df[year_column] = pd.to_numeric(hp_df[year_column], errors="coerce").astype("Int64")
+    apportionment_df[year_column] = pd.to_numeric(apportionment_df[year_column], errors="coerce").astype("Int64")
+
+    # Forward-fill missing values from the state's earlier census years
+    apportionment_df = apportionment_df.sort_values(by=[apportionment_common_column, year_column],
+                                                    ignore_index=True)
+    value_columns = [col for col in apportionment_df.columns if col != apportionment_common_column]
+    apportionment_df[value_columns] = apportionment_df.groupby(apportionment_common_column)[value_columns].ffill()
 
-    if year_column in apportionment_df.columns:
-        apportionment_df[year_column] = pd.to_numeric(apportionment_df[year_column], errors="coerce").astype("Int64")
+    return apply_schema(apportionment_df)
 
-    # Forward-fill missing data for years not explicitly listed
-    apportionment_df = apportionment_df.sort_values(by=[apportionment_common_column, year_column])
-    apportionment_df = apportionment_df.set_index(year_column).groupby(apportionment_common_column).apply(
-        lambda group: group.reindex(range(group.index.min(), group.index.max() + 1)).ffill()
-    ).reset_index(level=0, drop=True).reset_index()
+
+def apportionment_attach(hp_df, apportionment_df, locations=None, duplicate_keys="dedupe"):
+    """
+    Attaches the apportionment columns to an HP analysis DataFrame with lower-case column names.
+
+    :param hp_df: The HP analysis DataFrame.
+    :param apportionment_df: The apportionment DataFrame from load_apportionment.
+    :param locations: The LocationIndex of hp_df; built from hp_df if not given.
+    :param duplicate_keys: Unused, the as-of join matches at most one census row; accepted like the other
+        attach functions.
+    :return: The merged DataFrame with the integer location keys, or None if a required column is missing.
+    """
+    # Define the common columns for merging
+    hp_common_column = "state"  # HP dataset uses state
+    apportionment_common_column = "city"  # Apportionment dataset uses city
+    year_column = "year"  # Ensure year column exists in both
 
     # Verify that the common columns exist
     if hp_common_column not in hp_df.columns or apportionment_common_column not in apportionment_df.columns or year_column not in hp_df.columns or year_column not in apportionment_df.columns:
         print(
             f"Error: One of the required columns ('{hp_common_column}', '{apportionment_common_column}', '{year_column}') is missing in one of the files.")
-        return
+        return None
 
-    # Merge the datasets on state abbreviation and year
-    final_merged_df = pd.merge(hp_df, apportionment_df, left_on=[hp_common_column, year_column],
-                               right_on=[apportionment_common_column, year_column], how="left")
+    # Convert year to integer format
+    hp_df = hp_df.assign(**{year_column: pd.to_numeric(hp_df[year_column], errors="coerce").astype("Int64")})
+
+    # Match each haunted place to its state's latest census at or before its year, by integer state id
+    hp_df, locations = with_location_ids(hp_df, locations)
+    apportionment_df = keyed_dimension(apportionment_df, apportionment_common_column, "state_id", locations.state_key,
+                                       "the apportionment dataset")
+    final_merged_df = asof_merge(hp_df, apportionment_df, left_by="state_id", right_by="state_id", on=year_column,
+                                 name="apportionment")
 
     # Drop the redundant 'city' column (renamed as 'city_y' by Pandas)
     if "city_y" in final_merged_df.columns:
         final_merged_df = final_merged_df.drop(columns=["city_y"])
 
-    # Save the final merged dataset to TSV
-    final_merged_df.to_csv(output_file_final, sep="\t", index=False)
-    print(f"Final merged TSV file saved at: {os.path.abspath(output_file_final)}")
+    return final_merged_df
+
+
+def apportionment_merge(hp_analysis_file, apportionment_file, output_file_final):
+    """
+    Merges the HP analysis dataset with the apportionment dataset.
+
+    :param hp_analysis_file: Path to the HP analysis file.
+    :param apportionment_file: Path to the apportionment dataset file.
+    :param output_file_final: Path where the merged dataset will be saved.
+    """
+    # Check if files exist
+    if not table_exists(hp_analysis_file) or not os.path.exists(apportionment_file):
+        print(f"Error: One or both input files are missing: {hp_analysis_file}, {apportionment_file}")
+        return
+
+    # Load the datasets
+    hp_df = read_table(hp_analysis_file)
+    apportionment_df = load_apportionment(apportionment_file)
 
+    # Standardize column names (lowercase, strip spaces)
+    hp_df.columns = hp_df.columns.str.strip().str.lower()
+
+    final_merged_df = apportionment_attach(hp_df, apportionment_df)
+    if final_merged_df is None:
+        return
 
-# Define file paths
-processed_dir = os.path.join("..", "data", "processed")
-raw_dir = os.path.join("..", "data", "raw")
+    # Save the final merged dataset
+    saved_path = write_table(drop_location_ids(final_merged_df), output_file_final)
+    print(f"Final merged file saved at: {os.path.abspath(saved_path)}")
 
-hp_analysis_file = os.path.join(processed_dir, "hp_analysis_v2.tsv")
-apportionment_file = os.path.join(raw_dir, "apportionment.tsv")
-output_file_final = os.path.join(processed_dir, "hp_analysis_apportionment.tsv")
 
 # Run the function
-apportionment_merge(hp_analysis_file, apportionment_file, output_file_final)
\ No newline at end of file
+if __name__ == "__main__":
+    # Define file paths
+    processed_dir = os.path.join("..", "data", "processed")
+    raw_dir = os.path.join("..", "data", "raw")
+
+    hp_analysis_file = os.path.join(processed_dir, "hp_analysis_v2.tsv")
+    apportionment_file = os.path.join(raw_dir, "apportionment.tsv")
+    output_file_final = os.path.join(processed_dir, "hp_analysis_apportionment.tsv")
+
+    apportionment_merge(hp_analysis_file, apportionment_file, output_file_final)
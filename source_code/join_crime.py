@@ -1,5 +1,51 @@
 import os
 import pandas as pd
+from dimension_lookup import lookup_merge
+from table_io import read_table, write_table, table_exists
+from schema import apply_schema
+
+
+def load_crime(ncvs_personal_file):
+    """
+    Loads the crime dataset with standardized column names.
+
+    :param ncvs_personal_file: Path to the crime dataset file.
+    :return: The crime DataFrame.
+    """
+    ncvs_personal_df = pd.read_csv(ncvs_personal_file, sep="\t")
+
+    # Standardize column names (lowercase and strip spaces)
+    ncvs_personal_df.columns = ncvs_personal_df.columns.str.strip().str.lower()
+    return apply_schema(ncvs_personal_df)
+
+
+def crime_attach(hp_df, ncvs_personal_df, locations=None, duplicate_keys="dedupe"):
+    """
+    Attaches the crime columns to an HP analysis DataFrame with lower-case column names.
+
+    :param hp_df: The HP analysis DataFrame.
+    :param ncvs_personal_df: The crime DataFrame from load_crime.
+    :param locations: Unused, crime is joined on year and quarter; accepted like the other attach functions.
+    :param duplicate_keys: What to do with repeated dimension keys (see dimension_lookup.DUPLICATE_KEY_POLICIES).
+    :return: The merged DataFrame, or None if 'year' or 'quarter' is missing.
+    """
+    # Ensure 'year' and 'quarter' exist in both datasets
+    common_columns = ["year", "quarter"]
+    if not all(col in hp_df.columns for col in common_columns):
+        print(f"Error: Columns '{common_columns}' not found in hp_analysis_v2.tsv.")
+        return None
+    elif not all(col in ncvs_personal_df.columns for col in common_columns):
+        print(f"Error: Columns '{common_columns}' not found in ncvs_personal_engineered.tsv.")
+        return None
+
+    # Convert 'year' and 'quarter' to integer if needed (to avoid mismatches)
+    hp_df = hp_df.assign(**{col: pd.to_numeric(hp_df[col], errors="coerce") for col in common_columns})
+    ncvs_personal_df = ncvs_personal_df.assign(
+        **{col: pd.to_numeric(ncvs_personal_df[col], errors="coerce") for col in common_columns}
+    )
+
+    # Merge datasets using LEFT JOIN to keep all HP Analysis v2 records
+    return lookup_merge(hp_df, ncvs_personal_df, on=common_columns, duplicate_keys=duplicate_keys, name="crime")
 
 
 def crime_merge(hp_file, ncvs_personal_file, output_file):
@@ -17,48 +63,35 @@ def crime_merge(hp_file, ncvs_personal_file, output_file):
     if not os.path.exists(ncvs_personal_file):
         print(f"Error: Missing file {ncvs_personal_file}")
         return
-    elif not os.path.exists(hp_file):
+    elif not table_exists(hp_file):
         print(f"Error: Missing file {hp_file}")
         return
 
-    # Load TSV files
-    ncvs_personal_df = pd.read_csv(ncvs_personal_file, sep="\t")
-    hp_df = pd.read_csv(hp_file, sep="\t")
+    # Load the datasets
+    ncvs_personal_df = load_crime(ncvs_personal_file)
+    hp_df = read_table(hp_file)
 
     # Standardize column names (lowercase and strip spaces)
-    ncvs_personal_df.columns = ncvs_personal_df.columns.str.strip().str.lower()
     hp_df.columns = hp_df.columns.str.strip().str.lower()
 
-    # Ensure 'year' and 'quarter' exist in both datasets
-    common_columns = ["year", "quarter"]
-    if not all(col in hp_df.columns for col in common_columns):
-        print(f"Error: Columns '{common_columns}' not found in hp_analysis_v2.tsv.")
+    merged_df = crime_attach(hp_df, ncvs_personal_df)
+    if merged_df is None:
         return
-    elif not all(col in ncvs_personal_df.columns for col in common_columns):
-        print(f"Error: Columns '{common_columns}' not found in ncvs_personal_engineered.tsv.")
-        return
-
-    # Convert 'year' and 'quarter' to integer if needed (to avoid mismatches)
-    for col in common_columns:
-        hp_df[col] = pd.to_numeric(hp_df[col], errors="coerce")
-        ncvs_personal_df[col] = pd.to_numeric(ncvs_personal_df[col], errors="coerce")
-
-    # Merge datasets using LEFT JOIN to keep all HP Analysis v2 records
-    merged_df = pd.merge(hp_df, ncvs_personal_df, on=common_columns, how="left")
 
-    # Save to new TSV file
-    merged_df.to_csv(output_file, sep="\t", index=False)
-    print(f"Merged TSV file saved at: {os.path.abspath(output_file)}")
+    # Save the merged dataset
+    saved_path = write_table(merged_df, output_file)
+    print(f"Merged file saved at: {os.path.abspath(saved_path)}")
 
 
-# Define file paths
-BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
-PROCESSED_DIR = os.path.join(BASE_DIR, "data", "processed")
-RAW_DIR = os.path.join(BASE_DIR, "data", "processed")  # Should this be 'raw'?
+# Run the function
+if __name__ == "__main__":
+    # Define file paths
+    BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    PROCESSED_DIR = os.path.join(BASE_DIR, "data", "processed")
+    RAW_DIR = os.path.join(BASE_DIR, "data", "processed")  # Should this be 'raw'?
 
-ncvs_personal_file = os.path.join(RAW_DIR, "ncvs_personal_engineered.tsv")
-hp_file = os.path.join(PROCESSED_DIR, "hp_analysis_v2.tsv")
-output_file = os.path.join(PROCESSED_DIR, "hp_analysis_crime.tsv")
+    ncvs_personal_file = os.path.join(RAW_DIR, "ncvs_personal_engineered.tsv")
+    hp_file = os.path.join(PROCESSED_DIR, "hp_analysis_v2.tsv")
+    output_file = os.path.join(PROCESSED_DIR, "hp_analysis_crime.tsv")
 
-# Run the function
-crime_merge(hp_file, ncvs_personal_file, output_file)
\ No newline at end of file
+    crime_merge(hp_file, ncvs_personal_file, output_file)
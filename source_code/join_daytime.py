@@ -1,53 +1,94 @@
 import os
 import pandas as pd
+from dimension_lookup import lookup_merge
+from table_io import read_table, write_table, table_exists
+from schema import apply_schema
+from location_keys import with_location_ids, keyed_dimension, drop_location_ids
 
 
-def daytime_merge(hp_file, sunrise_sunset_file, sun_moon_file, output_file):
+def load_daytime(sunrise_sunset_file, sun_moon_file):
     """
-    Merges the HP analysis dataset with sunrise/sunset and sun/moon datasets.
+    Loads the sunrise/sunset and sun/moon datasets with standardized column names.
 
-    :param hp_file: Path to the HP analysis file.
     :param sunrise_sunset_file: Path to the sunrise/sunset dataset file.
     :param sun_moon_file: Path to the sun/moon dataset file.
-    :param output_file: Path where the merged dataset will be saved.
+    :return: The (sunrise/sunset, sun/moon) DataFrames.
     """
-    # Check if files exist
-    if not os.path.exists(hp_file) or not os.path.exists(sunrise_sunset_file) or not os.path.exists(sun_moon_file):
-        print("Error: One or more input files are missing.")
-        return
-
-    # Load TSV files
-    hp_df = pd.read_csv(hp_file, sep="\t")
     sunrise_sunset_df = pd.read_csv(sunrise_sunset_file, sep="\t")
     sun_moon_df = pd.read_csv(sun_moon_file, sep="\t")
 
     # Standardize column names (lowercase, strip spaces)
-    hp_df.columns = hp_df.columns.str.strip().str.lower()
     sunrise_sunset_df.columns = sunrise_sunset_df.columns.str.strip().str.lower()
     sun_moon_df.columns = sun_moon_df.columns.str.strip().str.lower()
 
     # Rename columns in sunrise_sunset_df to avoid conflicts
     sunrise_sunset_df = sunrise_sunset_df.rename(columns={"sunrise": "city_sunrise", "sunset": "city_sunset"})
 
-    # Merge sunrise/sunset data on 'city'
-    merged_df = pd.merge(hp_df, sunrise_sunset_df, on="city", how="left")
+    return apply_schema(sunrise_sunset_df), apply_schema(sun_moon_df)
+
+
+def daytime_attach(hp_df, sunrise_sunset_df, sun_moon_df, locations=None, duplicate_keys="dedupe"):
+    """
+    Attaches the sunrise/sunset and sun/moon columns to an HP analysis DataFrame with lower-case column names.
+
+    :param hp_df: The HP analysis DataFrame.
+    :param sunrise_sunset_df: The sunrise/sunset DataFrame from load_daytime.
+    :param sun_moon_df: The sun/moon DataFrame from load_daytime.
+    :param locations: The LocationIndex of hp_df; built from hp_df if not given.
+    :param duplicate_keys: What to do with repeated dimension keys (see dimension_lookup.DUPLICATE_KEY_POLICIES).
+    :return: The merged DataFrame with the integer location keys.
+    """
+    hp_df, locations = with_location_ids(hp_df, locations)
+
+    # Merge sunrise/sunset data on the city id
+    sunrise_sunset_df = keyed_dimension(sunrise_sunset_df, "city", "city_id", locations.city_key,
+                                        "the sunrise/sunset dataset")
+    merged_df = lookup_merge(hp_df, sunrise_sunset_df.drop(columns="city"), on="city_id",
+                             duplicate_keys=duplicate_keys, name="sunrise/sunset")
+
+    # Merge sun/moon data on the state id and 'year'
+    sun_moon_df = keyed_dimension(sun_moon_df, "state", "state_id", locations.state_key, "the sun/moon dataset")
+    return lookup_merge(merged_df, sun_moon_df.drop(columns="state"), on=["state_id", "year"],
+                        duplicate_keys=duplicate_keys, name="sun/moon")
+
 
-    # Merge sun/moon data on 'state' and 'year'
-    merged_df = pd.merge(merged_df, sun_moon_df, on=["state", "year"], how="left")
+def daytime_merge(hp_file, sunrise_sunset_file, sun_moon_file, output_file):
+    """
+    Merges the HP analysis dataset with sunrise/sunset and sun/moon datasets.
 
-    # Save to new TSV file
-    merged_df.to_csv(output_file, sep="\t", index=False)
-    print(f"Merged TSV file saved at: {os.path.abspath(output_file)}")
+    :param hp_file: Path to the HP analysis file.
+    :param sunrise_sunset_file: Path to the sunrise/sunset dataset file.
+    :param sun_moon_file: Path to the sun/moon dataset file.
+    :param output_file: Path where the merged dataset will be saved.
+    """
+    # Check if files exist
+    if not table_exists(hp_file) or not os.path.exists(sunrise_sunset_file) or not os.path.exists(sun_moon_file):
+        print("Error: One or more input files are missing.")
+        return
+
+    # Load the datasets
+    hp_df = read_table(hp_file)
+    sunrise_sunset_df, sun_moon_df = load_daytime(sunrise_sunset_file, sun_moon_file)
+
+    # Standardize column names (lowercase, strip spaces)
+    hp_df.columns = hp_df.columns.str.strip().str.lower()
 
+    merged_df = daytime_attach(hp_df, sunrise_sunset_df, sun_moon_df)
 
-# Define file paths
-processed_dir = os.path.join("..", "data", "processed")
-raw_dir = os.path.join("..", "data", "raw")
+    # Save the merged dataset
+    saved_path = write_table(drop_location_ids(merged_df), output_file)
+    print(f"Merged file saved at: {os.path.abspath(saved_path)}")
 
-hp_file = os.path.join(processed_dir, "hp_analysis_v2.tsv")
-sunrise_sunset_file = os.path.join(raw_dir, "sunrise_sunset_data.tsv")
-sun_moon_file = os.path.join(raw_dir, "sun_moon_data_combined.tsv")
-output_file = os.path.join(processed_dir, "hp_analysis_daytime.tsv")
 
 # Run the function
-daytime_merge(hp_file, sunrise_sunset_file, sun_moon_file, output_file)
+if __name__ == "__main__":
+    # Define file paths
+    processed_dir = os.path.join("..", "data", "processed")
+    raw_dir = os.path.join("..", "data", "raw")
+
+    hp_file = os.path.join(processed_dir, "hp_analysis_v2.tsv")
+    sunrise_sunset_file = os.path.join(raw_dir, "sunrise_sunset_data.tsv")
+    sun_moon_file = os.path.join(raw_dir, "sun_moon_data_combined.tsv")
+    output_file = os.path.join(processed_dir, "hp_analysis_daytime.tsv")
+
+    daytime_merge(hp_file, sunrise_sunset_file, sun_moon_file, output_file)
@@ -1,5 +1,46 @@
 import os
 import pandas as pd
+from dimension_lookup import lookup_merge
+from table_io import read_table, write_table, table_exists
+from schema import apply_schema
+from location_keys import with_location_ids, keyed_dimension, drop_location_ids
+
+
+def load_tribes(state_tribes_file):
+    """
+    Loads the state tribes dataset with standardized column names.
+
+    :param state_tribes_file: Path to the tribes dataset file.
+    :return: The state tribes DataFrame.
+    """
+    state_tribes_df = pd.read_csv(state_tribes_file, sep="\t")
+    state_tribes_df.columns = state_tribes_df.columns.str.strip().str.lower()
+    return apply_schema(state_tribes_df)
+
+
+def tribes_attach(hp_df, state_tribes_df, locations=None, duplicate_keys="dedupe"):
+    """
+    Attaches the state tribes columns to an HP analysis DataFrame with lower-case column names.
+
+    :param hp_df: The HP analysis DataFrame.
+    :param state_tribes_df: The state tribes DataFrame from load_tribes.
+    :param locations: The LocationIndex of hp_df; built from hp_df if not given.
+    :param duplicate_keys: What to do with repeated dimension keys (see dimension_lookup.DUPLICATE_KEY_POLICIES).
+    :return: The merged DataFrame with the integer location keys, or None if a join column is missing.
+    """
+    # Define the common columns for merging
+    hp_common_column = "state_abbrev"  # HP dataset uses state abbreviations
+    tribes_common_column = "state"  # Tribes dataset uses state abbreviations
+
+    if hp_common_column not in hp_df.columns or tribes_common_column not in state_tribes_df.columns:
+        print(f"Error: Columns '{hp_common_column}' or '{tribes_common_column}' not found in one of the files.")
+        return None
+
+    # Merge the HP analysis dataset with the tribes per state dataset on the integer state id
+    hp_df, locations = with_location_ids(hp_df, locations)
+    state_tribes_df = keyed_dimension(state_tribes_df, tribes_common_column, "state_abbrev_id", locations.state_key,
+                                      "the tribes dataset")
+    return lookup_merge(hp_df, state_tribes_df, on="state_abbrev_id", duplicate_keys=duplicate_keys, name="tribes")
 
 
 def tribes_merge(hp_analysis_file, state_tribes_file, output_file_final):
@@ -11,41 +52,33 @@ def tribes_merge(hp_analysis_file, state_tribes_file, output_file_final):
     :param output_file_final: Path where the merged dataset will be saved.
     """
     # Check if files exist
-    if not os.path.exists(hp_analysis_file) or not os.path.exists(state_tribes_file):
+    if not table_exists(hp_analysis_file) or not os.path.exists(state_tribes_file):
         print(f"Error: One or both input files are missing: {hp_analysis_file}, {state_tribes_file}")
         return
 
-    # Load TSV files
-    hp_df = pd.read_csv(hp_analysis_file, sep="\t")
-    state_tribes_df = pd.read_csv(state_tribes_file, sep="\t")
+    # Load the datasets
+    hp_df = read_table(hp_analysis_file)
+    state_tribes_df = load_tribes(state_tribes_file)
 
     # Standardize column names (lowercase, strip spaces)
     hp_df.columns = hp_df.columns.str.strip().str.lower()
-    state_tribes_df.columns = state_tribes_df.columns.str.strip().str.lower()
-
-    # Define the common columns for merging
-    hp_common_column = "state_abbrev"  # HP dataset uses state abbreviations
-    tribes_common_column = "state"  # Tribes dataset uses full state names
 
-    if hp_common_column not in hp_df.columns or tribes_common_column not in state_tribes_df.columns:
-        print(f"Error: Columns '{hp_common_column}' or '{tribes_common_column}' not found in one of the files.")
+    final_merged_df = tribes_attach(hp_df, state_tribes_df)
+    if final_merged_df is None:
         return
 
-    # Merge the HP analysis dataset with the tribes per state dataset
-    final_merged_df = pd.merge(hp_df, state_tribes_df, left_on=hp_common_column, right_on=tribes_common_column,
-                               how="left")
+    # Save the final merged dataset
+    saved_path = write_table(drop_location_ids(final_merged_df), output_file_final)
+    print(f"Final merged file saved at: {os.path.abspath(saved_path)}")
 
-    # Save the final merged dataset to TSV
-    final_merged_df.to_csv(output_file_final, sep="\t", index=False)
-    print(f"Final merged TSV file saved at: {os.path.abspath(output_file_final)}")
 
+# Run the function
+if __name__ == "__main__":
+    # Define file paths
+    processed_dir = os.path.join("..", "data", "processed")
 
-# Define file paths
-processed_dir = os.path.join("..", "data", "processed")
-
-hp_analysis_file = os.path.join(processed_dir, "hp_analysis_v2.tsv")
-state_tribes_file = os.path.join(processed_dir, "tribes_per_state.tsv")
-output_file_final = os.path.join(processed_dir, "hp_analysis_tribes.tsv")
+    hp_analysis_file = os.path.join(processed_dir, "hp_analysis_v2.tsv")
+    state_tribes_file = os.path.join(processed_dir, "tribes_per_state.tsv")
+    output_file_final = os.path.join(processed_dir, "hp_analysis_tribes.tsv")
 
-# Run the function
-tribes_merge(hp_analysis_file, state_tribes_file, output_file_final)
+    tribes_merge(hp_analysis_file, state_tribes_file, output_file_final)
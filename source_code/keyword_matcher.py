@@ -0,0 +1,106 @@
+import re
+
+
+# Word runs exactly as the regex engine sees them for \b, so token boundaries
+# line up with the boundaries of the original rf"\b{keyword}\b" patterns.
+WORD_PATTERN = re.compile(r"\w+")
+
+
+# Step 1: Split a Keyword into Word Tokens and Separators
+def split_keyword(keyword):
+    """
+    Splits a keyword phrase into its word tokens and the literal separators between them.
+
+    Args:
+        keyword (str): A keyword such as "cold spot" or "self-inflict".
+
+    Returns:
+        tuple: (tokens, separators) where separators[i] sits between tokens[i] and tokens[i + 1].
+    """
+    keyword = keyword.lower()
+    matches = list(WORD_PATTERN.finditer(keyword))
+
+    if not matches or matches[0].start() != 0 or matches[-1].end() != len(keyword):
+        raise ValueError(f"Keyword must start and end with a word character: {keyword!r}")
+
+    tokens = tuple(match.group() for match in matches)
+    separators = tuple(keyword[left.end():right.start()] for left, right in zip(matches, matches[1:]))
+    return tokens, separators
+
+
+# Step 2: Compile All Keyword Tables into One Index
+def build_keyword_index(keyword_tables, lemmas=None):
+    """
+    Compiles every keyword table into a single index keyed on the first word of each phrase.
+
+    Args:
+        keyword_tables (dict): Maps a table name to either a list of keywords or a
+            dict of category -> list of keywords.
+        lemmas (dict): Optional token -> lemma table. When given, keyword tokens are reduced
+            to lemmas, so inflections of one root collapse into a single phrase.
+
+    Returns:
+        dict: first token -> list of (tokens, separators, labels), where labels is a
+            set of (table name, category) pairs. Flat lists use None as the category.
+    """
+    phrases = {}
+    for table_name, table in keyword_tables.items():
+        categories = table.items() if isinstance(table, dict) else [(None, table)]
+        for category, keywords in categories:
+            for keyword in keywords:
+                tokens, separators = split_keyword(keyword)
+                if lemmas is not None:
+                    tokens = tuple(lemmas.get(token, token) for token in tokens)
+                phrases.setdefault((tokens, separators), set()).add((table_name, category))
+
+    index = {}
+    for (tokens, separators), labels in phrases.items():
+        index.setdefault(tokens[0], []).append((tokens, separators, frozenset(labels)))
+    return index
+
+
+# Step 3: Scan a Text Once Against the Index
+def match_keywords(text, index, lemmas=None):
+    """
+    Finds every (table name, category) label whose keywords occur in the text.
+
+    Matching is case-insensitive and honours word boundaries the same way as
+    re.search(rf"\\b{keyword}\\b", text.lower()), but the text is tokenized once
+    and each token is looked up in the index instead of running one regex per keyword.
+
+    Args:
+        text (str): The text to scan.
+        index (dict): An index built by build_keyword_index.
+        lemmas (dict): The token -> lemma table the index was built with, if any.
+
+    Returns:
+        set: The matched (table name, category) labels.
+    """
+    text = text.lower()
+    matches = list(WORD_PATTERN.finditer(text))
+    words = [match.group() for match in matches]
+    if lemmas is not None:
+        words = [lemmas.get(word, word) for word in words]
+    found = set()
+
+    for position, word in enumerate(words):
+        candidates = index.get(word)
+        if candidates is None:
+            continue
+
+        for tokens, separators, labels in candidates:
+            if labels <= found:
+                continue
+            if len(tokens) == 1:
+                found |= labels
+                continue
+            end = position + len(tokens)
+            if end > len(words) or tuple(words[position:end]) != tokens:
+                continue
+            gaps = tuple(
+                text[matches[i].end():matches[i + 1].start()] for i in range(position, end - 1)
+            )
+            if gaps == separators:
+                found |= labels
+
+    return found
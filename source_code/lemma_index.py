@@ -0,0 +1,127 @@
+import os
+import pandas as pd
+from nltk.stem import WordNetLemmatizer
+from keyword_matcher import WORD_PATTERN
+
+
+# Step 1: Lemmatize One Token
+def lemmatize_token(lemmatizer, token):
+    """
+    Reduces a token to its root, trying the verb form first ("screaming" -> "scream") and then the noun form.
+
+    Args:
+        lemmatizer (WordNetLemmatizer): The NLTK lemmatizer.
+        token (str): A lower-case word token.
+
+    Returns:
+        str: The lemma of the token.
+    """
+    lemma = lemmatizer.lemmatize(token, "v")
+    if lemma == token:
+        lemma = lemmatizer.lemmatize(token, "n")
+    return lemma
+
+
+# Step 2: Collect the Vocabulary
+def collect_vocabulary(texts):
+    """
+    Collects the distinct lower-case word tokens of a collection of texts.
+
+    Args:
+        texts (iterable): Texts to tokenize; missing values are skipped.
+
+    Returns:
+        set: The distinct tokens.
+    """
+    vocabulary = set()
+    for text in texts:
+        if isinstance(text, str):
+            vocabulary.update(WORD_PATTERN.findall(text.lower()))
+    return vocabulary
+
+
+# Step 3: Load, Extend and Save the Token -> Lemma Table
+def load_lemma_table(file_path):
+    """
+    Loads the token -> lemma table from a TSV file.
+
+    Args:
+        file_path (str): Path to the lemma table TSV file.
+
+    Returns:
+        dict: token -> lemma (empty if the file does not exist).
+    """
+    if not os.path.exists(file_path):
+        return {}
+
+    # keep_default_na=False so tokens such as "nan" or "null" stay strings
+    table = pd.read_csv(file_path, sep="\t", dtype=str, keep_default_na=False)
+    return dict(zip(table["token"], table["lemma"]))
+
+
+def append_lemma_table(entries, file_path):
+    """
+    Appends token -> lemma entries to the TSV file, writing the header if the file is new.
+
+    Args:
+        entries (dict): token -> lemma, for tokens not in the file yet.
+        file_path (str): Path to the lemma table TSV file.
+    """
+    table = pd.DataFrame(sorted(entries.items()), columns=["token", "lemma"])
+    exists = os.path.exists(file_path)
+    table.to_csv(file_path, sep="\t", index=False, mode="a" if exists else "w", header=not exists)
+
+
+def update_lemma_table(texts, file_path, lemmas=None):
+    """
+    Extends the on-disk lemma table with any tokens of texts it does not contain yet.
+    lemmas must hold every entry of the file, as returned by an earlier call.
+
+    Each distinct token is lemmatized once and remembered across runs, so matching never
+    calls the lemmatizer per row.
+
+    Args:
+        texts (iterable): Texts whose vocabulary must be covered.
+        file_path (str): Path to the lemma table TSV file.
+        lemmas (dict): An already loaded table to extend; loaded from file_path if None.
+
+    Returns:
+        dict: token -> lemma covering every token of texts.
+    """
+    if lemmas is None:
+        lemmas = load_lemma_table(file_path)
+
+    new_tokens = collect_vocabulary(texts) - lemmas.keys()
+    if not new_tokens:
+        return lemmas
+
+    lemmatizer = WordNetLemmatizer()
+    try:
+        new_entries = {token: lemmatize_token(lemmatizer, token) for token in new_tokens}
+    except LookupError:
+        print("Error: WordNet data not found. Run: python -m nltk.downloader wordnet")
+        exit(1)
+
+    # Only the new tokens are written, so a chunked run does not rewrite the whole table per chunk
+    append_lemma_table(new_entries, file_path)
+    lemmas.update(new_entries)
+    print(f" Lemma table: {len(new_tokens)} new tokens lemmatized, {len(lemmas)} total")
+    return lemmas
+
+
+# Step 4: Slice the Table for One Batch of Texts
+def lemma_subset(lemmas, texts):
+    """
+    Returns the entries of the lemma table for the tokens of the given texts.
+
+    A worker matching a shard of descriptions only needs the lemmas of that shard's vocabulary,
+    and a keyword index only those of the keyword tokens.
+
+    Args:
+        lemmas (dict): token -> lemma.
+        texts (iterable): The texts to cover.
+
+    Returns:
+        dict: token -> lemma for the tokens of texts found in lemmas.
+    """
+    return {token: lemmas[token] for token in collect_vocabulary(texts) if token in lemmas}
@@ -0,0 +1,79 @@
+import json
+import hashlib
+import sqlite3
+
+
+# Step 1: Open the Cache Database
+def open_cache(file_path):
+    """
+    Opens (and creates if needed) the SQLite response cache.
+
+    Args:
+        file_path (str): Path to the SQLite database file.
+
+    Returns:
+        sqlite3.Connection: The open connection.
+    """
+    conn = sqlite3.connect(file_path)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, model TEXT NOT NULL, output TEXT NOT NULL)"
+    )
+    conn.commit()
+    return conn
+
+
+# Step 2: Key Each Request
+def cache_key(model_id, prompt_version, prompt, description):
+    """
+    Hashes everything that determines a model response into a cache key.
+
+    Args:
+        model_id (str): The model identifier.
+        prompt_version (str): Version of the prompt templates; bump it to invalidate old responses.
+        prompt (str): The prompt template placed before the description.
+        description (str): The description being processed.
+
+    Returns:
+        str: A hex digest identifying the request.
+    """
+    payload = json.dumps([model_id, prompt_version, prompt, description], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# Step 3: Read and Write Responses
+def lookup(conn, keys):
+    """
+    Fetches the cached model outputs for a list of keys.
+
+    Args:
+        conn (sqlite3.Connection): The cache connection.
+        keys (list): Keys returned by cache_key.
+
+    Returns:
+        dict: key -> raw model output, for the keys that are cached.
+    """
+    found = {}
+    unique_keys = list(set(keys))
+    # Stay below SQLite's limit on the number of bound parameters per statement
+    for start in range(0, len(unique_keys), 500):
+        batch = unique_keys[start:start + 500]
+        placeholders = ",".join("?" * len(batch))
+        rows = conn.execute(f"SELECT key, output FROM responses WHERE key IN ({placeholders})", batch)
+        found.update(rows)
+    return found
+
+
+def store(conn, model_id, outputs):
+    """
+    Saves model outputs and commits immediately so finished batches survive a crash.
+
+    Args:
+        conn (sqlite3.Connection): The cache connection.
+        model_id (str): The model identifier.
+        outputs (dict): key -> raw model output.
+    """
+    conn.executemany(
+        "INSERT OR REPLACE INTO responses (key, model, output) VALUES (?, ?, ?)",
+        [(key, model_id, output) for key, output in outputs.items()],
+    )
+    conn.commit()
@@ -0,0 +1,183 @@
+import numpy as np
+import pandas as pd
+
+# (name, postal abbreviation) of every state the datasets use; a state's id is its position here
+us_states = [
+    ("Alabama", "AL"), ("Alaska", "AK"), ("Arizona", "AZ"), ("Arkansas", "AR"), ("California", "CA"),
+    ("Colorado", "CO"), ("Connecticut", "CT"), ("Delaware", "DE"), ("District of Columbia", "DC"),
+    ("Florida", "FL"), ("Georgia", "GA"), ("Hawaii", "HI"), ("Idaho", "ID"), ("Illinois", "IL"),
+    ("Indiana", "IN"), ("Iowa", "IA"), ("Kansas", "KS"), ("Kentucky", "KY"), ("Louisiana", "LA"),
+    ("Maine", "ME"), ("Maryland", "MD"), ("Massachusetts", "MA"), ("Michigan", "MI"), ("Minnesota", "MN"),
+    ("Mississippi", "MS"), ("Missouri", "MO"), ("Montana", "MT"), ("Nebraska", "NE"), ("Nevada", "NV"),
+    ("New Hampshire", "NH"), ("New Jersey", "NJ"), ("New Mexico", "NM"), ("New York", "NY"),
+    ("North Carolina", "NC"), ("North Dakota", "ND"), ("Ohio", "OH"), ("Oklahoma", "OK"), ("Oregon", "OR"),
+    ("Pennsylvania", "PA"), ("Rhode Island", "RI"), ("South Carolina", "SC"), ("South Dakota", "SD"),
+    ("Tennessee", "TN"), ("Texas", "TX"), ("Utah", "UT"), ("Vermont", "VT"), ("Virginia", "VA"),
+    ("Washington", "WA"), ("West Virginia", "WV"), ("Wisconsin", "WI"), ("Wyoming", "WY"),
+    ("Puerto Rico", "PR"),
+]
+
+# Other spellings of a state, by abbreviation
+state_aliases = {
+    "Washington DC": "DC",
+    "Washington D.C.": "DC",
+    "D.C.": "DC",
+}
+
+# Integer key columns added to the fact table; they are dropped before any table is written
+location_id_columns = ["state_id", "state_abbrev_id", "city_id"]
+
+
+# Step 1: Normalize Spellings
+def normalize_spelling(value):
+    """Folds case and whitespace so "New  York " and "new york" are the same key."""
+    return " ".join(str(value).split()).casefold()
+
+
+def spelling_ids(values, ids):
+    """
+    Maps every value to the id of its normalized spelling, normalizing each distinct value once.
+
+    Args:
+        values (pd.Series): Location names (strings or categoricals).
+        ids (dict): normalized spelling -> id.
+
+    Returns:
+        np.ndarray: int32 id per value, -1 for missing or unknown spellings.
+    """
+    codes, uniques = pd.factorize(values)
+    unique_ids = np.array([ids.get(normalize_spelling(value), -1) for value in uniques] + [-1], dtype="int32")
+    # factorize codes missing values as -1, which picks the trailing -1
+    return unique_ids[codes]
+
+
+# Step 2: Build the Location Index Once
+class LocationIndex:
+    """
+    Compact integer ids for every state name, state abbreviation and city spelling.
+
+    States get fixed ids from us_states, shared by a state's name, abbreviation and aliases. City ids
+    and the ids of state spellings outside us_states come from the fact table, so a dimension
+    spelling only gets an id when some fact row can match it.
+    """
+
+    def __init__(self, state_spellings, city_spellings):
+        self.state_ids = {}
+        for state_id, (name, abbreviation) in enumerate(us_states):
+            self.state_ids[normalize_spelling(name)] = state_id
+            self.state_ids[normalize_spelling(abbreviation)] = state_id
+        for alias, abbreviation in state_aliases.items():
+            self.state_ids[normalize_spelling(alias)] = self.state_ids[normalize_spelling(abbreviation)]
+
+        self.unknown_states = sorted({normalize_spelling(value) for value in state_spellings} - set(self.state_ids))
+        for offset, spelling in enumerate(self.unknown_states):
+            self.state_ids[spelling] = len(us_states) + offset
+
+        self.city_ids = {spelling: city_id
+                         for city_id, spelling in enumerate(sorted({normalize_spelling(value) for value in city_spellings}))}
+
+    @classmethod
+    def from_fact(cls, hp_df):
+        """
+        Builds the index from the distinct location spellings of the HP analysis table.
+
+        Args:
+            hp_df (pd.DataFrame): The HP analysis DataFrame with lower-case column names.
+
+        Returns:
+            LocationIndex: The index.
+        """
+        state_spellings = [value for column in ("state", "state_abbrev") if column in hp_df.columns
+                           for value in hp_df[column].dropna().unique()]
+        city_spellings = hp_df["city"].dropna().unique() if "city" in hp_df.columns else []
+
+        locations = cls(state_spellings, city_spellings)
+        if locations.unknown_states:
+            print(f"Warning: state spellings outside the state table get their own ids: {locations.unknown_states}")
+        return locations
+
+    def state_key(self, values, source=None):
+        """
+        Returns the state id of each state name or abbreviation.
+
+        Args:
+            values (pd.Series): State names or abbreviations.
+            source (str): Dataset name; if given, spellings without an id are reported.
+
+        Returns:
+            np.ndarray: int32 ids, -1 for missing or unknown spellings.
+        """
+        return self.report_unmatched(values, spelling_ids(values, self.state_ids), source, "state")
+
+    def city_key(self, values, source=None):
+        """
+        Returns the city id of each city name.
+
+        Args:
+            values (pd.Series): City names.
+            source (str): Dataset name; if given, spellings without an id are reported.
+
+        Returns:
+            np.ndarray: int32 ids, -1 for missing or unknown spellings.
+        """
+        return self.report_unmatched(values, spelling_ids(values, self.city_ids), source, "city")
+
+    @staticmethod
+    def report_unmatched(values, ids, source, kind):
+        if source is not None:
+            unmatched = pd.unique(values[(ids < 0) & values.notna().to_numpy()])
+            if len(unmatched):
+                examples = ", ".join(map(str, unmatched[:5]))
+                print(f"Warning: {len(unmatched)} {kind} spelling(s) in {source} match no location of the "
+                      f"haunted places: {examples}")
+        return ids
+
+
+# Step 3: Key the Tables by Location Id
+def with_location_ids(hp_df, locations=None):
+    """
+    Adds the integer location keys to the HP analysis table, building the index if none is given.
+
+    Args:
+        hp_df (pd.DataFrame): The HP analysis DataFrame with lower-case column names.
+        locations (LocationIndex): An index built once for this table, or None.
+
+    Returns:
+        tuple: (hp_df with state_id, state_abbrev_id and city_id, locations).
+    """
+    if locations is None:
+        locations = LocationIndex.from_fact(hp_df)
+    if all(column in hp_df.columns for column in location_id_columns):
+        return hp_df, locations
+
+    keys = {}
+    if "state" in hp_df.columns:
+        keys["state_id"] = locations.state_key(hp_df["state"])
+    if "state_abbrev" in hp_df.columns:
+        keys["state_abbrev_id"] = locations.state_key(hp_df["state_abbrev"])
+    if "city" in hp_df.columns:
+        keys["city_id"] = locations.city_key(hp_df["city"])
+    return hp_df.assign(**keys), locations
+
+
+def keyed_dimension(dim_df, column, key_column, key, source):
+    """
+    Adds the integer key of a dimension's location column, keeping only rows with a known location.
+
+    Args:
+        dim_df (pd.DataFrame): The dimension table.
+        column (str): Its location column.
+        key_column (str): Name of the key column, matching the fact table key it joins to.
+        key (callable): LocationIndex.state_key or LocationIndex.city_key.
+        source (str): Dataset name, for reporting spellings without an id.
+
+    Returns:
+        pd.DataFrame: The dimension table with key_column appended.
+    """
+    ids = key(dim_df[column], source)
+    return dim_df.assign(**{key_column: ids})[ids >= 0]
+
+
+def drop_location_ids(df):
+    """Removes the integer location keys before a table is written."""
+    return df.drop(columns=[column for column in location_id_columns if column in df.columns])
@@ -0,0 +1,52 @@
+import sys
+import resource
+import torch
+from transformers import pipeline
+
+# "auto" keeps the original full-precision placement chosen by accelerate
+BACKENDS = ("auto", "cpu-fp32", "cpu-int8")
+
+
+# Step 1: Load the Pipeline for a Backend
+def load_pipeline(model_id, backend="auto"):
+    """
+    Loads a text-generation pipeline on the selected backend.
+
+    "cpu-int8" loads the model in float32 on the CPU and replaces every nn.Linear with a
+    dynamically quantized int8 version: weights are stored as int8 and activations are
+    quantized on the fly, which roughly quarters the weight memory and speeds up CPU matmuls.
+
+    Args:
+        model_id (str): The Hugging Face model identifier.
+        backend (str): One of BACKENDS.
+
+    Returns:
+        transformers.Pipeline: The text-generation pipeline, with its backend name in pipe.backend.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend {backend!r}, expected one of {', '.join(BACKENDS)}")
+
+    if backend == "auto":
+        pipe = pipeline("text-generation", model=model_id, device_map="auto")
+    else:
+        pipe = pipeline("text-generation", model=model_id, device="cpu", torch_dtype=torch.float32)
+
+    if backend == "cpu-int8":
+        # In place, so the float32 weights are released instead of kept next to the int8 copy
+        torch.quantization.quantize_dynamic(pipe.model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+
+    pipe.backend = backend
+    return pipe
+
+
+# Step 2: Measure Memory
+def peak_rss_mb():
+    """
+    Returns the peak resident set size of the current process in megabytes.
+
+    Returns:
+        float: Peak RSS in MB.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
@@ -0,0 +1,167 @@
+import copy
+import torch
+from transformers import StoppingCriteria, StoppingCriteriaList
+
+# Texts appended to a prompt prefix to find which of its tokens never merge with the description
+BOUNDARY_PROBES = ["A", "a", "1", " the", '"', "\n", "."]
+
+# Stands in for the description while splitting the chat template into prefix and suffix
+DESCRIPTION_MARKER = "\x00DESCRIPTION\x00"
+
+# The text-generation pipeline's own cap; generate() without one stops at max_length=20 tokens
+DEFAULT_MAX_NEW_TOKENS = 256
+
+
+# Step 1: Stop at the End of the Answer
+def answer_complete(text):
+    """
+    Tells whether generated text holds a complete answer after '####'.
+
+    A JSON object (combined mode) is complete once its braces balance, even when it spans several
+    lines; any other answer is complete at the end of its line.
+
+    Args:
+        text (str): The text generated so far.
+
+    Returns:
+        bool: True once the answer is complete.
+    """
+    marker = text.find("####")
+    if marker < 0:
+        return False
+
+    answer = text[marker + 4:].lstrip()
+    if answer.startswith("{"):
+        depth = 0
+        for char in answer:
+            depth += {"{": 1, "}": -1}.get(char, 0)
+            if depth == 0:
+                return True
+        return False
+
+    # Require a non-blank answer before the line break so "####\n1890" is not cut short
+    return "\n" in answer
+
+
+class StopAfterAnswer(StoppingCriteria):
+    """Stops generation once the answer after '####' is complete (see answer_complete)."""
+
+    def __init__(self, tokenizer, prompt_length):
+        self.tokenizer = tokenizer
+        self.prompt_length = prompt_length
+
+    def __call__(self, input_ids, scores, **kwargs):
+        text = self.tokenizer.decode(input_ids[0, self.prompt_length:], skip_special_tokens=True)
+        done = answer_complete(text)
+        return torch.full((input_ids.shape[0],), done, dtype=torch.bool, device=input_ids.device)
+
+
+# Step 2: Encode the Shared Prompt Prefix Once
+def build_prefix(pipe, prompt):
+    """
+    Runs the fixed part of a prompt through the model once and keeps its attention key/value cache.
+
+    Only the leading tokens that come out the same whatever description follows are cached, so
+    prompts rebuilt from the cache tokenize exactly like the full prompt.
+
+    Args:
+        pipe (transformers.Pipeline): The text-generation pipeline.
+        prompt (str): The few-shot prompt placed before each description.
+
+    Returns:
+        dict: The prefix token ids and their key/value cache.
+    """
+    tokenizer = pipe.tokenizer
+    text = tokenizer.apply_chat_template(
+        [{"role": "user", "content": prompt + DESCRIPTION_MARKER}], tokenize=False, add_generation_prompt=True
+    )
+    prefix_text = text.split(DESCRIPTION_MARKER)[0]
+
+    prefix_ids = tokenizer(prefix_text, add_special_tokens=False)["input_ids"]
+    length = len(prefix_ids)
+    for probe in BOUNDARY_PROBES:
+        probe_ids = tokenizer(prefix_text + probe, add_special_tokens=False)["input_ids"]
+        while length > 0 and probe_ids[:length] != prefix_ids[:length]:
+            length -= 1
+    prefix_ids = prefix_ids[:length]
+
+    input_ids = torch.tensor([prefix_ids], device=pipe.model.device)
+    with torch.no_grad():
+        past_key_values = pipe.model(input_ids, use_cache=True).past_key_values
+
+    return {"ids": prefix_ids, "past_key_values": past_key_values}
+
+
+# Step 3: Generate on Top of the Cached Prefix
+class PrefixCachedPipe:
+    """
+    Wraps a text-generation pipeline so prompts starting with a known few-shot prefix reuse its
+    key/value cache and only the description is encoded per row.
+
+    It is called like the pipeline and returns the same structure, so it can replace the pipeline
+    in every extraction mode. Rows are generated one at a time; prompts that do not start with a
+    registered prefix go to the wrapped pipeline.
+    """
+
+    def __init__(self, pipe, prompts, max_new_tokens=DEFAULT_MAX_NEW_TOKENS, stop_after_answer=False):
+        self.pipe = pipe
+        self.tokenizer = pipe.tokenizer
+        self.model = pipe.model
+        self.prompts = prompts
+        self.prefixes = {}
+        self.max_new_tokens = max_new_tokens
+        self.stop_after_answer = stop_after_answer
+
+    def generation_settings(self):
+        """Describes the settings that change the generated text, for cache keys and fingerprints."""
+        return {
+            "backend": getattr(self.pipe, "backend", "auto"),
+            # The pipeline's own cap gives the same text, so only another cap is reported
+            "max_new_tokens": None if self.max_new_tokens == DEFAULT_MAX_NEW_TOKENS else self.max_new_tokens,
+            "stop_after_answer": self.stop_after_answer,
+        }
+
+    def prefix_for(self, content):
+        for prompt in self.prompts:
+            if content.startswith(prompt):
+                if prompt not in self.prefixes:
+                    self.prefixes[prompt] = build_prefix(self.pipe, prompt)
+                return self.prefixes[prompt]
+        return None
+
+    def generate(self, messages):
+        prefix = self.prefix_for(messages[-1]["content"])
+        if prefix is None:
+            return self.pipe(messages, max_new_tokens=self.max_new_tokens)[0]["generated_text"][-1]["content"]
+
+        text = self.tokenizer.apply_chat_template(messages, tokenize=False, add_generation_prompt=True)
+        input_ids = self.tokenizer(text, add_special_tokens=False)["input_ids"]
+        past_key_values = None
+        if input_ids[:len(prefix["ids"])] == prefix["ids"]:
+            # generate() extends the cache in place, so every row starts from a fresh copy
+            past_key_values = copy.deepcopy(prefix["past_key_values"])
+
+        input_ids = torch.tensor([input_ids], device=self.model.device)
+        kwargs = {"max_new_tokens": self.max_new_tokens}
+        if self.stop_after_answer:
+            kwargs["stopping_criteria"] = StoppingCriteriaList([StopAfterAnswer(self.tokenizer, input_ids.shape[1])])
+
+        with torch.no_grad():
+            output_ids = self.model.generate(
+                input_ids,
+                attention_mask=torch.ones_like(input_ids),
+                past_key_values=past_key_values,
+                pad_token_id=self.tokenizer.pad_token_id,
+                **kwargs,
+            )
+        return self.tokenizer.decode(output_ids[0, input_ids.shape[1]:], skip_special_tokens=True)
+
+    def __call__(self, messages, batch_size=None, **kwargs):
+        single = isinstance(messages[0], dict)
+        conversations = [messages] if single else messages
+
+        outputs = [
+            [{"generated_text": conversation + [{"role": "assistant", "content": self.generate(conversation)}]}]
+            for conversation in conversations
+        ]
+        return outputs[0] if single else outputs
@@ -1,5 +1,6 @@
 import pandas as pd
 import os
+from table_io import read_table, write_table
 
 # Define relative file paths
 base_path = os.path.join("..","data", "processed")
@@ -7,8 +8,8 @@ input_file = os.path.join(base_path, "hp_analysis_hw2.tsv")
 output_file = os.path.join(base_path, "hp_analysis_hw2.tsv")
 columns_output_file = os.path.join(base_path, "hp_analysis_final_columns.txt")
 
-# Read the TSV file, dropping unnamed index columns if they exist
-df = pd.read_csv(input_file, sep='\t')
+# Read the merged table, dropping unnamed index columns if they exist
+df = read_table(input_file)
 
 # Drop any unwanted 'Unnamed' columns
 df = df.loc[:, ~df.columns.str.contains('^Unnamed')]
@@ -16,11 +17,11 @@ df = df.loc[:, ~df.columns.str.contains('^Unnamed')]
 # Rename column
 df.rename(columns={'hp_date': 'hp_day'}, inplace=True)
 
-# Save the updated DataFrame back to TSV format without index
-df.to_csv(output_file, sep='\t', index=False)
+# Save the updated DataFrame back in the processed table format, without index
+write_table(df, output_file)
 
-# Read the saved TSV file again to confirm the column names
-df = pd.read_csv(output_file, sep='\t')
+# Read the saved table again to confirm the column names
+df = read_table(output_file)
 
 # Save column names to a text file
 with open(columns_output_file, 'w') as f:
@@ -1,5 +1,6 @@
 import os
 import pandas as pd
+from schema import apply_schema
 
 
 # **Step 1: Define Paths**
@@ -69,10 +70,30 @@ def load_csv(file_path):
         print(f"Error loading CSV: {e}")
         return None
 
+    return apply_schema(df)
+
+
+# **Step 4: Assign Stable Row IDs**
+def assign_row_ids(df, start=0):
+    """
+    Adds an integer 'row_id' column numbering the haunted places in file order.
+
+    Every later stage carries this column, so stages can be joined on a compact integer key
+    instead of the free-text description. A DataFrame that already has row ids is left as is.
+
+    Args:
+        df (pd.DataFrame): The haunted places DataFrame.
+        start (int): Id of the first row, for DataFrames read in chunks.
+
+    Returns:
+        pd.DataFrame: The DataFrame with 'row_id' as its first column.
+    """
+    if "row_id" not in df.columns:
+        df.insert(0, "row_id", pd.RangeIndex(start, start + len(df), dtype="int64"))
     return df
 
 
-# **Step 4: Convert CSV to TSV**
+# **Step 5: Convert CSV to TSV**
 def convert_csv_to_tsv(df, output_path):
     """
     Converts a DataFrame to a TSV (Tab-Separated Values) file.
@@ -85,7 +106,7 @@ def convert_csv_to_tsv(df, output_path):
     print(f"File successfully converted to TSV: {os.path.abspath(output_path)}")
 
 
-# **Step 5: Generate a Filtered List (City, Country, State, State Abbreviation)**
+# **Step 6: Generate a Filtered List (City, Country, State, State Abbreviation)**
 def extract_location_columns(df, output_path):
     """
     Extracts and saves a list of city, country, state, and state abbreviation.
@@ -120,6 +141,7 @@ def main():
     if df is None:
         return  # Exit if CSV loading fails
 
+    df = assign_row_ids(df)
     convert_csv_to_tsv(df, paths["tsv_file"])
     extract_location_columns(df, paths["filtered_list"])
 
@@ -0,0 +1,406 @@
+import os
+import ast
+import sys
+import glob
+import json
+import time
+import hashlib
+import argparse
+import subprocess
+from dag_executor import run_dag, print_timings
+from table_io import stored_path
+
+source_dir = os.path.dirname(os.path.abspath(__file__))
+raw_dir = os.path.join("..", "data", "raw")
+processed_dir = os.path.join("..", "data", "processed")
+
+
+def raw(name):
+    return os.path.join(raw_dir, name)
+
+
+def processed(name):
+    return os.path.join(processed_dir, name)
+
+
+# Step 1: Declare the Stages
+# stage name -> spec with:
+#   "script": the script run from source_code, as the scripts expect their relative ../data paths,
+#   "inputs" / "outputs": files the stage reads and writes; glob patterns match many files and a
+#                         path without an extension names a table_io table stored in any format.
+#                         A stage depends on the stages declaring one of its inputs as an output,
+#                         so a file is spelled the same way in both places,
+#   "fetch": optional; the stage downloads its data, so it only runs when its outputs are missing.
+stages = {
+    "scrap_alcohol": {
+        "script": "scrap_alcohol.py",
+        "inputs": [],
+        "outputs": [raw("state_alcohol_abuse.tsv")],
+        "fetch": True,
+    },
+    "scrap_ncvs": {
+        "script": "scrap_ncvs.py",
+        "inputs": [],
+        "outputs": [raw("ncvs_personal_*.json")],
+        "fetch": True,
+    },
+    "scrap_sun_moon_1700": {
+        "script": "scrap_suno_day_night_1700.py",
+        "inputs": [],
+        "outputs": [raw("sun_moon_17[0-9][0-9].json")],
+        "fetch": True,
+    },
+    "scrap_sun_moon_1800": {
+        "script": "scrap_usno_day_night_1800.py",
+        "inputs": [],
+        "outputs": [raw("sun_moon_1[89][0-9][0-9].json"), raw("sun_moon_20[0-9][0-9].json")],
+        "fetch": True,
+    },
+    "process_haunted_data": {
+        "script": "process_haunted_data.py",
+        "inputs": [raw("haunted_places.csv")],
+        "outputs": [raw("haunted_places.tsv"), raw("haunted_places_list.csv")],
+    },
+    "scrap_daytime": {
+        "script": "scrap_daytime.py",
+        "inputs": [raw("haunted_places_list.csv")],
+        "outputs": [raw("sunrise_sunset_data.tsv")],
+        "fetch": True,
+    },
+    "process_apportionment": {
+        "script": "process_apportionment.py",
+        "inputs": [raw("apportionment.csv")],
+        "outputs": [raw("apportionment.tsv")],
+    },
+    "process_ncvs": {
+        "script": "process_ncvs.py",
+        "inputs": [raw("ncvs_personal_*.json")],
+        "outputs": [raw("ncvs_personal_combined.tsv"), processed("ncvs_personal_engineered.tsv")],
+    },
+    "process_tribe_data": {
+        "script": "process_tribe_data.py",
+        "inputs": [raw("US_Native_American_Indian_Tribes.csv")],
+        "outputs": [processed("tribes_per_state.tsv")],
+    },
+    "process_usno_day_night": {
+        "script": "process_usno_day_night.py",
+        "inputs": [
+            raw("sun_moon_17[0-9][0-9].json"),
+            raw("sun_moon_1[89][0-9][0-9].json"),
+            raw("sun_moon_20[0-9][0-9].json"),
+        ],
+        "outputs": [raw("sun_moon_data_combined.tsv")],
+    },
+    "analysis_v1": {
+        "script": "analysis_v1.py",
+        "inputs": [raw("haunted_places.tsv")],
+        "outputs": [processed("hp_analysis_v1")],
+    },
+    "analysis_dates_witness": {
+        "script": "analysis_dates_witness.py",
+        "inputs": [raw("haunted_places.tsv")],
+        "outputs": [processed("hp_with_date_and_witness_count")],
+    },
+    "analysis_v2": {
+        "script": "analysis_v2.py",
+        "inputs": [processed("hp_with_date_and_witness_count"), processed("hp_analysis_v1")],
+        "outputs": [processed("hp_analysis_v2")],
+    },
+    "join_all": {
+        "script": "join_all.py",
+        "inputs": [
+            processed("hp_analysis_v2"),
+            raw("state_alcohol_abuse.tsv"),
+            raw("apportionment.tsv"),
+            processed("ncvs_personal_engineered.tsv"),
+            raw("sunrise_sunset_data.tsv"),
+            raw("sun_moon_data_combined.tsv"),
+            processed("tribes_per_state.tsv"),
+        ],
+        "outputs": [processed("hp_analysis_hw2")],
+    },
+    "process_analysis": {
+        "script": "process_analysis.py",
+        # Renames a column of the merged table in place
+        "inputs": [processed("hp_analysis_hw2")],
+        "outputs": [processed("hp_analysis_hw2"), processed("hp_analysis_final_columns.txt")],
+    },
+}
+
+
+def stage_dependencies(stages):
+    """
+    Derives each stage's upstream stages from the files it reads.
+
+    Args:
+        stages (dict): stage name -> spec.
+
+    Returns:
+        dict: stage name -> names of the stages writing one of its inputs (a stage updating a file
+            in place does not depend on itself).
+    """
+    writers = {}
+    for name, stage in stages.items():
+        for output in stage["outputs"]:
+            writers.setdefault(output, []).append(name)
+
+    dependencies = {}
+    for name, stage in stages.items():
+        upstream = []
+        for path in stage["inputs"]:
+            for writer in writers.get(path, []):
+                if writer != name and writer not in upstream:
+                    upstream.append(writer)
+        dependencies[name] = upstream
+    return dependencies
+
+
+# Step 2: Fingerprint Stage Code and Inputs
+def resolve(path):
+    """
+    Lists the files a declared input or output stands for.
+
+    Args:
+        path (str): A file path, a glob pattern, or a table path without an extension.
+
+    Returns:
+        list: The existing files, sorted.
+    """
+    if glob.has_magic(path):
+        return sorted(glob.glob(path))
+    if not os.path.splitext(path)[1]:
+        stored = stored_path(path)
+        return [stored] if stored else []
+    return [path] if os.path.exists(path) else []
+
+
+def file_digest(path):
+    """Returns the SHA-256 hex digest of a file's content."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def code_files(script):
+    """
+    Finds a script and every source_code module it imports, directly or indirectly.
+
+    Args:
+        script (str): File name of the script in source_code.
+
+    Returns:
+        list: File names of the script and its local modules, sorted.
+    """
+    found = set()
+    pending = [script]
+    while pending:
+        file_name = pending.pop()
+        if file_name in found:
+            continue
+        found.add(file_name)
+
+        with open(os.path.join(source_dir, file_name), encoding="utf-8") as f:
+            tree = ast.parse(f.read(), filename=file_name)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                modules = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                modules = [node.module]
+            else:
+                continue
+            for module in modules:
+                candidate = module.split(".")[0] + ".py"
+                if os.path.exists(os.path.join(source_dir, candidate)):
+                    pending.append(candidate)
+    return sorted(found)
+
+
+def stage_fingerprint(stage):
+    """
+    Hashes everything a stage's outputs depend on: its code, its arguments and its input contents.
+
+    Args:
+        stage (dict): The stage spec.
+
+    Returns:
+        str: A hex digest that changes whenever the code or an input changes.
+    """
+    parts = {
+        "code": {name: file_digest(os.path.join(source_dir, name)) for name in code_files(stage["script"])},
+        "args": stage.get("args", []),
+        "inputs": {path: {file: file_digest(file) for file in resolve(path)} for path in stage["inputs"]},
+    }
+    payload = json.dumps(parts, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# Step 3: Run a Stage Unless It Is Up to Date
+def run_stage(name, stage, recorded, force, *upstream):
+    """
+    Runs one stage's script unless its fingerprint matches the last successful run.
+
+    Args:
+        name (str): Stage name.
+        stage (dict): The stage spec.
+        recorded (str): Fingerprint of the last successful run, or None.
+        force (bool): Run even when the stage is up to date.
+        *upstream: Results of the upstream stages.
+
+    Returns:
+        dict: {"status": "ran" | "skipped" | "failed" | "blocked", "fingerprint": ...}.
+    """
+    if any(result["status"] in ("failed", "blocked") for result in upstream):
+        return {"status": "blocked", "fingerprint": recorded}
+
+    outputs_exist = all(resolve(path) for path in stage["outputs"])
+    if stage.get("fetch") and outputs_exist and not force:
+        return {"status": "skipped", "fingerprint": recorded}
+
+    fingerprint = stage_fingerprint(stage)
+    if fingerprint == recorded and outputs_exist and not force:
+        return {"status": "skipped", "fingerprint": fingerprint}
+
+    log_file = os.path.normpath(os.path.join(source_dir, processed_dir, "pipeline_logs", f"{name}.log"))
+    os.makedirs(os.path.dirname(log_file), exist_ok=True)
+    with open(log_file, "w", encoding="utf-8") as log:
+        completed = subprocess.run([sys.executable, stage["script"], *stage.get("args", [])], cwd=source_dir,
+                                   stdout=log, stderr=subprocess.STDOUT)
+    if completed.returncode != 0:
+        return {"status": "failed", "fingerprint": recorded, "log": log_file}
+
+    # Fingerprint again so a stage updating its own input in place is up to date afterwards
+    return {"status": "ran", "fingerprint": stage_fingerprint(stage), "log": log_file}
+
+
+# Step 4: Run the Stages in Dependency Order
+def load_state(state_file):
+    """Returns the recorded fingerprint of every stage that ran successfully."""
+    if not os.path.exists(state_file):
+        return {}
+    with open(state_file, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_state(state, state_file):
+    """Writes the fingerprints atomically."""
+    temp_path = state_file + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(temp_path, state_file)
+
+
+def select_stages(targets, dependencies):
+    """
+    Returns the target stages and everything upstream of them.
+
+    Args:
+        targets (list): Stage names; empty selects every stage.
+        dependencies (dict): stage name -> upstream stage names.
+
+    Returns:
+        set: The selected stage names.
+    """
+    if not targets:
+        return set(dependencies)
+
+    selected = set()
+    pending = list(targets)
+    while pending:
+        name = pending.pop()
+        if name not in selected:
+            selected.add(name)
+            pending.extend(dependencies[name])
+    return selected
+
+
+def run_pipeline(targets=(), force=(), workers=None, state_file=None, mark_built=()):
+    """
+    Brings the selected stages up to date, running independent stages in parallel.
+    Stages run from source_code, as the scripts read and write relative ../data paths.
+
+    A stage re-runs only if its code, its arguments or the content of one of its inputs changed
+    since its last successful run, so an upstream stage that re-runs but writes the same output
+    does not trigger the stages after it.
+
+    Args:
+        targets (list): Stages to bring up to date, with their upstream stages; empty selects all.
+        force (list): Stages to run even when up to date.
+        workers (int): Stages running at once; None uses one per CPU.
+        state_file (str): Where fingerprints are recorded (default: data/processed/pipeline_state.json).
+        mark_built (list): Stages whose existing outputs are recorded as up to date without running them,
+            e.g. outputs produced before the runner existed.
+
+    Returns:
+        bool: True if no stage failed.
+    """
+    os.chdir(source_dir)
+    state_file = state_file or os.path.join(processed_dir, "pipeline_state.json")
+    state = load_state(state_file)
+    dependencies = stage_dependencies(stages)
+
+    for name in mark_built:
+        if all(resolve(path) for path in stages[name]["outputs"]):
+            state[name] = stage_fingerprint(stages[name])
+            print(f" {name:<24} marked as built")
+        else:
+            print(f" {name:<24} has missing outputs, not marked as built")
+
+    selected = select_stages(targets, dependencies)
+
+    graph = {
+        name: {
+            "func": run_stage,
+            "args": (name, stages[name], state.get(name), name in force),
+            "deps": [dep for dep in dependencies[name] if dep in selected],
+        }
+        for name in stages if name in selected
+    }
+
+    started_at = time.time()
+    results, timings = run_dag(graph, workers)
+
+    for name in graph:
+        result = results[name]
+        if result["status"] == "ran":
+            state[name] = result["fingerprint"]
+        detail = f" (log: {result['log']})" if result["status"] == "failed" else ""
+        print(f" {name:<24} {result['status']}{detail}")
+    save_state(state, state_file)
+
+    print_timings(timings, time.time() - started_at)
+    return all(result["status"] in ("ran", "skipped") for result in results.values())
+
+
+# Command-Line Arguments
+def parse_args():
+    """
+    Parses the command-line options for the pipeline run.
+
+    Returns:
+        argparse.Namespace: The parsed options.
+    """
+    parser = argparse.ArgumentParser(description="Re-run the pipeline stages whose code or inputs changed.")
+    parser.add_argument("targets", nargs="*", metavar="stage",
+                        help=f"Stages to bring up to date with their upstream stages (default: all). "
+                             f"One of: {', '.join(stages)}.")
+    parser.add_argument("--force", nargs="+", default=[], choices=sorted(stages), metavar="stage",
+                        help="Run these stages even if they are up to date (download stages re-download).")
+    parser.add_argument("--mark-built", nargs="+", default=[], choices=sorted(stages), metavar="stage",
+                        help="Record these stages' existing outputs as up to date without running them.")
+    parser.add_argument("--workers", type=int, default=None, help="Stages running at once (default: one per CPU).")
+    args = parser.parse_args()
+
+    unknown = [name for name in args.targets if name not in stages]
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(unknown)}")
+    return args
+
+
+# Execute Main Function
+if __name__ == "__main__":
+    args = parse_args()
+    succeeded = run_pipeline(targets=args.targets, force=args.force, workers=args.workers,
+                             mark_built=args.mark_built)
+    sys.exit(0 if succeeded else 1)
@@ -0,0 +1,156 @@
+import re
+import numpy as np
+import pandas as pd
+
+# Column name (lower case) -> compact dtype. Every loader applies this registry through apply_schema,
+# so a column has the same type in every stage and after every merge.
+column_dtypes = {
+    # Haunted places: repeated labels become categoricals (one small code per row instead of one string)
+    "city": "category",
+    "country": "category",
+    "state": "category",
+    "state_abbrev": "category",
+    "apparition_type": "category",
+    "event_type": "category",
+    "time_of_day": "category",
+    "year": "int16",
+    "quarter": "int8",
+    # Dimension datasets
+    "geography_type": "category",
+    "usgs_region": "category",
+    "curphase": "category",
+    "fracillum": "category",
+    # Clock times take at most one value per minute of the day
+    "city_sunrise": "category",
+    "city_sunset": "category",
+    "sunrise": "category",
+    "sunset": "category",
+    "sun_upper_transit": "category",
+    "begin_civil_twilight": "category",
+    "end_civil_twilight": "category",
+    "moonrise": "category",
+    "moonset": "category",
+    "moon_upper_transit": "category",
+    # NCVS decoded labels and survey weights
+    "age": "category",
+    "sex": "category",
+    "hispanic origin": "category",
+    "race": "category",
+    "race/hispanic origin": "category",
+    "annual household income": "category",
+    "annual household income (imputed)": "category",
+    "marital status": "category",
+    "population size": "category",
+    "region": "category",
+    "household msa": "category",
+    "household locale": "category",
+    "education level": "category",
+    "education level (extended)": "category",
+    "veteran status": "category",
+    "citizenship status": "category",
+    "aggregate type of crime": "category",
+    "type of crime": "category",
+    "violent crime excluding simple assault": "category",
+    "reporting to police": "category",
+    "victim services": "category",
+    "location of crime": "category",
+    "victim-offender relationship": "category",
+    "presence of weapon": "category",
+    "weapon category": "category",
+    "injury": "category",
+    "type of injury": "category",
+    "medical treatment for injuries": "category",
+    "offender age": "category",
+    "offender sex": "category",
+    "offender race/hispanic origin": "category",
+    "series crime indicator": "category",
+    "victimization weight": "float32",
+    "series adjusted victimization weight": "float32",
+    "person population weight": "float32",
+}
+
+# Suffixes pandas adds to overlapping names in merges (state_x, city_y) and read_csv to duplicates (state.1)
+merge_suffix = re.compile(r"(_x|_y|\.\d+)$")
+
+
+# Step 1: Look Up a Column's Registered Type
+def registered_dtype(column):
+    """
+    Finds the registered dtype of a column, also under the suffixes merges add to its name.
+
+    Args:
+        column (str): Column name in any case, e.g. "State", "state_x" or "state.1".
+
+    Returns:
+        str: The registered dtype, or None if the column is not registered.
+    """
+    name = str(column).strip().lower()
+    return column_dtypes.get(name) or column_dtypes.get(merge_suffix.sub("", name))
+
+
+# Step 2: Convert a Column Without Changing Its Values
+def cast_column(series, dtype):
+    """
+    Converts a column to its registered dtype when that keeps every value as it is.
+
+    Labels only become categoricals when they are strings, and integer columns are only narrowed
+    when they hold no missing values and every value fits; otherwise the column is returned as it is,
+    so written tables keep their exact text.
+
+    Args:
+        series (pd.Series): The column.
+        dtype (str): "category", a numpy integer type such as "int16", or "float32".
+
+    Returns:
+        pd.Series: The converted column, or series itself.
+    """
+    if series.dtype == dtype:
+        return series
+
+    if dtype == "category":
+        is_text = pd.api.types.is_object_dtype(series.dtype) or pd.api.types.is_string_dtype(series.dtype)
+        return series.astype("category") if is_text else series
+
+    if not pd.api.types.is_numeric_dtype(series.dtype) or pd.api.types.is_bool_dtype(series.dtype):
+        return series
+
+    if dtype.startswith("float"):
+        return series.astype(dtype)
+
+    if series.isna().any():
+        return series
+    values = series.to_numpy(dtype="float64")
+    limits = np.iinfo(dtype)
+    if len(values) and (values.min() < limits.min or values.max() > limits.max or (values != np.round(values)).any()):
+        return series
+    return series.astype(dtype)
+
+
+# Step 3: Apply the Registry to a Table
+def apply_schema(df):
+    """
+    Converts every registered column of a table to its compact dtype.
+
+    Args:
+        df (pd.DataFrame): A table from any stage.
+
+    Returns:
+        pd.DataFrame: The table with its registered columns converted; other columns are unchanged.
+    """
+    converted = {}
+    for position, column in enumerate(df.columns):
+        dtype = registered_dtype(column)
+        if dtype is None:
+            continue
+        series = df.iloc[:, position]
+        cast = cast_column(series, dtype)
+        if cast is not series:
+            converted[position] = cast
+
+    if not converted:
+        return df
+
+    df = df.copy(deep=False)
+    for position, series in converted.items():
+        df.isetitem(position, series)
+    return df
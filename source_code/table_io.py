@@ -0,0 +1,147 @@
+import os
+import importlib.util
+import pandas as pd
+from schema import apply_schema
+
+# Processed tables are stored as compressed Parquet when pyarrow is installed, otherwise as TSV
+FORMATS = ("parquet", "tsv")
+extensions = {"parquet": ".parquet", "tsv": ".tsv"}
+default_format = os.environ.get(
+    "HP_TABLE_FORMAT", "parquet" if importlib.util.find_spec("pyarrow") is not None else "tsv"
+)
+
+
+# Step 1: Locate a Table on Disk
+def table_path(file_path, fmt):
+    """
+    Returns the path of a table stored in the given format.
+
+    Args:
+        file_path (str): Path of the table in any format, e.g. ../data/processed/hp_analysis_v2.tsv.
+        fmt (str): One of FORMATS.
+
+    Returns:
+        str: The same path with the extension of fmt.
+    """
+    return os.path.splitext(file_path)[0] + extensions[fmt]
+
+
+def stored_path(file_path):
+    """
+    Finds the stored copy of a table, whichever format it was written in.
+
+    Args:
+        file_path (str): Path of the table in any format.
+
+    Returns:
+        str: The Parquet or TSV copy, or None if neither exists.
+
+    Raises:
+        ValueError: If both copies exist, since either one may be stale.
+    """
+    candidates = [table_path(file_path, fmt) for fmt in FORMATS]
+    existing = [path for path in candidates if os.path.exists(path)]
+    if not existing:
+        # Tables outside the pipeline (e.g. .csv exports) are read as they are
+        return file_path if os.path.exists(file_path) else None
+    if len(existing) > 1:
+        raise ValueError(f"Table stored in more than one format: {', '.join(existing)}; delete the stale copy")
+    return existing[0]
+
+
+def remove_other_formats(file_path, fmt):
+    """
+    Deletes the copies of a table in every format but fmt, so readers never find a stale one.
+
+    Args:
+        file_path (str): Path of the table in any format.
+        fmt (str): The format just written; one of FORMATS.
+    """
+    for other in FORMATS:
+        if other != fmt and os.path.exists(table_path(file_path, other)):
+            os.remove(table_path(file_path, other))
+
+
+def separator(path):
+    """Returns the field separator of a text table."""
+    return "," if path.endswith(".csv") else "\t"
+
+
+def table_exists(file_path):
+    """Returns True if the table is stored in any format."""
+    return stored_path(file_path) is not None
+
+
+# Step 2: Read and Write Tables
+def table_columns(file_path):
+    """
+    Lists the columns of a stored table without reading its rows.
+
+    Args:
+        file_path (str): Path of the table in any format.
+
+    Returns:
+        list: The column names.
+    """
+    path = stored_path(file_path)
+    if path.endswith(extensions["parquet"]):
+        import pyarrow.parquet as pq
+
+        return pq.read_schema(path).names
+    return list(pd.read_csv(path, sep=separator(path), nrows=0).columns)
+
+
+def read_table(file_path, columns=None, as_text=False):
+    """
+    Reads a stored table, decoding only the requested columns.
+
+    Parquet keeps the column types, so nothing is re-inferred; a TSV copy is parsed with usecols.
+    Either way the columns get their registered dtypes from schema.column_dtypes.
+
+    Args:
+        file_path (str): Path of the table in any format.
+        columns (list): Columns to read, in file order; None reads all of them.
+        as_text (bool): Read every value as the string stored, so labels such as "N/A" or "3" stay as written;
+            missing values are "" in either format.
+
+    Returns:
+        pd.DataFrame: The table.
+    """
+    path = stored_path(file_path)
+    if path is None:
+        raise FileNotFoundError(f"No stored table for {file_path} in any of the formats {FORMATS}")
+
+    if path.endswith(extensions["parquet"]):
+        df = pd.read_parquet(path, columns=columns)
+        # Missing values become "", as in a TSV read without NA detection
+        return df.astype(object).where(df.notna(), "").astype(str) if as_text else apply_schema(df)
+    if as_text:
+        return pd.read_csv(path, sep=separator(path), usecols=columns, dtype=str, keep_default_na=False)
+    return apply_schema(pd.read_csv(path, sep=separator(path), usecols=columns))
+
+
+def write_table(df, file_path, fmt=None):
+    """
+    Writes a table atomically in the given format, so a reader never sees a partial file.
+
+    A copy left in another format by an earlier run is deleted.
+
+    Args:
+        df (pd.DataFrame): The table to write; its index is not stored.
+        file_path (str): Path of the table in any format; the extension is replaced by that of fmt.
+        fmt (str): One of FORMATS; None uses default_format.
+
+    Returns:
+        str: The path written.
+    """
+    fmt = fmt or default_format
+    path = table_path(file_path, fmt)
+    temp_path = path + ".tmp"
+
+    if fmt == "parquet":
+        df.to_parquet(temp_path, index=False, compression="zstd")
+    else:
+        df.to_csv(temp_path, sep="\t", index=False)
+    os.replace(temp_path, path)
+    remove_other_formats(file_path, fmt)
+    return path
@@ -0,0 +1,191 @@
+import re
+import pandas as pd
+
+
+# Step 1: Number Lexicon
+NUMBER_WORDS = {
+    "zero": 0, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7,
+    "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12, "thirteen": 13,
+    "fourteen": 14, "fifteen": 15, "sixteen": 16, "seventeen": 17, "eighteen": 18,
+    "nineteen": 19, "twenty": 20, "thirty": 30, "forty": 40, "fifty": 50, "sixty": 60,
+    "seventy": 70, "eighty": 80, "ninety": 90,
+}
+
+# Multipliers applied to the number built so far ("two dozen", "three hundred")
+MULTIPLIERS = {"dozen": 12, "hundred": 100}
+
+# Scales that close a group ("two thousand five hundred")
+SCALES = {"thousand": 1000, "million": 1000000}
+
+GROUP_WORDS = set(MULTIPLIERS) | set(SCALES)
+
+# Digit groups joined by thousands commas ("1,000") are one token
+TOKEN_PATTERN = re.compile(r"\d{1,3}(?:,\d{3})+|\d+|[a-z]+")
+
+NUMBER_PATTERN = re.compile(
+    r"\d|\b(?:" + "|".join(list(NUMBER_WORDS) + list(MULTIPLIERS) + list(SCALES)) + r")\b",
+    re.IGNORECASE,
+)
+
+# Separators allowed inside one number run ("twenty-one", "one hundred five")
+RUN_GAPS = {" ", "-"}
+
+# Tokens allowed between a number run and the witness term it counts ("three eye witnesses")
+MAX_GAP_TOKENS = 2
+
+# Separators that keep a number and a witness term in the same clause
+WITNESS_GAP_PATTERN = re.compile(r"[\s\-']+")
+
+# Separator between a witness term and the number labeling it ("Witnesses: 4")
+LABEL_GAP_PATTERN = re.compile(r"\s*:\s*")
+
+# Digit runs read as years; they only count witnesses when a witness term follows directly ("1890 people")
+YEAR_PATTERN = re.compile(r"1[6-9]\d\d|20\d\d")
+
+
+def is_number_token(token):
+    """Returns True if the token is a digit run or a number word."""
+    return token.isdigit() or token in NUMBER_WORDS or token in GROUP_WORDS
+
+
+def parse_number_run(words):
+    """
+    Converts a run of digit and number-word tokens into an integer.
+
+    Args:
+        words (list): Tokens such as ["twenty", "one"] or ["3", "hundred"].
+
+    Returns:
+        int: The value of the run.
+    """
+    total = current = 0
+    for word in words:
+        if word.isdigit():
+            current += int(word)
+        elif word in MULTIPLIERS:
+            current = max(current, 1) * MULTIPLIERS[word]
+        elif word in SCALES:
+            total += max(current, 1) * SCALES[word]
+            current = 0
+        else:
+            current += NUMBER_WORDS[word]
+    return total + current
+
+
+# Step 2: Find Number Runs in One Pass
+def find_number_runs(text):
+    """
+    Tokenizes the text once and groups adjacent number tokens into runs.
+
+    A digit token only continues a run with a multiplier or scale word, so "1890 1901"
+    stays two runs while "twenty-one", "one hundred and five" and "1,000" are single runs.
+
+    Args:
+        text (str): The description to analyze.
+
+    Returns:
+        tuple: (tokens, gaps, runs) where gaps[i] is the text between tokens[i] and
+            tokens[i + 1], and runs is a list of (start, end, value) token ranges.
+    """
+    text = text.lower()
+    matches = list(TOKEN_PATTERN.finditer(text))
+    tokens = [match.group().replace(",", "") for match in matches]
+    gaps = [text[left.end():right.start()] for left, right in zip(matches, matches[1:])]
+    runs = []
+    position = 0
+
+    while position < len(tokens):
+        if not is_number_token(tokens[position]):
+            position += 1
+            continue
+
+        start = end = position
+        while end + 1 < len(tokens):
+            following = end + 1
+            if tokens[following] == "and" and tokens[end] in GROUP_WORDS:
+                following += 1
+            if following >= len(tokens) or not is_number_token(tokens[following]):
+                break
+            if tokens[end].isdigit() and tokens[following] not in GROUP_WORDS:
+                break
+            if not set(gaps[end:following]) <= RUN_GAPS:
+                break
+            end = following
+
+        words = [token for token in tokens[start:end + 1] if token != "and"]
+        runs.append((start, end + 1, parse_number_run(words)))
+        position = end + 1
+
+    return tokens, gaps, runs
+
+
+# Step 3: Resolve Runs Next to Witness Terms
+def counts_witnesses(tokens, gaps, start, end, witness_terms):
+    """
+    Checks whether the run of tokens[start:end] counts a witness term in the same clause.
+
+    The run counts witnesses when a witness term follows it within MAX_GAP_TOKENS tokens, with no
+    other number in between, or when it labels one ("Witnesses: 4"). A year-like digit run only
+    counts when the witness term follows it directly, so "In 1890 two men died" counts two.
+
+    Args:
+        tokens (list): Lower-case tokens of the text.
+        gaps (list): Separators between consecutive tokens.
+        start (int): Index of the first token of the run.
+        end (int): Index of the first token after the run.
+        witness_terms (frozenset): Lower-case witness nouns.
+
+    Returns:
+        bool: True if the run counts witnesses.
+    """
+    if start > 0 and tokens[start - 1] in witness_terms and LABEL_GAP_PATTERN.fullmatch(gaps[start - 1]):
+        return True
+
+    is_year = end - start == 1 and YEAR_PATTERN.fullmatch(tokens[start]) is not None
+    window = 1 if is_year else MAX_GAP_TOKENS + 1
+    for position in range(end, min(end + window, len(tokens))):
+        if not WITNESS_GAP_PATTERN.fullmatch(gaps[position - 1]):
+            return False
+        if tokens[position] in witness_terms:
+            return True
+        if is_number_token(tokens[position]):
+            # A closer number run counts the term, if anything does
+            return False
+    return False
+
+
+def extract_witness_count_fast(text, witness_terms):
+    """
+    Extracts the witness count as the largest number that directly counts a witness term.
+
+    Args:
+        text (str): The description to analyze.
+        witness_terms (frozenset): Lower-case nouns that mark witnesses ("witnesses", "people", ...).
+
+    Returns:
+        int: The witness count, or 0 if no number counts a witness term.
+    """
+    if pd.isna(text):
+        return 0
+
+    tokens, gaps, runs = find_number_runs(text)
+    counts = [value for start, end, value in runs if counts_witnesses(tokens, gaps, start, end, witness_terms)]
+    return max(counts) if counts else 0
+
+
+def extract_witness_counts(texts, witness_terms):
+    """
+    Extracts witness counts for a whole Series, tokenizing only texts that contain a number.
+
+    Args:
+        texts (pd.Series): The descriptions to analyze.
+        witness_terms (iterable): Lower-case nouns that mark witnesses.
+
+    Returns:
+        pd.Series: Integer witness counts aligned with texts.
+    """
+    witness_terms = frozenset(term.lower() for term in witness_terms)
+    counts = pd.Series(0, index=texts.index, dtype="int64")
+    candidates = texts.astype("string").str.contains(NUMBER_PATTERN).fillna(False).astype(bool)
+    counts[candidates] = texts[candidates].map(lambda text: extract_witness_count_fast(text, witness_terms))
+    return counts
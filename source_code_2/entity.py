@@ -1,14 +1,15 @@
+import os
+import sys
+import multiprocessing
 import pandas as pd
-import spacy
-import en_core_web_sm
 from collections import Counter
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "source_code"))
+from inference_service import InferenceClient, run_spacy
+
 # Load the TSV file
 df = pd.read_csv('/Users/carlos/Documents/GitHub/DSCI550_Project/data_2/hp_analysis_hw2.tsv', sep='\t')
 
-# Load the English NLP model
-nlp = en_core_web_sm.load()
-
 # Initialize result columns
 entities_list = []
 entity_labels_list = []
@@ -17,11 +18,22 @@ entity_counts_list = []
 # Adjust this column name based on your dataset
 description_column = "description"  # or change to the correct column name
 
-# Process each row
-for desc in df[description_column].astype(str):
-    doc = nlp(desc)
-    entities = [(ent.text, ent.label_) for ent in doc.ents]
-
+# Process all rows in one request to a running inference_service.py (its warm spaCy model batches them).
+# If no service is running, or it fails or stops answering, load the English NLP model here instead.
+descriptions = df[description_column].astype(str).tolist()
+try:
+    client = InferenceClient(os.environ.get("INFERENCE_SERVICE_ADDRESS", "localhost:6000"))
+    try:
+        all_entities = client.entities(descriptions)
+    finally:
+        client.close()
+except (FileNotFoundError, ConnectionRefusedError, ConnectionResetError, EOFError, TimeoutError, RuntimeError,
+        multiprocessing.AuthenticationError) as e:
+    print(f"Inference service unavailable ({type(e).__name__}: {e}), running spaCy locally")
+    import en_core_web_sm
+    all_entities = run_spacy(en_core_web_sm.load(), descriptions)
+
+for entities in all_entities:
     entity_texts = [ent[0] for ent in entities]
     entity_labels = [ent[1] for ent in entities]
     entity_count = dict(Counter(entity_labels))
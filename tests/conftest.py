@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The pipeline scripts import each other as top-level modules, the way they run from source_code/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "source_code"))
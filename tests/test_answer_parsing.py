@@ -0,0 +1,19 @@
+import pytest
+from analysis_dates_witness import parse_answer, parse_combined_answer
+
+
+def test_parse_answer_takes_the_text_after_the_last_marker():
+    assert parse_answer("The date is given. #### 05-01-1854\n") == "05-01-1854"
+    assert parse_answer("no marker") == "no marker"
+
+
+@pytest.mark.parametrize("output, expected", [
+    ('#### {"date": "05-01-1854", "witness_count": "3"}', ("05-01-1854", "3")),
+    ('Reasoning first.\n#### {\n  "date": "01-01-1900",\n  "witness_count": "N/A"\n}', ("01-01-1900", "N/A")),
+    ('#### {"date": null, "witness_count": 2}', ("N/A", "2")),
+    ("#### {'date': '03-00-1920', witness_count: 4", ("03-00-1920", "4")),
+    ('#### {"date": "05-01-1854"}', ("05-01-1854", "N/A")),
+    ("#### N/A", ("N/A", "N/A")),
+])
+def test_parse_combined_answer(output, expected):
+    assert parse_combined_answer(output) == expected
@@ -0,0 +1,77 @@
+import json
+import os
+import pandas as pd
+import pytest
+import checkpoint_journal
+from checkpoint_journal import load_journal, start_journal, append_journal
+from analysis_dates_witness import extract_checkpointed
+
+
+def test_committed_rows_load_back(tmp_path):
+    journal = str(tmp_path / "run.journal.jsonl")
+    start_journal(journal, "abc")
+    append_journal(journal, [{"row": 0, "HP_date": "N/A"}, {"row": 1, "HP_date": "01-01-1900"}])
+
+    assert load_journal(journal, "abc") == {0: {"row": 0, "HP_date": "N/A"}, 1: {"row": 1, "HP_date": "01-01-1900"}}
+    assert load_journal(journal, "other run") == {}
+    assert load_journal(str(tmp_path / "missing.jsonl"), "abc") == {}
+
+
+def test_truncated_last_line_is_skipped_and_dropped_on_restart(tmp_path):
+    journal = str(tmp_path / "run.journal.jsonl")
+    start_journal(journal, "abc")
+    append_journal(journal, [{"row": 0, "HP_date": "N/A"}, {"row": 1, "HP_date": "01-01-1900"}])
+    with open(journal, "r+", encoding="utf-8") as f:
+        f.truncate(len(f.read()) - 10)
+
+    records = load_journal(journal, "abc")
+    assert list(records) == [0]
+
+    start_journal(journal, "abc", [records[0]])
+    append_journal(journal, [{"row": 1, "HP_date": "02-01-1900"}])
+    assert load_journal(journal, "abc")[1]["HP_date"] == "02-01-1900"
+    assert not os.path.exists(journal + ".tmp")
+
+
+def test_failed_restart_keeps_the_old_journal(tmp_path, monkeypatch):
+    journal = str(tmp_path / "run.journal.jsonl")
+    start_journal(journal, "abc", [{"row": 0, "HP_date": "N/A"}])
+
+    def crash(source, target):
+        raise KeyboardInterrupt
+    monkeypatch.setattr(checkpoint_journal.os, "replace", crash)
+    with pytest.raises(KeyboardInterrupt):
+        start_journal(journal, "abc", [])
+
+    assert load_journal(journal, "abc") == {0: {"row": 0, "HP_date": "N/A"}}
+
+
+class FakePipe:
+    """Answers every prompt with the description's last word, stopping after calls_left calls."""
+
+    def __init__(self, calls_left=None):
+        self.calls_left = calls_left
+        self.calls = 0
+
+    def __call__(self, messages, **kwargs):
+        if self.calls_left is not None and self.calls >= self.calls_left:
+            raise KeyboardInterrupt
+        self.calls += 1
+        answer = messages[0]["content"].split()[-1]
+        return [{"generated_text": messages + [{"role": "assistant", "content": f"#### {answer}"}]}]
+
+
+def test_resume_after_crash_matches_an_uninterrupted_run(tmp_path):
+    hp_df = pd.DataFrame({"description": [f"Seen in {1900 + row}" for row in range(7)]})
+    journal = str(tmp_path / "run.journal.jsonl")
+    expected = extract_checkpointed(FakePipe(), hp_df, str(tmp_path / "clean.jsonl"), checkpoint_every=2)
+
+    # Two generations per row: the crash hits row 2, after rows 0-1 were committed
+    with pytest.raises(KeyboardInterrupt):
+        extract_checkpointed(FakePipe(calls_left=5), hp_df, journal, checkpoint_every=2)
+    with open(journal, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"row": 2, "HP_date": "1902"})[:12])
+
+    resumed_pipe = FakePipe()
+    assert extract_checkpointed(resumed_pipe, hp_df, journal, checkpoint_every=2) == expected
+    assert resumed_pipe.calls == 2 * 5
@@ -0,0 +1,111 @@
+import random
+import re
+import pandas as pd
+import pytest
+from datefinder import find_dates
+from datefinder.constants import MONTHS_PATTERN, DAYS_PATTERN
+from dateutil import tz
+from date_extractor import has_date_candidates, extract_date_fast, extract_dates
+
+# datefinder passes "EST" and "PST" to dateutil, which warns on every parse
+pytestmark = pytest.mark.filterwarnings("ignore::dateutil.parser.UnknownTimezoneWarning")
+
+
+# The whole-text extractor analysis_v1 used before date_extractor, kept as the parity reference
+def extract_date(text):
+    """Extracts the latest date from text using datefinder, ensuring consistent timezone handling."""
+    if pd.isna(text):
+        return None
+
+    matches = list(find_dates(text))
+
+    processed_dates = []
+    for date in matches:
+        if date.tzinfo is not None:
+            date = date.astimezone(tz.UTC).replace(tzinfo=None)
+        processed_dates.append(date)
+
+    return max(processed_dates).strftime("%Y-%m-%d") if processed_dates else None
+
+
+date_free = [
+    "The demon appears to a woman who tells the story to visitors.",
+    "A janitor heard footsteps in the mansion late at night.",
+    "Decent people say the monster sits on the stairs.",
+    "Nothing dated this place, but hikers feel watched near the old mill.",
+]
+
+fixture = date_free + [
+    # Month and weekday names inside words, which datefinder reads as dates
+    "The mansion, decent and quiet, stands empty.",
+    "A janitor named Augustine saw a man at the gate.",
+    "Hikers on the summit saw marching soldiers on Saturday.",
+    # Timezones, with and without a time to attach to
+    "Seen at 10:30 PM EST near the bridge.",
+    "Lights at 3 pm PST and again at 21:00 UTC.",
+    "Eastern time, Pacific coast, GMT standard: nothing happens.",
+    "seen at UTC by many",
+    # Plain dates and other numbers
+    "Built on March 3, 1890 and burned 12/05/1921.",
+    "a 19th century house", "popular in the sixties", "Jan. 5", "around 3pm", "Room 12", "",
+    None,
+]
+
+
+def random_texts(count, seed=0):
+    names = sorted({re.sub(r"\\\.\?", "", name) for name in f"{MONTHS_PATTERN}|{DAYS_PATTERN}".split("|")})
+    words = ["demon", "woman", "mansion", "decent", "janitor", "augustine", "story", "the", "house", "on", "at",
+             "of", "by", "day", "time", "next", "last", "first", "noon", "pm", "EST", "utc", "1890", "3rd", "12"]
+    rng = random.Random(seed)
+
+    texts = []
+    for _ in range(count):
+        parts = []
+        for _ in range(rng.randint(1, 8)):
+            word = rng.choice(names) if rng.random() < 0.3 else rng.choice(words)
+            if rng.random() < 0.1:
+                word = rng.choice(["x", "de", "wo"]) + word + rng.choice(["", "s", "ing"])
+            parts.append(word + rng.choice([" ", ", ", ". ", "-", "/", "_", ")", ":"]))
+        texts.append("".join(parts))
+    return texts
+
+
+def test_matches_the_whole_text_extractor():
+    texts = pd.Series(fixture + random_texts(3000), index=range(5000, 5000 + len(fixture) + 3000))
+    dates = extract_dates(texts)
+
+    assert dates.dtype == object
+    assert dates.tolist() == [extract_date(text) for text in texts]
+    assert dates.index.equals(texts.index)
+    # In-word names are kept: "mansion, decent" reads as December, as datefinder does
+    assert extract_date_fast(fixture[4]) == extract_date(fixture[4]) is not None
+
+
+def test_missing_dates_are_none():
+    assert extract_dates(pd.Series(["no date here at all", None, "Built on December 5, 1890"])).tolist() == [
+        None, None, "1890-12-05"
+    ]
+
+
+@pytest.mark.parametrize("text", [
+    "Built on March 3, 1890.", "Seen on Monday", "a 19th century house", "dating to the nineteenth century",
+    "popular in the sixties", "Jan. 5", "around 3pm",
+])
+def test_dates_are_whole_word_candidates(text):
+    assert has_date_candidates(pd.Series([text]), whole_words=True).tolist() == [True]
+
+
+def test_whole_word_mode_skips_date_free_prose():
+    assert has_date_candidates(pd.Series(date_free), whole_words=True).tolist() == [False] * len(date_free)
+    assert extract_date_fast("the mansion, decent and quiet", whole_words=True) is None
+    assert extract_date_fast("due Janitor: Augustine", whole_words=True) is None
+    assert extract_date_fast("Built on December 5, 1890", whole_words=True) == "1890-12-05"
+
+
+@pytest.mark.parametrize("whole_words", [False, True])
+def test_every_parsed_text_is_a_candidate(whole_words):
+    texts = random_texts(3000, seed=1)
+    candidates = has_date_candidates(pd.Series(texts), whole_words).tolist()
+    parsed = [extract_date_fast(text, whole_words) for text in texts]
+    assert all(candidate for candidate, date in zip(candidates, parsed) if date is not None)
+    assert extract_dates(pd.Series(texts), whole_words).tolist() == parsed
@@ -0,0 +1,140 @@
+import numpy as np
+import pandas as pd
+import pytest
+from dimension_lookup import asof_merge, asof_positions, lookup_merge, plan_duplicate_keys
+
+facts = pd.DataFrame({
+    "state": pd.Categorical(["Ohio", "Texas", "Ohio", "Maine", None, "Texas"]),
+    "city": ["Akron", "Austin", "Dayton", "Bangor", "Nowhere", "Waco"],
+    "year": [1990, 2001, 1985, 2010, 2000, 1999],
+})
+states = pd.DataFrame({
+    "state": pd.Categorical(["Texas", "Ohio", "Utah"]),
+    "region": ["South", "Midwest", "West"],
+    "city": ["Austin", "Columbus", "Provo"],
+    "population": [29, 11, 3],
+})
+
+
+def assert_same_as_merge(merged, expected, key):
+    # pd.merge turns categorical keys with different categories into strings; the lookup keeps them
+    assert isinstance(merged[key].dtype, pd.CategoricalDtype)
+    pd.testing.assert_frame_equal(merged.assign(**{key: merged[key].astype(expected[key].dtype)}), expected)
+
+
+def test_matches_pd_merge_on_shared_key():
+    expected = pd.merge(facts, states, on="state", how="left")
+    assert_same_as_merge(lookup_merge(facts, states, on="state"), expected, "state")
+
+
+def test_matches_pd_merge_on_text_keys():
+    fact_df = facts.assign(state=facts["state"].astype(object))
+    dim_df = states.assign(state=states["state"].astype(object))
+    expected = pd.merge(fact_df, dim_df, on="state", how="left")
+    pd.testing.assert_frame_equal(lookup_merge(fact_df, dim_df, on="state"), expected)
+
+
+def test_matches_pd_merge_on_differently_named_keys():
+    dim_df = states.rename(columns={"state": "state_name"})
+    expected = pd.merge(facts, dim_df, left_on="state", right_on="state_name", how="left")
+    assert_same_as_merge(lookup_merge(facts, dim_df, left_on="state", right_on="state_name"), expected, "state")
+
+
+def test_matches_pd_merge_on_two_keys():
+    dim_df = pd.DataFrame({"state": ["Ohio", "Texas"], "city": ["Akron", "Waco"], "tribes": [2, 5]})
+    fact_df = facts.assign(state=facts["state"].astype(object))
+    expected = pd.merge(fact_df, dim_df, on=["state", "city"], how="left")
+    pd.testing.assert_frame_equal(lookup_merge(fact_df, dim_df, on=["state", "city"]), expected)
+
+
+def test_keeps_fact_order_with_any_index():
+    merged = lookup_merge(facts.set_index(np.arange(10, 16)), states, on="state")
+    assert merged.index.tolist() == list(range(6))
+    assert merged["city_x"].tolist() == facts["city"].tolist()
+    assert merged["population"].tolist()[:3] == [11, 29, 11]
+    assert merged["population"].isna().tolist() == [False, False, False, True, True, False]
+
+
+def brute_force_asof(fact_df, dim_df, left_by, right_by, on):
+    """Scans every dimension row for the latest one of the same group at or before each fact value."""
+    positions = []
+    for group, value in zip(fact_df[left_by], fact_df[on]):
+        best = -1
+        for position, (dim_group, dim_value) in enumerate(zip(dim_df[right_by], dim_df[on])):
+            if pd.isna(group) or pd.isna(value) or pd.isna(dim_group) or pd.isna(dim_value) or dim_group != group:
+                continue
+            if dim_value <= value and (best < 0 or dim_value >= dim_df[on].iloc[best]):
+                best = position
+        positions.append(best)
+    return np.array(positions)
+
+
+def test_asof_positions_match_brute_force():
+    rng = np.random.default_rng(0)
+    groups = ["Ohio", "Texas", "Maine", None]
+    census = pd.DataFrame({
+        "state": rng.choice(groups, 60),
+        # Census years, unsorted and some missing
+        "year": rng.choice([1900.0, 1950.0, 1990.0, 2000.0, 2010.0, np.nan], 60, replace=True),
+    }).drop_duplicates(["state", "year"]).reset_index(drop=True)
+    sightings = pd.DataFrame({
+        "state": rng.choice(groups + ["Utah"], 300),
+        "year": rng.choice(np.append(np.arange(1880, 2030, 7.0), np.nan), 300),
+    })
+
+    positions = asof_positions(sightings, census, "state", "state", "year")
+    assert (positions >= 0).any() and (positions < 0).any()
+    np.testing.assert_array_equal(positions, brute_force_asof(sightings, census, "state", "state", "year"))
+
+
+def test_asof_merge_takes_the_latest_earlier_row():
+    census = pd.DataFrame({"state": ["Ohio", "Ohio", "Texas"], "year": [2000, 1990, 2000], "seats": [16, 19, 32]})
+    sightings = pd.DataFrame({"state": ["Ohio", "Ohio", "Ohio", "Texas"], "year": [1995, 2005, 1980, 2000]})
+
+    merged = asof_merge(sightings, census, "state", "state", "year")
+    assert merged.columns.tolist() == ["state", "year", "seats"]
+    assert merged["year"].tolist() == [1995, 2005, 1980, 2000]
+    assert merged["seats"].tolist()[:2] == [19, 16]
+    assert np.isnan(merged["seats"].iloc[2])
+    assert merged["seats"].iloc[3] == 32
+
+
+# Ohio twice and Texas three times; Utah repeats but no sighting matches it
+tribes = pd.DataFrame({
+    "state": ["Ohio", "Texas", "Ohio", "Texas", "Utah", "Texas", "Utah"],
+    "tribe": ["Shawnee", "Caddo", "Miami", "Comanche", "Ute", "Apache", "Paiute"],
+})
+
+
+def test_planned_row_count_matches_the_merge():
+    fact_df = facts.assign(state=facts["state"].astype(object))
+    with pytest.raises(ValueError, match="grow 6 rows to 12"):
+        plan_duplicate_keys(fact_df, tribes, ["state"], ["state"], "refuse")
+    assert len(pd.merge(fact_df, tribes, on="state", how="left")) == 12
+
+
+@pytest.mark.parametrize("fact_state", [facts["state"], facts["state"].astype(object)])
+def test_policies(fact_state):
+    fact_df = facts.assign(state=fact_state)
+
+    deduped = lookup_merge(fact_df, tribes, on="state", duplicate_keys="dedupe")
+    assert len(deduped) == len(fact_df)
+    assert deduped["tribe"].tolist()[:3] == ["Shawnee", "Caddo", "Shawnee"]
+
+    allowed = lookup_merge(fact_df, tribes, on="state", duplicate_keys="allow")
+    assert len(allowed) == 12
+    with pytest.raises(ValueError, match="more than once"):
+        lookup_merge(fact_df, tribes, on="state", duplicate_keys="refuse")
+
+
+def test_unmatched_duplicates_are_dropped_silently():
+    fact_df = pd.DataFrame({"state": ["Maine", "Ohio"]})
+    dim_df = pd.DataFrame({"state": ["Ohio", "Texas", "Texas", "Utah"], "tribe": ["Miami", "Caddo", "Apache", "Ute"]})
+    planned = plan_duplicate_keys(fact_df, dim_df, ["state"], ["state"], "refuse")
+    assert planned["state"].is_unique
+    assert set(planned["state"]) == {"Texas", "Utah", "Ohio"}
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError, match="duplicate_keys must be one of"):
+        plan_duplicate_keys(facts, tribes, ["state"], ["state"], "ignore")
@@ -0,0 +1,30 @@
+import pandas as pd
+import pytest
+from analysis_v1 import apply_feature_engineering, apply_feature_engineering_cached
+
+descriptions = pd.DataFrame({"description": [
+    "Built on March 3, 1890, two men saw a ghost at night",
+    "A woman screams in the hallway",
+    None,
+    "Three witnesses heard footsteps in the morning",
+    "A woman screams in the hallway",
+]})
+
+
+def test_cached_runs_are_a_drop_in_replacement(tmp_path):
+    cache_file = str(tmp_path / "features.tsv")
+    uncached = apply_feature_engineering(descriptions.copy())
+    missed = apply_feature_engineering_cached(descriptions.copy(), cache_file)
+    hit = apply_feature_engineering_cached(descriptions.copy(), cache_file)
+
+    for cached in (missed, hit):
+        pd.testing.assert_frame_equal(cached, uncached)
+    assert hit["Haunted_Place_Date"].dtype == object
+    assert hit["Haunted_Place_Date"].tolist() == ["1890-03-03", None, None, None, None]
+
+
+def test_partial_hits_keep_the_dtypes(tmp_path):
+    cache_file = str(tmp_path / "features.tsv")
+    apply_feature_engineering_cached(descriptions.iloc[:2].copy(), cache_file)
+    mixed = apply_feature_engineering_cached(descriptions.copy(), cache_file)
+    pd.testing.assert_frame_equal(mixed, apply_feature_engineering(descriptions.copy()))
@@ -0,0 +1,104 @@
+import os
+import socket
+import stat
+import sys
+import threading
+import time
+import multiprocessing
+import pytest
+import inference_service
+from inference_service import InferenceClient, serve
+
+# Stands in for the spaCy model in the spawned workers: "crash" kills the worker, "slow" stalls it
+fake_model = '''
+import os
+import time
+from types import SimpleNamespace
+
+
+def load():
+    return FakeNlp()
+
+
+class FakeNlp:
+    meta = {"name": "fake_sm"}
+
+    def pipe(self, texts, batch_size=None):
+        for text in texts:
+            if text == "crash":
+                os._exit(3)
+            if text == "slow":
+                time.sleep(5)
+            yield SimpleNamespace(ents=[SimpleNamespace(text=word, label_="WORD") for word in text.split()])
+'''
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("localhost", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture(scope="module")
+def service(tmp_path_factory):
+    model_dir = tmp_path_factory.mktemp("models")
+    (model_dir / "en_core_web_sm.py").write_text(fake_model)
+    # Spawned workers start with the parent's sys.path, so they import the fake model too
+    sys.path.insert(0, str(model_dir))
+
+    key_file = str(tmp_path_factory.mktemp("keys") / "service.key")
+    address = ("localhost", free_port())
+    os.environ.pop("INFERENCE_SERVICE_KEY", None)
+    threading.Thread(target=serve, args=({"spacy": {}}, address), kwargs={"key_file": key_file},
+                     daemon=True).start()
+
+    deadline = time.monotonic() + 60
+    while True:
+        try:
+            InferenceClient(address, key_file=key_file).close()
+            break
+        except (FileNotFoundError, ConnectionRefusedError):
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.2)
+    yield address, key_file
+    sys.path.remove(str(model_dir))
+
+
+def test_key_is_random_and_private(service):
+    _, key_file = service
+    with open(key_file, "rb") as f:
+        assert len(f.read()) == 32
+    assert stat.S_IMODE(os.stat(key_file).st_mode) == 0o600
+
+
+def test_wrong_key_is_rejected_without_stopping_the_service(service):
+    address, key_file = service
+    with pytest.raises(multiprocessing.AuthenticationError):
+        InferenceClient(address, authkey=b"haunted-places")
+
+    client = InferenceClient(address, key_file=key_file)
+    assert client.entities(["old mill"]) == [[("old", "WORD"), ("mill", "WORD")]]
+    client.close()
+
+
+def test_dead_worker_fails_the_request_and_is_replaced(service):
+    address, key_file = service
+    client = InferenceClient(address, key_file=key_file)
+    with pytest.raises(RuntimeError, match="exited with code 3"):
+        client.entities(["crash"])
+    assert client.entities(["still here"]) == [[("still", "WORD"), ("here", "WORD")]]
+    client.close()
+
+
+def test_client_times_out(service):
+    address, key_file = service
+    client = InferenceClient(address, key_file=key_file, timeout=0.5)
+    with pytest.raises(TimeoutError):
+        client.entities(["slow"])
+    client.close()
+
+
+def test_missing_key_file_means_no_service(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        InferenceClient(("localhost", free_port()), key_file=str(tmp_path / "none.key"))
@@ -0,0 +1,63 @@
+import random
+import re
+import pytest
+from keyword_matcher import split_keyword, build_keyword_index, match_keywords
+from analysis_v1 import keyword_tables, keyword_index
+
+
+def compile_tables(tables):
+    return {
+        (table_name, category): [re.compile(rf"\b{keyword.lower()}\b") for keyword in keywords]
+        for table_name, table in tables.items()
+        for category, keywords in (table.items() if isinstance(table, dict) else [(None, table)])
+    }
+
+
+# The per-keyword regex scan match_keywords replaces
+keyword_patterns = compile_tables(keyword_tables)
+
+
+def regex_labels(text):
+    text = text.lower()
+    return {label for label, patterns in keyword_patterns.items() if any(p.search(text) for p in patterns)}
+
+
+def test_split_keyword_keeps_separators():
+    assert split_keyword("Rosy-fingered dawn") == (("rosy", "fingered", "dawn"), ("-", " "))
+
+
+def test_split_keyword_rejects_edge_punctuation():
+    with pytest.raises(ValueError):
+        split_keyword("-dawn")
+
+
+@pytest.mark.parametrize("text", [
+    "Footsteps and a SCREAM were heard after midnight.",
+    "The screaming woman appears at dawn",
+    "A cold spot near the half-light of the staircase",
+    "A cold  spot with two spaces does not count",
+    "half light without the hyphen",
+    "Seen at 3 PM by hikers; lunch-hour visitors report nothing",
+    "",
+])
+def test_matches_regex_on_examples(text):
+    assert match_keywords(text, keyword_index) == regex_labels(text)
+
+
+def test_matches_regex_on_random_texts():
+    phrases = [keyword for table in keyword_tables.values()
+               for keywords in (table.values() if isinstance(table, dict) else [table]) for keyword in keywords]
+    filler = ["the", "old", "house", "-", ",", ".", "  ", "a", "s", "ed", "ing", "pre", "1", "PM"]
+    rng = random.Random(0)
+
+    for _ in range(2000):
+        parts = [rng.choice(phrases) if rng.random() < 0.3 else rng.choice(filler) for _ in range(rng.randint(1, 12))]
+        text = "".join(part + rng.choice(["", " ", " ", "-", ", "]) for part in parts)
+        assert match_keywords(text, keyword_index) == regex_labels(text), text
+
+
+def test_lemmas_collapse_inflections():
+    lemmas = {"screams": "scream", "screamed": "scream"}
+    index = build_keyword_index({"audio": ["scream"]}, lemmas)
+    assert match_keywords("Someone screamed", index, lemmas) == {("audio", None)}
+    assert match_keywords("Someone screamed", build_keyword_index({"audio": ["scream"]})) == set()
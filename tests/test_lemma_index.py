@@ -0,0 +1,25 @@
+import lemma_index
+from lemma_index import load_lemma_table, update_lemma_table, lemma_subset
+
+
+def fake_lemmatize(lemmatizer, token):
+    return token[:-3] if token.endswith("ing") else token
+
+
+def test_update_appends_only_new_tokens(tmp_path, monkeypatch):
+    monkeypatch.setattr(lemma_index, "lemmatize_token", fake_lemmatize)
+    file_path = tmp_path / "lemma_table.tsv"
+
+    lemmas = update_lemma_table(["Screaming ghosts", "null"], file_path)
+    lemmas = update_lemma_table(["screaming and crying"], file_path, lemmas)
+
+    lines = file_path.read_text().splitlines()
+    assert lines[0] == "token\tlemma"
+    assert len(lines) == 1 + len(lemmas) == 6
+    assert load_lemma_table(file_path) == lemmas
+    assert lemmas["crying"] == "cry" and lemmas["null"] == "null"
+
+
+def test_lemma_subset_covers_only_the_texts():
+    lemmas = {"screaming": "scream", "crying": "cry", "ghosts": "ghost"}
+    assert lemma_subset(lemmas, ["Ghosts SCREAMING", None, "unknown"]) == {"screaming": "scream", "ghosts": "ghost"}
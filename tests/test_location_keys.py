@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+from location_keys import LocationIndex, drop_location_ids, keyed_dimension, with_location_ids
+
+hp_df = pd.DataFrame({
+    "state": pd.Categorical(["Ohio", "new  york", "Washington D.C.", "Guam", None]),
+    "state_abbrev": ["OH", "NY", "DC", "GU", "TX"],
+    "city": ["Akron", "Albany", "Washington", "Hagatna", "Austin "],
+})
+
+
+def test_state_names_abbreviations_and_aliases_share_ids():
+    locations = LocationIndex.from_fact(hp_df)
+    ids = locations.state_key(pd.Series(["Ohio", "OH", " ohio", "New York", "NY", "District of Columbia",
+                                         "Washington DC", "D.C.", "dc"]))
+    assert ids[0] == ids[1] == ids[2]
+    assert ids[3] == ids[4]
+    assert len(set(ids[5:])) == 1
+    assert len({ids[0], ids[3], ids[5]}) == 3
+
+
+def test_unknown_state_spellings_get_ids_after_the_state_table():
+    locations = LocationIndex.from_fact(hp_df)
+    assert locations.unknown_states == ["gu", "guam"]
+    assert locations.state_key(pd.Series(["Guam", "Atlantis", None])).tolist() == [53, -1, -1]
+
+
+def test_fact_and_dimension_keys_match(capsys):
+    keyed, locations = with_location_ids(hp_df)
+    # Known states match by name or abbreviation; spellings outside the state table only match themselves
+    assert keyed["state_id"].tolist()[:3] == keyed["state_abbrev_id"].tolist()[:3]
+    assert keyed["state_id"].iloc[3] != keyed["state_abbrev_id"].iloc[3]
+    assert keyed["state_id"].iloc[4] == -1
+    assert (keyed["city_id"] >= 0).all()
+
+    cities = pd.DataFrame({"city": ["AKRON", "Austin", "Springfield"], "daylight": [1, 2, 3]})
+    dim_df = keyed_dimension(cities, "city", "city_id", locations.city_key, "daytime")
+    assert dim_df["daylight"].tolist() == [1, 2]
+    assert dim_df["city_id"].tolist() == keyed["city_id"].to_numpy()[[0, 4]].tolist()
+    assert "1 city spelling(s) in daytime match no location" in capsys.readouterr().out
+
+    assert drop_location_ids(keyed).columns.tolist() == hp_df.columns.tolist()
+    assert with_location_ids(keyed, locations)[0] is keyed
+    assert keyed["state_id"].dtype == np.int32
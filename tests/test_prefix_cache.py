@@ -0,0 +1,102 @@
+from types import SimpleNamespace
+import pytest
+import torch
+from prefix_cache import PrefixCachedPipe, StopAfterAnswer, answer_complete, DEFAULT_MAX_NEW_TOKENS
+
+prompt = "Extract the date. Output after ####.\nDescription:\n"
+
+
+class CharTokenizer:
+    """One token per character, with a minimal chat template."""
+    pad_token_id = 0
+
+    def apply_chat_template(self, messages, tokenize=False, add_generation_prompt=True):
+        return "<user>" + messages[-1]["content"] + "<assistant>"
+
+    def __call__(self, text, add_special_tokens=False):
+        return {"input_ids": [ord(char) for char in text]}
+
+    def decode(self, ids, skip_special_tokens=True):
+        return "".join(chr(int(i)) for i in ids)
+
+
+class FakeModel:
+    """Records the keyword arguments of every generate() call and replies with a fixed answer."""
+    device = "cpu"
+
+    def __init__(self, reply):
+        self.reply = reply
+        self.calls = []
+
+    def __call__(self, input_ids, use_cache=True):
+        return SimpleNamespace(past_key_values={"cached_tokens": input_ids.shape[1]})
+
+    def generate(self, input_ids, **kwargs):
+        self.calls.append(kwargs)
+        reply = torch.tensor([[ord(char) for char in self.reply]])
+        return torch.cat([input_ids, reply], dim=1)
+
+
+class FakePipe:
+    def __init__(self, reply):
+        self.tokenizer = CharTokenizer()
+        self.model = FakeModel(reply)
+        self.calls = []
+
+    def __call__(self, messages, **kwargs):
+        self.calls.append(kwargs)
+        return [{"generated_text": messages + [{"role": "assistant", "content": "#### N/A"}]}]
+
+
+def test_cached_path_passes_the_default_token_cap():
+    pipe = FakePipe("#### 05-01-1854")
+    cached = PrefixCachedPipe(pipe, [prompt])
+
+    output = cached([{"role": "user", "content": prompt + "Found in May of 1854"}])
+
+    assert output[0]["generated_text"][-1]["content"] == "#### 05-01-1854"
+    kwargs = pipe.model.calls[0]
+    assert kwargs["max_new_tokens"] == DEFAULT_MAX_NEW_TOKENS == 256
+    assert kwargs["past_key_values"] == {"cached_tokens": len("<user>" + prompt)}
+    assert "stopping_criteria" not in kwargs
+
+
+def test_token_cap_and_stop_are_passed_on_both_paths():
+    pipe = FakePipe("#### 3")
+    cached = PrefixCachedPipe(pipe, [prompt], max_new_tokens=16, stop_after_answer=True)
+
+    cached([{"role": "user", "content": prompt + "Seen by 3 people"}])
+    cached([{"role": "user", "content": "Another prompt"}])
+
+    assert pipe.model.calls[0]["max_new_tokens"] == 16
+    assert isinstance(pipe.model.calls[0]["stopping_criteria"][0], StopAfterAnswer)
+    assert pipe.calls == [{"max_new_tokens": 16}]
+
+
+def test_generation_settings_only_report_a_non_default_cap():
+    assert PrefixCachedPipe(FakePipe(""), [prompt]).generation_settings()["max_new_tokens"] is None
+    assert PrefixCachedPipe(FakePipe(""), [prompt], max_new_tokens=16).generation_settings()["max_new_tokens"] == 16
+
+
+@pytest.mark.parametrize("text, complete", [
+    ("Thinking...", False),
+    ("#### 05-01-1854", False),
+    ("#### 05-01-1854\n", True),
+    ("####\n1890", False),
+    ('#### {"date": "N/A", "witness_count": "3"}', True),
+    ('#### {\n  "date": "05-01-1854",\n', False),
+    ('#### {\n  "date": "05-01-1854",\n  "witness_count": "N/A"\n}', True),
+])
+def test_answer_complete(text, complete):
+    assert answer_complete(text) == complete
+
+
+def test_stop_waits_for_a_multi_line_json_answer():
+    tokenizer = CharTokenizer()
+    stop = StopAfterAnswer(tokenizer, prompt_length=3)
+
+    def ids(text):
+        return torch.tensor([[1, 2, 3] + tokenizer(text)["input_ids"]])
+
+    assert not stop(ids('#### {\n  "date": "05-01-1854",\n'), None).item()
+    assert stop(ids('#### {\n  "date": "05-01-1854",\n  "witness_count": "N/A"\n}'), None).item()
@@ -0,0 +1,77 @@
+import os
+import pytest
+import run_pipeline
+from run_pipeline import run_stage
+
+
+@pytest.fixture
+def stage(tmp_path, monkeypatch):
+    """A stage whose script copies its input, in a source directory of its own."""
+    source_dir = tmp_path / "source_code"
+    source_dir.mkdir()
+    (source_dir / "settings.py").write_text("suffix = '!'\n")
+    (source_dir / "copy_stage.py").write_text(
+        "import sys\nfrom settings import suffix\n"
+        "text = open(sys.argv[1]).read()\nopen(sys.argv[2], 'w').write(text + suffix)\n"
+    )
+    # Logs go to source_dir/../data/processed, inside tmp_path
+    monkeypatch.setattr(run_pipeline, "source_dir", str(source_dir))
+
+    input_file, output_file = tmp_path / "input.txt", tmp_path / "output.txt"
+    input_file.write_text("boo")
+    return {"script": "copy_stage.py", "args": [str(input_file), str(output_file)],
+            "inputs": [str(input_file)], "outputs": [str(output_file)]}
+
+
+def test_up_to_date_stage_is_skipped(stage):
+    first = run_stage("copy", stage, None, False)
+    assert first["status"] == "ran"
+    assert open(stage["outputs"][0]).read() == "boo!"
+
+    assert run_stage("copy", stage, first["fingerprint"], False)["status"] == "skipped"
+    assert run_stage("copy", stage, first["fingerprint"], True)["status"] == "ran"
+
+
+def test_rewriting_an_input_with_the_same_content_is_not_a_change(stage):
+    recorded = run_stage("copy", stage, None, False)["fingerprint"]
+    with open(stage["inputs"][0], "w") as f:
+        f.write("boo")
+    os.utime(stage["inputs"][0], (0, 0))
+    assert run_stage("copy", stage, recorded, False)["status"] == "skipped"
+
+
+@pytest.mark.parametrize("change", ["input", "script", "imported module", "args", "missing output"])
+def test_changes_rerun_the_stage(stage, change):
+    recorded = run_stage("copy", stage, None, False)["fingerprint"]
+    source_dir = run_pipeline.source_dir
+    if change == "input":
+        with open(stage["inputs"][0], "w") as f:
+            f.write("BOO")
+    elif change == "script":
+        with open(os.path.join(source_dir, "copy_stage.py"), "a") as f:
+            f.write("# tweak\n")
+    elif change == "imported module":
+        with open(os.path.join(source_dir, "settings.py"), "w") as f:
+            f.write("suffix = '?'\n")
+    elif change == "args":
+        stage = dict(stage, args=stage["args"] + ["--verbose"])
+    else:
+        os.remove(stage["outputs"][0])
+    assert run_stage("copy", stage, recorded, False)["status"] == "ran"
+
+
+def test_failures_block_downstream_stages(stage):
+    failing = dict(stage, args=[])
+    failed = run_stage("copy", failing, None, False)
+    assert failed["status"] == "failed"
+    assert "IndexError" in open(failed["log"]).read()
+
+    assert run_stage("copy", stage, None, False, failed)["status"] == "blocked"
+
+
+def test_fetch_stage_only_runs_when_its_outputs_are_missing(stage):
+    fetch = dict(stage, fetch=True)
+    assert run_stage("fetch", fetch, None, False)["status"] == "ran"
+    with open(stage["inputs"][0], "w") as f:
+        f.write("changed upstream")
+    assert run_stage("fetch", fetch, None, False)["status"] == "skipped"
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+from schema import apply_schema, cast_column, registered_dtype
+from table_io import read_table, write_table
+
+
+@pytest.mark.parametrize("column, dtype", [
+    ("state", "category"), ("State", "category"), ("state_x", "category"), ("state.1", "category"),
+    ("Year", "int16"), ("victimization weight", "float32"), ("description", None), ("states", None),
+])
+def test_registered_dtype_sees_through_merge_suffixes(column, dtype):
+    assert registered_dtype(column) == dtype
+
+
+def test_category_only_for_text():
+    assert isinstance(cast_column(pd.Series(["Ohio", "Ohio", None]), "category").dtype, pd.CategoricalDtype)
+    numbers = pd.Series([1, 2, 3])
+    assert cast_column(numbers, "category") is numbers
+
+
+@pytest.mark.parametrize("values, narrowed", [
+    ([1990, 2001, 1850], True),
+    ([1990.0, 2001.0], True),
+    ([1990, None], False),
+    ([1990, 40000], False),
+    ([1990.5, 2001.0], False),
+    (["1990", "2001"], False),
+    ([True, False], False),
+])
+def test_int_narrowing_keeps_values(values, narrowed):
+    series = pd.Series(values)
+    cast = cast_column(series, "int16")
+    assert (cast.dtype == "int16") == narrowed
+    if narrowed:
+        assert cast.tolist() == [int(value) for value in values]
+    else:
+        assert cast is series
+
+
+def test_float32_weights():
+    cast = cast_column(pd.Series([1234.5, np.nan]), "float32")
+    assert cast.dtype == "float32"
+    assert cast.iloc[0] == 1234.5 and np.isnan(cast.iloc[1])
+
+
+def test_apply_schema_converts_registered_columns_only():
+    df = pd.DataFrame({
+        "State": ["Ohio", "Texas"], "state_y": ["Ohio", "Ohio"], "Year": [1990, 2001], "description": ["a", "b"],
+    })
+    converted = apply_schema(df)
+    assert converted.dtypes.astype(str).tolist() == ["category", "category", "int16", df["description"].dtype.name]
+    assert df["Year"].dtype == "int64"
+    assert apply_schema(converted) is converted
+
+
+def test_round_trip_through_a_table_keeps_values_and_types(tmp_path):
+    df = apply_schema(pd.DataFrame({
+        "state": ["Ohio", "Texas", None], "year": [1990, 2001, 1850], "quarter": [1, 2, None],
+        "description": ["An old mill", "Voices", "Footsteps"],
+    }))
+    path = write_table(df, str(tmp_path / "hp_analysis_v2"), "tsv")
+    read_back = read_table(path)
+
+    assert read_back.dtypes.astype(str).tolist()[:2] == ["category", "int16"]
+    # quarter has a missing value, so it stays a float column instead of being narrowed
+    assert read_back["quarter"].dtype == "float64"
+    pd.testing.assert_frame_equal(read_back.astype(str), df.astype(str), check_dtype=False)
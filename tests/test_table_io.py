@@ -0,0 +1,77 @@
+import pandas as pd
+import pytest
+import table_io
+from table_io import read_table, stored_path, table_path, write_table
+from analysis_v1 import append_data
+from benchmark_backends import load_sample
+
+labels = pd.DataFrame({
+    "description": ["An old mill", "Voices at night"],
+    "HP_date": ["05-01-1854", "N/A"],
+    "Witness_count": ["3", "N/A"],
+})
+
+
+def test_write_removes_the_copy_in_the_other_format(tmp_path):
+    base = str(tmp_path / "hp_analysis_v1.tsv")
+    # A Parquet copy from a run that had pyarrow installed
+    open(table_path(base, "parquet"), "wb").close()
+
+    written = write_table(labels, base, "tsv")
+    assert written == table_path(base, "tsv")
+    assert stored_path(base) == written
+    assert not (tmp_path / "hp_analysis_v1.parquet").exists()
+
+
+def test_streamed_output_removes_the_parquet_copy(tmp_path):
+    base = str(tmp_path / "hp_analysis_v1.tsv")
+    open(table_path(base, "parquet"), "wb").close()
+
+    append_data(labels.iloc[:1], base, header=True)
+    append_data(labels.iloc[1:], base, header=False)
+    assert stored_path(base) == base
+    assert len(read_table(base)) == 2
+
+
+def test_both_copies_fail_loudly(tmp_path):
+    base = str(tmp_path / "hp_analysis_v1")
+    for fmt in table_io.FORMATS:
+        open(table_path(base, fmt), "wb").close()
+
+    with pytest.raises(ValueError, match="more than one format"):
+        stored_path(base)
+
+
+def test_text_read_keeps_labels_as_written(tmp_path):
+    base = str(tmp_path / "hp_with_date_and_witness_count")
+    write_table(labels, base, "tsv")
+
+    assert read_table(base)["HP_date"].isna().tolist() == [False, True]
+    pd.testing.assert_frame_equal(read_table(base, as_text=True), labels)
+
+
+def test_benchmark_reads_the_extraction_output(tmp_path):
+    base = str(tmp_path / "hp_with_date_and_witness_count")
+    write_table(labels, base, "tsv")
+
+    sample = load_sample(base, rows=10, seed=0)
+    assert sorted(sample["Witness_count"]) == ["3", "N/A"]
+
+
+@pytest.mark.parametrize("fmt", table_io.FORMATS)
+def test_text_read_gives_the_same_strings_in_every_format(tmp_path, fmt):
+    if fmt == "parquet":
+        pytest.importorskip("pyarrow")
+    df = pd.DataFrame({
+        "description": ["An old mill", None],
+        "HP_date": ["N/A", None],
+        "Witness_count": [3, None],
+    })
+    path = write_table(df, str(tmp_path / "hp_with_date_and_witness_count"), fmt)
+
+    read_back = read_table(path, as_text=True)
+    assert read_back.to_dict("list") == {
+        "description": ["An old mill", ""],
+        "HP_date": ["N/A", ""],
+        "Witness_count": ["3.0", ""],
+    }
@@ -0,0 +1,41 @@
+import pandas as pd
+from analysis_dates_witness import triage_rows
+
+date_free = [
+    "A woman in white walks the halls and visitors report cold spots.",
+    "The janitor tells a story about a demon in the basement.",
+    "People say they hear voices near the old mill at night.",
+    "Someone may be watching from the upstairs window of the mansion.",
+    "Monstrous shadows move across the auditorium stage.",
+    "Students claim the elevator moves by itself.",
+    "The sunroom is said to be haunted by a former teacher.",
+    "A figure is often seen on the bridge after dark.",
+]
+
+
+def triage(texts):
+    return triage_rows(pd.DataFrame({"description": texts}))
+
+
+def test_date_free_prose_is_skipped():
+    dates, witnesses = triage(date_free)
+    assert dates == [False] * len(date_free)
+    assert witnesses == [False] * len(date_free)
+
+
+def test_date_evidence_is_routed_to_the_model():
+    texts = [
+        "Built in May of 1854.", "The fire of the 1890s", "haunted since the nineteenth century",
+        "a dance hall popular in the sixties", "Seen on a Tuesday in October", "Dated 5/1/99",
+        "a jazz club from the '20s", "In nineteen fifty a girl drowned here",
+        "back in the 50s", "around 1492", "she died last may", "built in may", "on 5 may", "may 5th",
+        "during the Civil War", "every Christmas eve", "a speakeasy during Prohibition",
+    ]
+    dates, _ = triage(texts)
+    assert dates == [True] * len(texts)
+
+
+def test_numbers_and_groups_are_routed_to_witness_extraction():
+    dates, witnesses = triage(["Seen by 3 hikers", "two girls saw her", "a couple of campers", None])
+    assert witnesses == [True, True, True, False]
+    assert dates == [False] * 4
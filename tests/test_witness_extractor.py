@@ -0,0 +1,67 @@
+import re
+import pandas as pd
+import pytest
+from number_parser import parse_number
+from analysis_v1 import witness_terms
+from witness_extractor import extract_witness_count_fast, extract_witness_counts
+
+terms = frozenset(witness_terms)
+
+
+# The whole-text extractor analysis_v1 used before witness_extractor, kept as the reference
+def extract_witness_count(text):
+    """Extracts witness count from text, detecting both digits and written numbers."""
+    if pd.isna(text) or text.strip() == "":
+        return 0
+
+    digit_numbers = [int(num) for num in re.findall(r'\b\d+\b', text)]
+
+    try:
+        word_number = parse_number(text)
+        if word_number is not None:
+            digit_numbers.append(int(word_number))
+    except:
+        pass
+
+    return max(digit_numbers) if digit_numbers else 0
+
+
+@pytest.mark.parametrize("text, count", [
+    ("In 1890 two men died", 2),
+    ("In 1890 the boys ran from the house", 0),
+    ("Built in 1890, three eye witnesses saw a light", 3),
+    ("1890 people gathered at the fair", 1890),
+    ("1,000 people saw it", 1000),
+    ("Witnesses: 4", 4),
+    ("witnesses : 1,200 in total", 1200),
+    ("twenty-one visitors", 21),
+    ("one hundred and five guests", 105),
+    ("a dozen students", 12),
+    ("five or six people", 6),
+    ("Room 12 is cold and two guests left", 2),
+    ("A woman in white walks the halls", 0),
+    ("", 0),
+    (None, 0),
+])
+def test_counts_only_numbers_next_to_witness_terms(text, count):
+    assert extract_witness_count_fast(text, terms) == count
+
+
+@pytest.mark.parametrize("text", [
+    "3 witnesses saw the lady", "Seen by 12 people.", "About 40 campers heard screams", "Nothing to report",
+])
+def test_agrees_with_the_whole_text_extractor_on_single_counts(text):
+    assert extract_witness_count_fast(text, terms) == extract_witness_count(text)
+
+
+@pytest.mark.parametrize("text", ["In 1890 two men died", "Room 12, where two guests stayed in 1975"])
+def test_years_and_room_numbers_no_longer_count(text):
+    assert extract_witness_count(text) > extract_witness_count_fast(text, terms) == 2
+
+
+def test_batch_api_matches_row_by_row():
+    texts = pd.Series(["In 1890 two men died", None, "no numbers here", "Witnesses: 4"], index=[7, 3, 5, 1])
+    counts = extract_witness_counts(texts, witness_terms)
+    assert counts.dtype == "int64"
+    assert counts.index.equals(texts.index)
+    assert counts.tolist() == [2, 0, 0, 4]